@@ -0,0 +1,254 @@
+"""
+准入控制
+每个上传接口限制同时处理的请求数和声明的上传总大小，超出时进入有界的等待队列（同样按请求数和上传大小限制）；
+队列已满或等待超时时立即返回 503，Retry-After 按该接口当前的排空速度（并发数 / 平均处理时间）估算。
+等待期间不读取请求体，上传数据留在客户端，内存和磁盘不会被突发的大文件上传占满
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.upload import request_size_limit
+
+# 平均处理时间的指数滑动平均系数
+DURATION_EWMA_ALPHA = 0.2
+
+# 还没有完成过请求、无法估算排空速度时的 Retry-After（秒）
+DEFAULT_RETRY_AFTER = 5
+
+# Retry-After 上限（秒）
+MAX_RETRY_AFTER = 600
+
+_CONTROLLED_METHODS = ("POST", "PUT", "PATCH")
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """解析 "/api/batch/convert=1,/api/csv/to-geojson=8" 形式的接口并发数配置"""
+    limits = {}
+    for item in spec.split(","):
+        path, sep, value = item.partition("=")
+        if sep and path.strip():
+            limits[path.strip()] = int(value)
+    return limits
+
+
+class Rejected(Exception):
+    """请求未被接受"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class EndpointLimiter:
+    """
+    单个接口的准入控制
+
+    Args:
+        concurrency: 同时处理的请求数
+        max_inflight_bytes: 处理中的请求声明的上传总大小（只有一个请求时不受限制，大文件不会永远无法处理）
+        queue_size: 等待队列长度
+        max_queue_bytes: 等待队列中请求声明的上传总大小
+        queue_timeout: 最长等待时间（秒）
+    """
+
+    def __init__(self, concurrency: int, max_inflight_bytes: int, queue_size: int,
+                 max_queue_bytes: int, queue_timeout: float):
+        self.concurrency = concurrency
+        self.max_inflight_bytes = max_inflight_bytes
+        self.queue_size = queue_size
+        self.max_queue_bytes = max_queue_bytes
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.active_bytes = 0
+        self.queued_bytes = 0
+        self.rejected = 0
+        self.avg_duration: Optional[float] = None
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _fits(self, weight: int) -> bool:
+        if self.active >= self.concurrency:
+            return False
+        return self.active == 0 or self.active_bytes + weight <= self.max_inflight_bytes
+
+    def drain_rate(self) -> Optional[float]:
+        """每秒完成的请求数估计"""
+        if not self.avg_duration:
+            return None
+        return self.concurrency / self.avg_duration
+
+    def retry_after(self) -> int:
+        """排在当前队列之后的请求大约需要等待的秒数"""
+        rate = self.drain_rate()
+        if rate is None:
+            return DEFAULT_RETRY_AFTER
+        return max(1, min(MAX_RETRY_AFTER, math.ceil((self.queued + 1) / rate)))
+
+    def _reject(self) -> Rejected:
+        self.rejected += 1
+        return Rejected(self.retry_after())
+
+    async def acquire(self, weight: int) -> None:
+        """
+        等待处理名额
+
+        Raises:
+            Rejected: 队列已满或等待超时
+        """
+        if not self._waiters and self._fits(weight):
+            self._grant(weight)
+            return
+        if self.queued >= self.queue_size or self.queued_bytes + weight > self.max_queue_bytes:
+            raise self._reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (weight, waiter)
+        self._waiters.append(entry)
+        self.queued_bytes += weight
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # 超时的同时已分配到名额
+                return
+            raise self._reject()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 分配到名额时客户端已断开
+                self._revoke(weight)
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(entry)
+                self.queued_bytes -= weight
+
+    def _grant(self, weight: int) -> None:
+        self.active += 1
+        self.active_bytes += weight
+
+    def _revoke(self, weight: int) -> None:
+        self.active -= 1
+        self.active_bytes -= weight
+        self._wake()
+
+    def release(self, weight: int, duration: float) -> None:
+        """请求处理完成，按先后顺序唤醒可以开始处理的等待请求"""
+        if self.avg_duration is None:
+            self.avg_duration = duration
+        else:
+            self.avg_duration += DURATION_EWMA_ALPHA * (duration - self.avg_duration)
+        self._revoke(weight)
+
+    def _wake(self) -> None:
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if not self._fits(weight):
+                break
+            self._waiters.popleft()
+            self.queued_bytes -= weight
+            self._grant(weight)
+            waiter.set_result(None)
+
+
+# 接口路径 → 准入控制（每个 worker 进程独立）
+limiters: Dict[str, EndpointLimiter] = {}
+
+
+class AdmissionControlMiddleware:
+    """
+    按接口的准入控制
+
+    只控制上传类请求（POST / PUT / PATCH）且路径为不含路径参数的已注册路由，
+    请求权重为 Content-Length（分块上传没有声明大小时按该接口的上传大小上限计）。
+    名额在响应发送完后释放，流式响应整个发送期间都占用名额。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._paths: Optional[Set[str]] = None
+        self._limits = parse_limits(settings.ADMISSION_LIMITS)
+
+    def _controlled_paths(self, scope: Scope) -> Set[str]:
+        if self._paths is None:
+            self._paths = {
+                route.path for route in getattr(scope.get("app"), "routes", [])
+                if "{" not in route.path and set(getattr(route, "methods", None) or ()) & set(_CONTROLLED_METHODS)
+            }
+        return self._paths
+
+    def limiter(self, path: str) -> EndpointLimiter:
+        limiter = limiters.get(path)
+        if limiter is None:
+            limiter = limiters[path] = EndpointLimiter(
+                concurrency=self._limits.get(path, settings.ADMISSION_CONCURRENCY),
+                max_inflight_bytes=settings.ADMISSION_MAX_INFLIGHT_BYTES,
+                queue_size=settings.ADMISSION_QUEUE_SIZE,
+                max_queue_bytes=settings.ADMISSION_MAX_QUEUE_BYTES,
+                queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            )
+        return limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] not in _CONTROLLED_METHODS
+                or scope["path"] not in self._controlled_paths(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        weight = request_size_limit(scope["path"])
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit():
+                    weight = int(value)
+                break
+
+        limiter = self.limiter(scope["path"])
+        try:
+            await limiter.acquire(weight)
+        except Rejected as e:
+            admission_rejected.inc(scope["path"])
+            response = JSONResponse(
+                {"detail": "服务繁忙，请稍后重试"}, status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(weight, time.perf_counter() - started)
+
+
+def _limiter_stat(name: str):
+    def collect():
+        return {(path,): getattr(limiter, name) for path, limiter in list(limiters.items())}
+    return collect
+
+
+admission_rejected = registry.counter(
+    "gistools_admission_rejected_total", "Requests rejected with 503 by admission control", ("route",)
+)
+registry.gauge(
+    "gistools_admission_active", "Requests being processed per endpoint", ("route",), collect=_limiter_stat("active")
+)
+registry.gauge(
+    "gistools_admission_queued", "Requests waiting for admission per endpoint", ("route",),
+    collect=_limiter_stat("queued")
+)
+registry.gauge(
+    "gistools_admission_queued_bytes", "Declared upload bytes waiting for admission per endpoint", ("route",),
+    collect=_limiter_stat("queued_bytes")
+)
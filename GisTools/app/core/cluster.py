@@ -0,0 +1,139 @@
+"""
+多 worker 协作
+多个 worker 进程（gunicorn / uvicorn --workers）通过 LOCK_DIR 下的文件锁协作：
+- 每个 worker 持有一个以 worker ID 命名的锁文件，其它进程能拿到该锁说明这个 worker 已退出
+  （比检查 PID 可靠：容器重启后 PID 会被复用）
+- 只有拿到主锁的 worker 运行文件清理、中断任务恢复等后台调度；它退出后锁由操作系统释放，其余 worker 接替
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.single_flight import FileLock
+
+logger = logging.getLogger(__name__)
+
+# 服务启动时间：gunicorn preload 时在主进程中导入，所有 worker 相同
+SERVER_STARTED = time.time()
+
+_WORKERS_SUBDIR = "workers"
+_LEADER_LOCK = "leader.lock"
+
+# (进程PID, worker ID, 锁)：fork 出的子进程 PID 不同，会重新生成自己的 worker ID
+_worker: Optional[Tuple[int, str, FileLock]] = None
+
+
+def _worker_lock_path(worker_id: str) -> str:
+    return os.path.join(settings.LOCK_DIR, _WORKERS_SUBDIR, f"{worker_id}.lock")
+
+
+def current_worker_id() -> str:
+    """当前 worker 的ID（第一次调用时生成并持有对应的锁文件，直到进程退出）"""
+    global _worker
+    if _worker is None or _worker[0] != os.getpid():
+        os.makedirs(os.path.join(settings.LOCK_DIR, _WORKERS_SUBDIR), exist_ok=True)
+        while True:
+            worker_id = uuid.uuid4().hex
+            lock = FileLock(_worker_lock_path(worker_id))
+            if lock.try_acquire():
+                # 创建和加锁之间锁文件可能已被 prune_dead_workers 删除，此时换一个ID
+                if os.path.exists(lock.path):
+                    break
+                lock.release()
+        _worker = (os.getpid(), worker_id, lock)
+    return _worker[1]
+
+
+def worker_alive(worker_id: str) -> bool:
+    """worker 是否仍在运行（其锁文件仍被持有）"""
+    if _worker is not None and _worker[0] == os.getpid() and _worker[1] == worker_id:
+        return True
+    path = _worker_lock_path(worker_id)
+    if not os.path.exists(path):
+        return False
+    lock = FileLock(path)
+    if lock.try_acquire():
+        lock.release(remove=True)
+        return False
+    return True
+
+
+def prune_dead_workers() -> int:
+    """删除已退出 worker 的锁文件，返回删除的数量"""
+    directory = os.path.join(settings.LOCK_DIR, _WORKERS_SUBDIR)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    return sum(
+        not worker_alive(name[:-len(".lock")]) for name in names if name.endswith(".lock")
+    )
+
+
+class LeaderElection:
+    """
+    主 worker 选举
+
+    start() 后立即尝试获取主锁，拿不到时每隔 retry_interval 秒重试；
+    成为主 worker 后按注册顺序启动后台服务，stop() 时逆序停止并释放主锁。
+    """
+
+    def __init__(self, lock_dir: str, retry_interval: float = 5.0):
+        self.lock_dir = lock_dir
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        # 是否在服务启动时（而不是其它 worker 退出后接替）成为主 worker
+        self.elected_at_startup = False
+        self._services: List[Tuple[Callable[[], Awaitable[None]], Callable[[], Awaitable[None]]]] = []
+        self._lock: Optional[FileLock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_service(self, start: Callable[[], Awaitable[None]], stop: Callable[[], Awaitable[None]]) -> None:
+        """注册只在主 worker 中运行的后台服务"""
+        self._services.append((start, stop))
+
+    def _try_acquire(self) -> bool:
+        os.makedirs(self.lock_dir, exist_ok=True)
+        lock = FileLock(os.path.join(self.lock_dir, _LEADER_LOCK))
+        if not lock.try_acquire():
+            return False
+        self._lock = lock
+        return True
+
+    async def _become_leader(self) -> None:
+        self.is_leader = True
+        logger.info("worker %s (pid %s) 成为主 worker", current_worker_id(), os.getpid())
+        for start, _ in self._services:
+            await start()
+
+    async def _wait_for_leadership(self) -> None:
+        while not self._try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        await self._become_leader()
+
+    async def start(self) -> None:
+        self.elected_at_startup = self._try_acquire()
+        if self.elected_at_startup:
+            await self._become_leader()
+        else:
+            self._task = asyncio.create_task(self._wait_for_leadership())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            for _, stop in reversed(self._services):
+                await stop()
+            self.is_leader = False
+        if self._lock is not None:
+            self._lock.release()
+            self._lock = None
+
+
+leader = LeaderElection(settings.LOCK_DIR, retry_interval=settings.LEADER_RETRY_INTERVAL)
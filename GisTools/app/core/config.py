@@ -2,7 +2,7 @@
 应用配置文件
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal
 import os
 
 
@@ -10,7 +10,16 @@ class Settings(BaseSettings):
     # 服务配置
     HOST: str = "0.0.0.0"
     PORT: int = 8001
-    RELOAD: bool = True  # 开发时启用热重载
+    RELOAD: bool = True  # 开发时启用热重载（只支持单个 worker 进程）
+    # worker 进程数，0 表示使用CPU核数；python main.py 默认单进程，
+    # gunicorn.conf.py 关闭热重载，未配置 WORKERS 时使用CPU核数
+    WORKERS: int = 1
+
+    @property
+    def workers(self) -> int:
+        if self.RELOAD:
+            return 1
+        return self.WORKERS or (os.cpu_count() or 1)
 
     # CORS配置
     ALLOWED_ORIGINS: str = "http://localhost:5173,http://127.0.0.1:5173"
@@ -32,6 +41,118 @@ class Settings(BaseSettings):
 
     # 处理配置
     MAX_FILE_COUNT: int = 10
+    # CSV分块并行解析：超过该大小的CSV启用多进程解析（默认256MB）
+    CSV_PARALLEL_MIN_SIZE: int = 268435456
+    # 并行解析进程数，0 表示CPU核数平均分给各 worker 进程，1 表示关闭并行
+    CSV_PARALLEL_WORKERS: int = 0
+
+    @property
+    def csv_parallel_workers(self) -> int:
+        return self.CSV_PARALLEL_WORKERS or self._cpu_share()
+
+    def _cpu_share(self) -> int:
+        """每个 worker 进程分到的CPU核数（多个 worker 的进程池不超过总核数）"""
+        return max(1, (os.cpu_count() or 1) // self.workers)
+
+    # 转换执行池：阻塞的转换在池中执行，不占用事件循环
+    # CPU密集转换使用的执行器：thread（线程池）或 process（进程池）
+    CONVERSION_EXECUTOR: Literal["thread", "process"] = "thread"
+    # 线程池大小，0 表示 min(32, CPU核数 + 4)
+    CONVERSION_THREAD_WORKERS: int = 0
+    # 进程池大小，0 表示CPU核数平均分给各 worker 进程
+    CONVERSION_PROCESS_WORKERS: int = 0
+
+    @property
+    def conversion_thread_workers(self) -> int:
+        return self.CONVERSION_THREAD_WORKERS or min(32, (os.cpu_count() or 1) + 4)
+
+    @property
+    def conversion_process_workers(self) -> int:
+        return self.CONVERSION_PROCESS_WORKERS or self._cpu_share()
+
+    # 转换资源统计：是否用 tracemalloc 统计每次转换的 Python 内存峰值（会使转换变慢，排查问题时开启）
+    CONVERSION_TRACEMALLOC: bool = False
+
+    # 管理员令牌（X-Admin-Token 请求头），为空时禁用需要管理员权限的功能（如转换性能分析）
+    ADMIN_TOKEN: str = ""
+    # 转换性能分析（profile=true）使用的分析器：cprofile 确定性分析（.pstats），sampling 采样（.collapsed）
+    PROFILER: Literal["cprofile", "sampling"] = "cprofile"
+    # 采样分析器的采样间隔（秒）
+    PROFILE_SAMPLE_INTERVAL: float = 0.005
+
+    # 转换进度：每写出多少个要素回调一次进度
+    PROGRESS_EVERY: int = 5000
+
+    # Mock 转换服务：为 True 时即使安装了GDAL也使用 Mock 服务（压测上传、路由和下载时排除GDAL的开销）
+    MOCK_CONVERTERS: bool = False
+    # Mock 服务输出的合成要素数，0 表示使用固定的 3 个示例要素
+    MOCK_FEATURE_COUNT: int = 0
+    # 每个合成要素序列化后的大致字节数
+    MOCK_FEATURE_BYTES: int = 256
+
+    # 转换结果缓存：相同内容、相同参数的转换直接返回已有结果
+    CACHE_ENABLED: bool = True
+    CACHE_DB_PATH: str = os.path.join(_BASE_DIR, "data", "cache.db")
+    # 缓存结果文件的总大小上限（默认5GB），超出时淘汰最久未使用的结果
+    CACHE_MAX_BYTES: int = 5368709120
+
+    # 共享锁目录：相同转换的并发请求通过文件锁合并为一次转换（多个 worker 进程共享）
+    LOCK_DIR: str = os.path.join(_BASE_DIR, "data", "locks")
+    # 多 worker 时只有主 worker 运行文件清理和任务恢复，其余 worker 每隔该时间（秒）尝试接替
+    LEADER_RETRY_INTERVAL: float = 5.0
+
+    # 异步任务：任务表保存在本地 SQLite 中
+    JOB_DB_PATH: str = os.path.join(_BASE_DIR, "data", "jobs.db")
+    # 同时执行的任务数
+    JOB_WORKERS: int = 2
+    # 转换抛出异常时的最大尝试次数
+    JOB_MAX_ATTEMPTS: int = 3
+    # 重试等待时间（秒），按 2 的幂次递增
+    JOB_RETRY_DELAY: float = 2.0
+    # 空闲时检查任务表的间隔（秒），用于发现其它进程提交的任务
+    JOB_POLL_INTERVAL: float = 1.0
+    # 主 worker 检查中断任务（执行它的 worker 已退出）的间隔（秒）
+    JOB_RECOVERY_INTERVAL: float = 30.0
+
+    # 文件清理：定期删除过期的转换结果和遗留的临时目录
+    JANITOR_ENABLED: bool = True
+    # 两次清理之间的间隔（秒）
+    JANITOR_INTERVAL: float = 300.0
+    # 转换结果的最长保留时间（秒，按最近一次下载计算），0 表示不限
+    OUTPUT_TTL: int = 604800
+    # UPLOAD_DIR 总大小上限（默认20GB），超出时先删除最久未下载的结果，0 表示不限
+    OUTPUT_MAX_BYTES: int = 21474836480
+    # 超过该时间（秒）且不属于未完成任务的临时目录视为遗留目录
+    TEMP_TTL: int = 21600
+
+    # 日志：全局级别、按模块覆盖的级别（如 "app.routers=DEBUG,app.services.csv_reader=ERROR"）和输出格式
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    # 每次转换中每种逐行警告（如无效坐标）最多逐条记录的行数，其余只计入汇总
+    ROW_WARNING_LIMIT: int = 10
+
+    # 运行指标：在 /metrics 以 Prometheus 文本格式输出请求耗时、转换吞吐量、缓存命中率等
+    METRICS_ENABLED: bool = True
+
+    # 准入控制：每个上传接口限制同时处理的请求数，超出时排队，队列满或等待超时返回 503 和 Retry-After
+    ADMISSION_ENABLED: bool = True
+    # 每个接口同时处理的请求数
+    ADMISSION_CONCURRENCY: int = 4
+    # 按接口覆盖的并发数（如 "/api/batch/convert=1,/api/csv/to-geojson=8"）
+    ADMISSION_LIMITS: str = "/api/batch/convert=1"
+    # 每个接口处理中的请求声明的上传总大小（默认400MB），单个请求不受限制
+    ADMISSION_MAX_INFLIGHT_BYTES: int = 419430400
+    # 每个接口等待队列的长度和其中请求声明的上传总大小（默认1GB）
+    ADMISSION_QUEUE_SIZE: int = 16
+    ADMISSION_MAX_QUEUE_BYTES: int = 1073741824
+    # 在队列中的最长等待时间（秒），超时返回 503
+    ADMISSION_QUEUE_TIMEOUT: float = 30.0
+
+    def ensure_dirs(self) -> None:
+        """创建上传和临时目录（应用启动时调用，导入配置没有副作用）"""
+        os.makedirs(self.UPLOAD_DIR, exist_ok=True)
+        os.makedirs(self.TEMP_DIR, exist_ok=True)
 
     class Config:
         env_file = ".env"
@@ -39,13 +160,3 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-
-# 打印路径信息
-print(f"[配置] _BASE_DIR: {settings._BASE_DIR}")
-print(f"[配置] UPLOAD_DIR: {settings.UPLOAD_DIR}")
-print(f"[配置] TEMP_DIR: {settings.TEMP_DIR}")
-print(f"[配置] UPLOAD_DIR 绝对路径: {os.path.abspath(settings.UPLOAD_DIR)}")
-
-# 创建必要的目录
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-os.makedirs(settings.TEMP_DIR, exist_ok=True)
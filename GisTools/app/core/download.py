@@ -0,0 +1,319 @@
+"""
+文件下载
+支持 Range（206 断点续传 / 分段下载）、ETag（If-None-Match 返回 304）和按格式区分的媒体类型；
+ETag 优先使用写入结果缓存时记录的内容 SHA-256，没有记录时使用文件大小 + 修改时间，请求中不读取文件内容。
+ASGI 服务器支持 pathsend 扩展时由服务器直接发送文件（零拷贝），否则在线程中按块读取发送。
+inline 转换模式下转换结果不落盘，由 stream_response 边生成边（按需 gzip 压缩）发送
+"""
+import asyncio
+import os
+import stat
+import time
+import zlib
+from email.utils import formatdate
+from typing import Callable, Iterator, Optional, Tuple, Union
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.executor import run_blocking
+
+# 每次发送的块大小
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# inline 模式 gzip 压缩级别（兼顾压缩率与CPU开销）
+INLINE_GZIP_LEVEL = 5
+
+# 输出格式 → 媒体类型
+MEDIA_TYPES = {
+    ".geojson": "application/geo+json",
+    ".json": "application/json",
+    ".geojsonl": "application/geo+json-seq",
+    ".parquet": "application/vnd.apache.parquet",
+    ".shp": "application/x-esri-shape",
+    ".shx": "application/x-esri-shape-index",
+    ".dbf": "application/x-dbf",
+    ".prj": "text/plain; charset=utf-8",
+    ".cpg": "text/plain; charset=utf-8",
+    ".csv": "text/csv; charset=utf-8",
+    ".zip": "application/zip",
+    ".gz": "application/gzip",
+}
+
+
+def media_type_for(filename: str) -> str:
+    """按扩展名返回媒体类型，未知格式为 application/octet-stream"""
+    return MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), "application/octet-stream")
+
+
+# 查找文件内容哈希的函数：(路径, stat) -> SHA-256，没有记录时返回 None
+Sha256Lookup = Callable[[str, os.stat_result], Optional[str]]
+
+
+def stat_etag(stat_result: os.stat_result) -> str:
+    """由文件大小和修改时间构成的强 ETag（文件被修改或替换后改变）"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+async def content_etag(
+    path: str, stat_result: os.stat_result, sha256_lookup: Optional[Sha256Lookup] = None
+) -> str:
+    """已记录内容哈希时使用 SHA-256 作为 ETag，否则使用 stat_etag"""
+    if sha256_lookup is not None:
+        sha256 = await run_blocking(sha256_lookup, path, stat_result)
+        if sha256:
+            return f'"{sha256}"'
+    return stat_etag(stat_result)
+
+
+def record_access(path: str, stat_result: os.stat_result) -> None:
+    """记录一次下载：只更新访问时间，修改时间不变（不影响 Last-Modified / ETag），清理任务按访问时间淘汰"""
+    try:
+        os.utime(path, ns=(time.time_ns(), stat_result.st_mtime_ns))
+    except OSError:
+        pass
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较：忽略 W/ 前缀"""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节范围
+
+    Returns:
+        (start, end)，end 包含在内；格式不支持（如多段范围）时返回 None，按完整文件响应
+
+    Raises:
+        HTTPException: 416 范围无法满足
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N 表示最后 N 个字节
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(0, size - suffix), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(
+            status_code=416, detail="请求的范围超出文件大小",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _read_at(f, offset: int, size: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(f.fileno(), size, offset)
+    f.seek(offset)  # Windows 没有 pread
+    return f.read(size)
+
+
+class FileRangeResponse(Response):
+    """发送文件的全部或一个字节范围"""
+
+    def __init__(
+        self, path: str, stat_result: os.stat_result, headers: dict, media_type: str,
+        status_code: int = 200, byte_range: Optional[Tuple[int, int]] = None
+    ):
+        self.path = path
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        size = stat_result.st_size
+        self.start, self.end = byte_range if byte_range else (0, size - 1)
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        full = self.start == 0 and self.status_code == 200
+        if full and "http.response.pathsend" in scope.get("extensions", {}):
+            # 服务器直接发送文件（sendfile），不经过 Python 读取
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        # 无缓冲读取，避免 BufferedReader 的额外复制
+        with open(self.path, "rb", buffering=0) as f:
+            offset, remaining = self.start, self.end - self.start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(_read_at, f, offset, min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    # 文件在发送过程中被截断
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                else:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": False})
+                    return
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _content_disposition(disposition: str, filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Accept-Encoding 是否接受 gzip（q=0 表示拒绝）"""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+async def file_response(
+    request: Request, path: str, filename: Optional[str] = None, inline: bool = False,
+    sha256_lookup: Optional[Sha256Lookup] = None
+) -> Response:
+    """
+    构造下载响应
+
+    Args:
+        request: 当前请求（读取 Range / If-Range / If-None-Match）
+        path: 文件路径
+        filename: 下载文件名，默认使用 path 的文件名
+        inline: Content-Disposition 使用 inline 而不是 attachment
+        sha256_lookup: 查找写出时记录的内容哈希（如结果缓存），用作 ETag
+
+    Raises:
+        HTTPException: 404 文件不存在；416 范围无法满足
+    """
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="文件不存在")
+
+    filename = filename or os.path.basename(path)
+    etag = await content_etag(path, stat_result, sha256_lookup)
+    await asyncio.to_thread(record_access, path, stat_result)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        # 允许缓存，但每次使用前用 ETag 验证
+        "cache-control": "no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["content-disposition"] = _content_disposition("inline" if inline else "attachment", filename)
+    media_type = media_type_for(filename)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range 与当前 ETag 不一致说明文件已变化，返回完整文件
+    if range_header and (if_range is None or if_range.strip() == etag):
+        byte_range = parse_range(range_header, stat_result.st_size)
+    if byte_range is not None:
+        return FileRangeResponse(path, stat_result, headers, media_type, status_code=206, byte_range=byte_range)
+    return FileRangeResponse(path, stat_result, headers, media_type)
+
+
+def resolve_download_path(directory: str, filename: str) -> str:
+    """下载目录中的文件路径，拒绝包含路径分隔符或以 . 开头的文件名"""
+    if not filename or filename != os.path.basename(filename) or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="文件不存在")
+    return os.path.join(os.path.abspath(directory), filename)
+
+
+def stream_response(
+    request: Request, chunks: Iterator[Union[str, bytes]], filename: str,
+    background: Optional[BackgroundTask] = None
+) -> StreamingResponse:
+    """
+    将转换生成器直接作为响应体发送（inline 模式，不写输出文件）
+
+    生成器在执行池的线程中逐块推进，客户端接受 gzip 时在同一线程中压缩。
+
+    Args:
+        request: 当前请求（读取 Accept-Encoding）
+        chunks: 阻塞的转换生成器，产出文本（按 UTF-8 编码）或字节
+        filename: 下载文件名，决定媒体类型
+        background: 响应发送完（或客户端断开）后执行的任务，如清理上传的临时文件
+    """
+    compressor = zlib.compressobj(INLINE_GZIP_LEVEL, zlib.DEFLATED, 31) if accepts_gzip(
+        request.headers.get("accept-encoding")
+    ) else None
+
+    def next_chunk() -> Tuple[bytes, bool]:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return (compressor.flush() if compressor else b""), True
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        return (compressor.compress(chunk) if compressor else chunk), False
+
+    async def body():
+        try:
+            done = False
+            while not done:
+                data, done = await run_blocking(next_chunk)
+                if data:
+                    yield data
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except ValueError:
+                    # 客户端断开时生成器可能仍在线程中执行，由垃圾回收关闭
+                    pass
+
+    headers = {
+        "content-disposition": _content_disposition("inline", filename),
+        "cache-control": "no-store",
+        "vary": "Accept-Encoding",
+    }
+    if compressor is not None:
+        headers["content-encoding"] = "gzip"
+    return StreamingResponse(body(), media_type=media_type_for(filename), headers=headers, background=background)
@@ -0,0 +1,128 @@
+"""
+转换执行器
+把阻塞的GDAL / CSV转换从事件循环中移到有界的线程池或进程池执行，
+路由中 await 执行结果，转换期间 /health 等其它请求不受影响
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.log import request_id_var, setup_logging
+
+# 执行器类型
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+
+def _call_with_request_id(request_id: str, call: Callable[..., Any]) -> Any:
+    """进程池中执行：恢复请求ID，子进程中的日志与请求关联"""
+    request_id_var.set(request_id)
+    return call()
+
+
+class ConversionExecutor:
+    """
+    有界转换执行池
+
+    - 线程池：文件读写、嗅探等轻量阻塞操作，以及 CONVERSION_EXECUTOR=thread 时的转换
+    - 进程池：CONVERSION_EXECUTOR=process 时执行CPU密集的转换，避免GIL争用
+
+    池在第一次使用时创建，应用关闭时由 lifespan 调用 shutdown()。
+    """
+
+    def __init__(self, thread_workers: int, process_workers: int, cpu_executor: str = EXECUTOR_THREAD):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.cpu_executor = cpu_executor
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 已提交、尚未完成的调用数（只在事件循环中修改）
+        self._inflight = {EXECUTOR_THREAD: 0, EXECUTOR_PROCESS: 0}
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix="conversion"
+                )
+            return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._process_pool is None:
+                # 事件循环进程中有多个线程，fork 可能继承被占用的锁，统一使用 spawn
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=setup_logging,
+                )
+            return self._process_pool
+
+    def get_pool(self, cpu_bound: bool = False) -> Executor:
+        """cpu_bound 为 True 且配置为进程池时返回进程池，否则返回线程池"""
+        if cpu_bound and self.cpu_executor == EXECUTOR_PROCESS:
+            return self._get_process_pool()
+        return self._get_thread_pool()
+
+    async def run(self, func: Callable[..., Any], *args, cpu_bound: bool = False, **kwargs) -> Any:
+        """
+        在执行池中运行阻塞函数并等待结果
+
+        Args:
+            func: 阻塞函数；进程池模式下函数和参数必须可 pickle（模块级函数或静态方法）
+            cpu_bound: 是否为CPU密集的转换
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        pool = self.get_pool(cpu_bound)
+        if isinstance(pool, ProcessPoolExecutor):
+            kind = EXECUTOR_PROCESS
+            call = functools.partial(_call_with_request_id, request_id_var.get(), call)
+        else:
+            kind = EXECUTOR_THREAD
+            # 线程中沿用当前上下文（请求ID等）
+            call = functools.partial(contextvars.copy_context().run, call)
+        self._inflight[kind] += 1
+        try:
+            return await loop.run_in_executor(pool, call)
+        finally:
+            self._inflight[kind] -= 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各执行池的大小、已提交未完成的调用数和排队数（超出池大小的部分）"""
+        workers = {EXECUTOR_THREAD: self.thread_workers, EXECUTOR_PROCESS: self.process_workers}
+        return {
+            kind: {
+                "workers": workers[kind],
+                "inflight": inflight,
+                "queued": max(0, inflight - workers[kind]),
+            }
+            for kind, inflight in self._inflight.items()
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭执行池（之后再次使用会重新创建）"""
+        with self._lock:
+            pools = [self._thread_pool, self._process_pool]
+            self._thread_pool = self._process_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+executor = ConversionExecutor(
+    thread_workers=settings.conversion_thread_workers,
+    process_workers=settings.conversion_process_workers,
+    cpu_executor=settings.CONVERSION_EXECUTOR,
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args, cpu_bound: bool = False, **kwargs) -> Any:
+    """在全局转换执行池中运行阻塞函数"""
+    return await executor.run(func, *args, cpu_bound=cpu_bound, **kwargs)
@@ -0,0 +1,25 @@
+"""
+GDAL 检测
+第一次需要时才导入 osgeo 并缓存结果：导入应用（worker 启动、测试）时不加载 GDAL
+"""
+import logging
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def gdal_version() -> Optional[str]:
+    """已安装的 GDAL 版本，未安装（或无法加载）时为 None"""
+    try:
+        from osgeo import ogr
+    except ImportError:
+        logger.warning("GDAL not installed, some features will use Mock mode (see INSTALL_WINDOWS.md)")
+        return None
+    logger.info("GDAL %s is installed", ogr.__version__)
+    return ogr.__version__
+
+
+def gdal_available() -> bool:
+    return gdal_version() is not None
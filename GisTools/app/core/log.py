@@ -0,0 +1,180 @@
+"""
+日志
+统一的日志配置：按模块设置级别、文本或 JSON 格式、请求ID关联；
+逐行警告（如CSV中的无效行）只记录前若干条，其余计数后汇总输出
+"""
+import json
+import logging
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# 当前请求的ID，日志记录通过 RequestIdFilter 附带
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+REQUEST_ID_HEADER = "x-request-id"
+# 客户端传入的请求ID只接受安全字符，避免日志注入
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+
+class RequestIdFilter(logging.Filter):
+    """为日志记录附加当前请求ID"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行 JSON，便于日志系统检索"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """解析 "app.routers=DEBUG,app.services.csv_reader=WARNING" 形式的模块级别配置"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, levels: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """
+    配置日志输出（可重复调用，只保留一个处理器）
+
+    Args:
+        level: 全局级别，默认 settings.LOG_LEVEL
+        levels: 模块级别，默认 settings.LOG_LEVELS
+        fmt: text 或 json，默认 settings.LOG_FORMAT
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, "_gistools", False):
+            root.removeHandler(handler)
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler._gistools = True
+    handler.addFilter(RequestIdFilter())
+    if (fmt or settings.LOG_FORMAT) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+
+    for name, module_level in parse_levels(settings.LOG_LEVELS if levels is None else levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+class RowWarnings:
+    """
+    逐行警告限流
+
+    每种原因只记录前 limit 条，其余只计数；summary() 汇总输出被跳过的行数。
+    未达到 WARNING 级别时 warn() 只做一次字典计数。
+    """
+
+    __slots__ = ("logger", "label", "limit", "counts", "_enabled")
+
+    def __init__(self, logger: logging.Logger, label: str = "", limit: Optional[int] = None):
+        self.logger = logger
+        self.label = label
+        self.limit = settings.ROW_WARNING_LIMIT if limit is None else limit
+        self.counts: Dict[str, int] = {}
+        self._enabled = logger.isEnabledFor(logging.WARNING)
+
+    def warn(self, reason: str, row_no: int, count: int = 1) -> None:
+        """记录 count 行因 reason 被跳过，row_no 为（第一个）行号"""
+        seen = self.counts.get(reason, 0)
+        self.counts[reason] = seen + count
+        if self._enabled and seen < self.limit:
+            if count > 1:
+                self.logger.warning("%s %d 起 %d 行%s", self.label, row_no, count, reason)
+            else:
+                self.logger.warning("%s %d %s", self.label, row_no, reason)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> None:
+        """输出被跳过的行数汇总（没有被跳过的行时不输出）"""
+        if not self.counts or not self._enabled:
+            return
+        detail = "，".join(f"{reason} {count} 行" for reason, count in self.counts.items())
+        suppressed = sum(max(0, count - self.limit) for count in self.counts.values())
+        self.logger.warning(
+            "%s共跳过 %d 行（%s）%s", self.label, self.total, detail,
+            f"，其中 {suppressed} 行未逐条记录" if suppressed else ""
+        )
+
+
+class RequestIdMiddleware:
+    """
+    请求ID
+
+    使用客户端传入的 X-Request-ID（格式合法时），否则生成新的ID；
+    在请求处理期间写入 request_id_var，并在响应头中返回
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.logger = logging.getLogger("app.request")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (REQUEST_ID_HEADER.encode(), request_id.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.logger.debug(
+                "%s %s %d %.1fms", scope["method"], scope["path"], status,
+                (time.perf_counter() - started) * 1000
+            )
+            request_id_var.reset(token)
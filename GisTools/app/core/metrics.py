@@ -0,0 +1,312 @@
+"""
+运行指标
+进程内的计数器 / 仪表 / 直方图，以 Prometheus 文本格式从 /metrics 输出；
+记录一次观测只是加锁后的几次加法，可以在生产环境中一直开启
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 请求耗时直方图的桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 转换耗时直方图的桶（秒）
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# 转换吞吐量直方图的桶（要素/秒）
+THROUGHPUT_BUCKETS = (100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+# 转换内存直方图的桶（字节）
+MEMORY_BUCKETS = tuple(mb * 1048576 for mb in (1, 4, 16, 64, 128, 256, 512, 1024, 2048, 4096, 8192))
+
+# 未匹配到路由的请求使用的标签，避免任意路径产生无限多的时间序列
+UNMATCHED_ROUTE = "<unmatched>"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """
+    当前值
+
+    提供 collect 时在输出时调用 collect() 取值（返回 {标签值: 值}），用于队列长度、磁盘占用等状态
+    """
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def render(self) -> List[str]:
+        if self.collect is not None:
+            values = self.collect()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items()) if value is not None
+        ]
+
+
+class Histogram(_Metric):
+    """分桶统计（累计桶在输出时计算，记录时只增加一个桶）"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 → [各桶计数..., +Inf 桶计数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        state = self._values.get(labelvalues)
+        return int(sum(state[:-1])) if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        lines = self._header()
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              collect: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus 文本格式（可能调用仪表的 collect，在执行池中调用）"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "gistools_http_requests_total", "HTTP requests", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "gistools_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+conversions = registry.counter(
+    "gistools_conversions_total", "Conversions by outcome (success / failure / cached)", ("converter", "outcome")
+)
+conversion_duration = registry.histogram(
+    "gistools_conversion_duration_seconds", "Conversion wall time", ("converter",), DURATION_BUCKETS
+)
+conversion_throughput = registry.histogram(
+    "gistools_conversion_features_per_second", "Conversion throughput", ("converter",), THROUGHPUT_BUCKETS
+)
+conversion_features = registry.counter(
+    "gistools_conversion_features_total", "Features written by conversions", ("converter",)
+)
+conversion_input_bytes = registry.counter(
+    "gistools_conversion_input_bytes_total", "Input bytes read by conversions", ("converter",)
+)
+conversion_output_bytes = registry.counter(
+    "gistools_conversion_output_bytes_total", "Output bytes written by conversions", ("converter",)
+)
+conversion_cpu_seconds = registry.counter(
+    "gistools_conversion_cpu_seconds_total", "CPU time spent in conversions", ("converter",)
+)
+conversion_queued = registry.histogram(
+    "gistools_conversion_queued_seconds", "Time conversions waited for an executor worker", ("converter",),
+    DURATION_BUCKETS
+)
+conversion_rss_increase = registry.histogram(
+    "gistools_conversion_rss_increase_bytes", "Growth of the executing process's peak RSS during a conversion",
+    ("converter",), MEMORY_BUCKETS
+)
+conversion_tracemalloc_peak = registry.histogram(
+    "gistools_conversion_tracemalloc_peak_bytes", "Peak Python heap during a conversion (CONVERSION_TRACEMALLOC)",
+    ("converter",), MEMORY_BUCKETS
+)
+cache_lookups = registry.counter(
+    "gistools_cache_lookups_total", "Result cache lookups in this process", ("result",)
+)
+
+
+def observe_cache_lookup(converter: str, hit: bool) -> None:
+    """记录一次结果缓存查找，命中时计为一次 cached 转换"""
+    cache_lookups.inc("hit" if hit else "miss")
+    if hit:
+        conversions.inc(converter, "cached")
+
+
+def observe_resource_usage(converter: str, stats: dict) -> None:
+    """记录一次转换 / 验证的CPU时间、排队时间和内存占用（见 app/core/resource_usage.py）"""
+    conversion_cpu_seconds.inc(converter, amount=stats["cpu_seconds"])
+    conversion_queued.observe(stats["queued_seconds"], converter)
+    if stats.get("rss_increase_bytes") is not None:
+        conversion_rss_increase.observe(stats["rss_increase_bytes"], converter)
+    if stats.get("tracemalloc_peak_bytes") is not None:
+        conversion_tracemalloc_peak.observe(stats["tracemalloc_peak_bytes"], converter)
+
+
+def observe_conversion(converter: str, elapsed: float, result: dict, input_bytes: int) -> None:
+    """记录一次实际执行的转换（命中缓存的不计入耗时和吞吐量）"""
+    if not result.get("success"):
+        conversions.inc(converter, "failure")
+        return
+    conversions.inc(converter, "success")
+    conversion_duration.observe(elapsed, converter)
+    features = result.get("feature_count") or 0
+    conversion_features.inc(converter, amount=features)
+    if elapsed > 0:
+        conversion_throughput.observe(features / elapsed, converter)
+    conversion_input_bytes.inc(converter, amount=input_bytes)
+    conversion_output_bytes.inc(converter, amount=result.get("file_size") or 0)
+
+
+class MetricsMiddleware:
+    """
+    按路由记录请求数和耗时
+
+    路由标签使用路由模板（如 /api/jobs/{job_id}），不使用实际路径；耗时到响应发送完为止
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route_label(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in getattr(scope.get("app"), "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            path = self._route_paths[endpoint] = path or UNMATCHED_ROUTE
+        return path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route_label(scope)
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status))
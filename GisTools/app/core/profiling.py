@@ -0,0 +1,109 @@
+"""
+按请求开启的转换性能分析
+转换接口带 profile=true（并提供管理员令牌）时，在执行池中用分析器包装转换函数，
+分析结果写在输出文件旁边（同名加 .pstats / .collapsed 后缀），可以在上传文件被清理后继续分析。
+未开启时转换不经过这里，没有额外开销
+"""
+import collections
+import cProfile
+import hmac
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+# 分析器 → 分析结果文件后缀
+#   cprofile：确定性分析，pstats 格式（python -m pstats / snakeviz 查看）
+#   sampling：定时采样执行线程的调用栈，collapsed stack 格式（flamegraph.pl / speedscope 生成火焰图）
+PROFILE_EXTS = {"cprofile": ".pstats", "sampling": ".collapsed"}
+
+# 管理员令牌请求头
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def require_admin(request: Request) -> None:
+    """检查管理员令牌，未配置 ADMIN_TOKEN 或令牌不匹配时返回 403"""
+    token = request.headers.get(ADMIN_TOKEN_HEADER, "")
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="需要管理员令牌")
+
+
+def is_profile_file(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in PROFILE_EXTS.values()
+
+
+def profile_path_for(output_path: str) -> str:
+    """输出文件对应的分析结果路径"""
+    return output_path + PROFILE_EXTS[settings.PROFILER]
+
+
+class StackSampler:
+    """在后台线程中定时采样指定线程的调用栈，按调用栈计数"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, path: str) -> None:
+        """写出 collapsed stack 格式：每行 “调用栈（; 分隔，外层在前） 采样次数”"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def run_profiled(profile_path: str, profiler: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在分析器下执行函数并写出分析结果（在执行池中调用，模块级函数可以提交到进程池）
+
+    只分析执行函数的线程：CSV 并行解析的子进程不在分析结果中
+
+    Args:
+        profile_path: 分析结果文件路径
+        profiler: cprofile 或 sampling
+    """
+    if profiler == "sampling":
+        sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            sampler.write(profile_path)
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args, **kwargs)
+    finally:
+        profile.dump_stats(profile_path)
+
+
+def profile_url(profile_path: Optional[str]) -> Optional[str]:
+    """分析结果的下载地址（下载时同样需要管理员令牌）"""
+    if not profile_path or not os.path.exists(profile_path):
+        return None
+    return f"/api/download/{os.path.basename(profile_path)}"
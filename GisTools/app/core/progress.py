@@ -0,0 +1,80 @@
+"""
+转换进度
+转换服务在写出要素时调用 ProgressReporter.update()，每 N 个要素才回调一次，
+未设置回调时 update() 只做一次整数比较
+"""
+import math
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class ProgressReporter:
+    """
+    进度计数器
+
+    回调参数为进度事件字典：
+    features（已写出要素数）、total（要素总数，未知为 None）、bytes（已读取字节数）、
+    total_bytes（输入文件大小）、elapsed（秒）、features_per_second、bytes_per_second、
+    percent（0~100，未知为 None）、eta_seconds（预计剩余秒数，未知为 None）、done
+    """
+
+    __slots__ = ("callback", "total", "total_bytes", "every", "started", "_next")
+
+    def __init__(
+        self, callback: Optional[ProgressCallback], total: Optional[int] = None,
+        total_bytes: Optional[int] = None, every: Optional[int] = None
+    ):
+        self.callback = callback
+        self.total = total
+        self.total_bytes = total_bytes
+        self.every = max(1, every or settings.PROGRESS_EVERY)
+        self.started = time.perf_counter()
+        # 没有回调时永远不会达到下一个回调点
+        self._next = self.every if callback is not None else math.inf
+
+    def update(self, features: int, bytes_read: Optional[int] = None) -> None:
+        """记录已写出的要素数（累计值），每 every 个要素回调一次"""
+        if features < self._next:
+            return
+        self._next = features + self.every
+        self.callback(self.event(features, bytes_read, done=False))
+
+    def finish(self, features: int, bytes_read: Optional[int] = None) -> None:
+        """转换结束时回调最终进度"""
+        if self.callback is not None:
+            self.callback(self.event(features, bytes_read, done=True))
+
+    def event(self, features: int, bytes_read: Optional[int], done: bool) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        if done and bytes_read is None:
+            bytes_read = self.total_bytes
+
+        # 优先按要素总数估算，其次按已读取的字节比例估算
+        fraction = None
+        if done:
+            fraction = 1.0
+        elif self.total:
+            fraction = min(1.0, features / self.total)
+        elif self.total_bytes and bytes_read is not None:
+            fraction = min(1.0, bytes_read / self.total_bytes)
+
+        eta = None
+        if fraction is not None and fraction > 0:
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+
+        return {
+            "features": features,
+            "total": self.total,
+            "bytes": bytes_read,
+            "total_bytes": self.total_bytes,
+            "elapsed": round(elapsed, 3),
+            "features_per_second": round(features / elapsed, 1) if elapsed > 0 else None,
+            "bytes_per_second": round(bytes_read / elapsed, 1) if elapsed > 0 and bytes_read else None,
+            "percent": round(fraction * 100, 1) if fraction is not None else None,
+            "eta_seconds": eta,
+            "done": done,
+        }
@@ -0,0 +1,84 @@
+"""
+转换资源统计
+在执行池中（线程或进程）包装转换函数，测量实际执行的耗时、CPU时间和内存峰值，
+用于判断哪些上传文件开销大、估算 worker 和执行池的大小
+"""
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_tracemalloc_lock = threading.Lock()
+# 正在用 tracemalloc 统计的转换数（同一进程中的并发转换共用一次跟踪）
+_tracemalloc_users = 0
+
+
+def peak_rss() -> Optional[int]:
+    """当前进程的峰值常驻内存（字节），Windows 上返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _start_tracemalloc() -> int:
+    """开始统计，返回当前已跟踪的内存（作为本次转换的起点）"""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracemalloc(baseline: int) -> int:
+    """结束统计，返回本次转换期间的峰值（并发转换的分配也会计入）"""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+    return max(0, peak - baseline)
+
+
+def measure(func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, Dict[str, Any]]:
+    """
+    执行函数并测量资源占用（在执行池中调用，模块级函数可以提交到进程池）
+
+    - wall_seconds / cpu_seconds：执行耗时和执行线程的CPU时间（不含并行解析子进程）
+    - peak_rss_bytes：执行进程的峰值常驻内存；rss_increase_bytes：本次执行使该峰值增长的量
+      （线程池模式下是整个服务进程，并发的转换互相影响）
+    - tracemalloc_peak_bytes：CONVERSION_TRACEMALLOC=True 时 Python / numpy 分配的峰值
+      （不含GDAL的内存；跟踪会使转换变慢，只在排查问题时开启）
+
+    Returns:
+        (函数返回值, 资源占用)
+    """
+    baseline = _start_tracemalloc() if settings.CONVERSION_TRACEMALLOC else None
+    rss_before = peak_rss()
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        wall = time.perf_counter() - started
+        cpu = time.thread_time() - cpu_started
+        tracemalloc_peak = _stop_tracemalloc(baseline) if baseline is not None else None
+    rss_after = peak_rss()
+    return result, {
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "peak_rss_bytes": rss_after,
+        "rss_increase_bytes": rss_after - rss_before if rss_after is not None else None,
+        "tracemalloc_peak_bytes": tracemalloc_peak,
+    }
@@ -0,0 +1,143 @@
+"""
+单飞（single-flight）请求合并
+相同键的转换同一时间只执行一次，其余请求等待它完成后读取结果缓存；
+进程内用 asyncio.Lock 排队，跨 uvicorn worker 进程用 LOCK_DIR 下的文件锁
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 等待其它进程释放文件锁时的轮询间隔（秒）
+LOCK_POLL_INTERVAL = 0.2
+
+
+class FileLock:
+    """非阻塞的独占文件锁（进程退出时由操作系统自动释放）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def try_acquire(self) -> bool:
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        # 打开和加锁之间锁文件可能已被持有者或清理任务删除，锁住的是已删除的文件，需要重新获取
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(fd)
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.release()
+            return False
+        # 修改时间记录最近一次使用，清理任务据此判断锁文件是否过期
+        os.utime(self.path)
+        return True
+
+    def release(self, remove: bool = False) -> None:
+        """
+        释放锁
+
+        Args:
+            remove: 是否删除锁文件。只应在结果已写入缓存后删除：之后到达的请求即使拿到新的锁文件，
+                也会先查到缓存结果，不会重复转换
+        """
+        if self._fd is None:
+            return
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+
+class SingleFlight:
+    """按键合并并发执行"""
+
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[FileLock]:
+        """
+        持有键对应的锁；同一键的其它调用（本进程或其它进程）在此等待
+
+        调用方在锁内先查缓存，未命中再执行转换并写入缓存。
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                os.makedirs(self.lock_dir, exist_ok=True)
+                file_lock = FileLock(os.path.join(self.lock_dir, f"{key}.lock"))
+                while not file_lock.try_acquire():
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+                try:
+                    yield file_lock
+                finally:
+                    file_lock.release()
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    def waiting(self, key: str) -> int:
+        """本进程中正在等待或持有该键的调用数"""
+        return self._waiters.get(key, 0)
+
+
+def remove_stale_locks(lock_dir: str, older_than: float) -> List[str]:
+    """
+    删除 lock_dir 下修改时间早于 older_than 且未被持有的锁文件（转换失败或不写缓存时遗留的）
+
+    Returns:
+        删除的锁文件路径
+    """
+    removed = []
+    try:
+        entries = list(os.scandir(lock_dir))
+    except FileNotFoundError:
+        return removed
+    for entry in entries:
+        if not entry.name.endswith(".lock") or not entry.is_file(follow_symlinks=False):
+            continue
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= older_than:
+                continue
+        except FileNotFoundError:
+            continue
+        lock = FileLock(entry.path)
+        # 持有锁时删除：之后获取到已删除文件的等待者会重新打开锁文件
+        if lock.try_acquire():
+            lock.release(remove=True)
+            removed.append(entry.path)
+    return removed
+
+
+single_flight = SingleFlight(settings.LOCK_DIR)
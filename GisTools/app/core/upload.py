@@ -0,0 +1,134 @@
+"""
+上传处理
+按固定大小的块异步保存上传文件，边写边计算 SHA-256，并在数据到达时检查大小限制
+"""
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# 每次读写的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# multipart 表单除文件内容外的开销（边界、表头、其它表单字段）
+MULTIPART_OVERHEAD = 64 * 1024
+
+# 批量转换接口的路径前缀，请求体最多包含 MAX_FILE_COUNT 个文件
+BATCH_PATH_PREFIX = "/api/batch"
+
+
+def request_size_limit(path: str) -> int:
+    """请求路径允许的上传内容大小：单文件接口为 MAX_UPLOAD_SIZE，批量接口为 MAX_FILE_COUNT 倍"""
+    if path.startswith(BATCH_PATH_PREFIX):
+        return settings.MAX_UPLOAD_SIZE * settings.MAX_FILE_COUNT
+    return settings.MAX_UPLOAD_SIZE
+
+
+@dataclass
+class SavedUpload:
+    """已保存的上传文件"""
+    path: str
+    size: int
+    sha256: str
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"上传文件超过大小限制 ({limit} bytes)")
+
+
+async def save_upload(
+    file: UploadFile, path: str, max_size: Optional[int] = None, cleanup_dir: Optional[str] = None
+) -> SavedUpload:
+    """
+    分块保存上传文件
+
+    Args:
+        file: 上传文件
+        path: 保存路径
+        max_size: 大小限制（字节），默认 settings.MAX_UPLOAD_SIZE
+        cleanup_dir: 超出限制时一并删除的临时目录（默认只删除已写入的部分文件）
+
+    Returns:
+        SavedUpload（路径、大小、SHA-256）
+
+    Raises:
+        HTTPException: 413 文件超过大小限制
+    """
+    limit = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    if file.size is not None and file.size > limit:
+        _discard(path, cleanup_dir)
+        raise _too_large(limit)
+
+    digest = hashlib.sha256()
+    size = 0
+    async with aiofiles.open(path, "wb") as buffer:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                break
+            digest.update(chunk)
+            await buffer.write(chunk)
+
+    if size > limit:
+        _discard(path, cleanup_dir)
+        raise _too_large(limit)
+
+    return SavedUpload(path=path, size=size, sha256=digest.hexdigest())
+
+
+def _discard(path: str, cleanup_dir: Optional[str]) -> None:
+    if cleanup_dir:
+        shutil.rmtree(cleanup_dir, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    请求体大小限制
+
+    Content-Length 超限时不读取请求体直接返回 413；分块传输（无 Content-Length）时
+    在请求体到达过程中计数，超限即中止解析。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        max_size = request_size_limit(scope["path"])
+        limit = max_size + MULTIPART_OVERHEAD
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = JSONResponse({"detail": _too_large(max_size).detail}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(max_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
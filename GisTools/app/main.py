@@ -1,42 +1,79 @@
 """
 GIS工具箱 - 后端服务主入口
 """
-import uvicorn
-from fastapi import FastAPI
+import logging
+import os
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.routers import shp_convert, geojson_convert, csv_convert
-
-# 检查 GDAL 是否安装
-try:
-    from osgeo import ogr
-    GDAL_VERSION = ogr.__version__
-    print(f"[INFO] GDAL {GDAL_VERSION} is installed")
-except ImportError:
-    GDAL_VERSION = None
-    print("[WARNING] GDAL not installed, some features will use Mock mode")
-    print("[INFO] See INSTALL_WINDOWS.md to install GDAL")
+from app.core.log import RequestIdMiddleware, setup_logging
+from app.core.admission import AdmissionControlMiddleware
+from app.core import cluster, profiling
+from app.core.download import file_response, resolve_download_path
+from app.core.executor import executor, run_blocking
+from app.core.gdal import gdal_version
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.upload import UploadSizeLimitMiddleware
+from app.routers import shp_convert, geojson_convert, csv_convert, jobs, batch
+from app.services.janitor import janitor
+from app.services.job_service import job_manager
+from app.services.result_cache import get_result_cache, output_sha256
+from app.services import runtime_metrics  # noqa: F401  注册运行状态指标
+
+# 导入完成后立即配置日志（各模块导入时不输出日志，GDAL 等在第一次使用时才加载）
+setup_logging()
+
+logger = logging.getLogger(__name__)
 
 
 # 生命周期管理
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时执行
-    print("[INFO] GisTools backend service starting...")
+    logger.info("GisTools backend service starting...")
+    settings.ensure_dirs()
+    logger.debug(
+        "UPLOAD_DIR: %s, TEMP_DIR: %s", os.path.abspath(settings.UPLOAD_DIR), os.path.abspath(settings.TEMP_DIR)
+    )
+    await job_manager.start()
+    await cluster.leader.start()
     yield
-    # 关闭时执行
-    print("[INFO] GisTools backend service stopped")
+    # 关闭时执行：停止领取任务，等待进行中的转换结束并释放执行池
+    await cluster.leader.stop()
+    await job_manager.stop()
+    executor.shutdown(wait=True)
+    logger.info("GisTools backend service stopped")
+
+# 多 worker 时文件清理和中断任务恢复只在选举出的主 worker 中运行
+if settings.JANITOR_ENABLED:
+    # 服务启动时选出的主 worker 清理上次运行遗留的全部临时目录；
+    # 接替退出的主 worker 时其它 worker 可能正在使用临时目录，只按 TEMP_TTL 清理
+    cluster.leader.add_service(
+        lambda: janitor.start(cluster.SERVER_STARTED if cluster.leader.elected_at_startup else None),
+        janitor.stop,
+    )
+cluster.leader.add_service(
+    lambda: job_manager.start_recovery(settings.JOB_RECOVERY_INTERVAL), job_manager.stop_recovery
+)
 
 # 创建FastAPI应用
 app = FastAPI(
     title="GisTools API",
-    description=f"GIS工具箱后端服务API {'(GDAL ' + GDAL_VERSION + ')' if GDAL_VERSION else '(GDAL Mock Mode)'}",
+    description="GIS工具箱后端服务API（未安装GDAL时部分功能使用 Mock 模式，见 /health）",
     version="1.0.0",
     lifespan=lifespan
 )
 
+# 准入控制（在大小检查之后，超限的请求不占用排队名额）
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
+# 上传大小限制（请求体到达时检查，超限返回413；先于CORS添加，413响应也带CORS头）
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -44,16 +81,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# 按路由记录请求数和耗时
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 请求ID（最外层，CORS 和 413 响应也带 X-Request-ID，日志可按请求关联）
+app.add_middleware(RequestIdMiddleware)
+
+
 # 根路由
 @app.get("/")
 async def root():
+    # 第一次调用时才导入GDAL（在执行池中，不阻塞事件循环）
+    gdal = await run_blocking(gdal_version)
     return {
         "message": "GisTools API",
         "version": "1.0.0",
-        "gdal_version": GDAL_VERSION,
-        "gdal_installed": GDAL_VERSION is not None,
+        "gdal_version": gdal,
+        "gdal_installed": gdal is not None,
         "docs": "/docs",
         "tools": [
             "/api/shp/to-geojson",
@@ -66,58 +114,74 @@ async def root():
 # 健康检查
 @app.get("/health")
 async def health_check():
+    gdal = await run_blocking(gdal_version)
     return {
         "status": "healthy",
-        "gdal_installed": GDAL_VERSION is not None,
-        "gdal_version": GDAL_VERSION
+        "gdal_installed": gdal is not None,
+        "gdal_version": gdal
     }
 
 
 # 下载路由（全局）
 @app.get("/api/download/{filename}")
-async def download_file(filename: str):
-    """下载转换后的文件"""
-    import os
-    from fastapi.responses import FileResponse
-    from fastapi import HTTPException
-
-    # 使用绝对路径
-    upload_dir = os.path.abspath(settings.UPLOAD_DIR)
-    file_path = os.path.join(upload_dir, filename)
-
-    print(f"[下载] 请求文件: {filename}")
-    print(f"[下载] 上传目录: {upload_dir}")
-    print(f"[下载] 文件路径: {file_path}")
-    print(f"[下载] 文件存在: {os.path.exists(file_path)}")
-
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="文件不存在")
-
-    return FileResponse(
-        file_path,
-        media_type="application/json",
-        filename=filename
+@app.head("/api/download/{filename}", include_in_schema=False)
+async def download_file(filename: str, request: Request):
+    """
+    下载转换后的文件
+
+    支持 Range 断点续传（206），If-None-Match 匹配 ETag 时返回 304（已缓存的结果为文件内容的 SHA-256）；
+    性能分析结果（.pstats / .collapsed）需要 X-Admin-Token 请求头
+    """
+    if profiling.is_profile_file(filename):
+        profiling.require_admin(request)
+    return await file_response(
+        request, resolve_download_path(settings.UPLOAD_DIR, filename), sha256_lookup=output_sha256
     )
 
 
+# 结果缓存统计
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """结果缓存统计：条目数、占用空间、命中 / 未命中次数和命中率"""
+    cache = get_result_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await run_blocking(cache.stats))}
+
+
+# 运行指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 文本格式的运行指标（METRICS_ENABLED=False 时返回 404）"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # 部分指标（目录占用、缓存统计）需要读磁盘，在执行池中生成
+    body = await run_blocking(registry.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # 注册路由
 app.include_router(shp_convert.router, prefix="/api/shp", tags=["Shapefile转换"])
 app.include_router(geojson_convert.router, prefix="/api/geojson", tags=["GeoJSON处理"])
 app.include_router(csv_convert.router, prefix="/api/csv", tags=["CSV转换"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["异步任务"])
+app.include_router(batch.router, prefix="/api/batch", tags=["批量转换"])
 
-# 打印所有路由
-print("\n[INFO] 已注册的路由:")
-for route in app.routes:
-    if hasattr(route, 'path') and hasattr(route, 'methods'):
-        print(f"  {route.methods} {route.path}")
-print()
+# 记录所有路由
+if logger.isEnabledFor(logging.DEBUG):
+    logger.debug("已注册的路由:")
+    for route in app.routes:
+        if hasattr(route, 'path') and hasattr(route, 'methods'):
+            logger.debug("  %s %s", route.methods, route.path)
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.RELOAD,
-        log_level="info"
+        workers=settings.workers,
+        log_level=settings.LOG_LEVEL.lower()
     )
-
@@ -0,0 +1,194 @@
+"""
+批量转换路由
+一次上传多个文件（或一个包含多个数据集的zip），在转换执行池中并发转换，
+返回逐个文件的结果清单和一个打包全部结果的zip下载链接
+"""
+import asyncio
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.upload import request_size_limit, save_upload, BATCH_PATH_PREFIX
+from app.routers.jobs import JOB_TYPES, build_params
+from app.services import converters
+from app.services.batch_service import Dataset, SHP_SIDECAR_EXTS, build_zip, extract_zip, find_datasets
+from app.services.job_service import job_manager
+from app.services.result_cache import convert_cached
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class BatchItem(BaseModel):
+    """单个数据集的转换结果"""
+    name: str
+    success: bool
+    feature_count: int = 0
+    file_size: int = 0
+    cached: bool = False
+    elapsed: float = 0.0
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+    # 本次转换的资源统计，命中缓存时为空
+    stats: Optional[dict] = None
+
+
+class BatchResponse(BaseModel):
+    """批量转换响应模型"""
+    batch_id: str
+    kind: str
+    total: int
+    succeeded: int
+    failed: int
+    elapsed: float
+    download_url: Optional[str] = None
+    zip_size: int = 0
+    results: List[BatchItem]
+
+
+async def _save_inputs(files: List[UploadFile], input_dir: str, input_exts: tuple) -> List[Dataset]:
+    """保存上传文件（zip则解压），整理为数据集"""
+    max_size = request_size_limit(BATCH_PATH_PREFIX)
+    if len(files) == 1 and files[0].filename.lower().endswith(".zip"):
+        zip_path = os.path.join(os.path.dirname(input_dir), "upload.zip")
+        await save_upload(files[0], zip_path, max_size=max_size)
+        try:
+            paths = await run_blocking(extract_zip, zip_path, input_dir, max_size)
+        finally:
+            os.remove(zip_path)
+        return await run_blocking(find_datasets, paths, input_exts)
+
+    allowed = input_exts + (SHP_SIDECAR_EXTS if ".shp" in input_exts else ())
+    hashes = {}
+    for file in files:
+        name = os.path.basename(file.filename or "")
+        if not name.lower().endswith(allowed):
+            raise HTTPException(status_code=400, detail=f"不支持的文件: {file.filename}，可选: {'、'.join(allowed)}")
+        path = os.path.join(input_dir, name)
+        if path in hashes:
+            raise HTTPException(status_code=400, detail=f"文件名重复: {name}")
+        hashes[path] = (await save_upload(file, path)).sha256
+    return await run_blocking(find_datasets, list(hashes), input_exts, hashes)
+
+
+@router.post("/convert", response_model=BatchResponse)
+async def batch_convert(
+    kind: str,
+    files: List[UploadFile] = File(...),
+    encoding: Optional[str] = None,
+    x_field: Optional[str] = None,
+    y_field: Optional[str] = None,
+    delimiter: Optional[str] = None,
+    geometry_field: Optional[str] = None,
+):
+    """
+    批量转换
+
+    - **kind**: 转换类型，同 /api/jobs（shp-to-geojson / geojson-to-shp / csv-to-geojson 等）
+    - **files**: 最多 MAX_FILE_COUNT 个数据集；Shapefile 可同时上传同名的 .shx / .dbf / .prj 等关联文件。
+      也可以只上传一个 zip，其中的每个数据集分别转换
+    - **encoding** / **x_field** / **y_field** / **delimiter** / **geometry_field**: 应用于每个文件，
+      CSV 未指定的参数逐个文件自动识别
+
+    所有数据集在转换执行池中并发转换，总耗时接近最慢的单个文件；单个文件失败不影响其它文件。
+    """
+    if kind not in JOB_TYPES or kind not in job_manager.kinds or not await run_blocking(converters.supports, kind):
+        raise HTTPException(status_code=400, detail=f"不支持的转换类型: {kind}，可选: {job_manager.kinds}")
+    input_exts, output_ext = JOB_TYPES[kind]
+
+    started = time.perf_counter()
+    batch_id = str(uuid.uuid4())
+    temp_dir = os.path.join(settings.TEMP_DIR, batch_id)
+    input_dir = os.path.join(temp_dir, "input")
+    os.makedirs(input_dir, exist_ok=True)
+    logger.debug("%s (%s): %s 个上传文件", batch_id, kind, len(files))
+
+    try:
+        try:
+            datasets = await _save_inputs(files, input_dir, input_exts)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not datasets:
+            raise HTTPException(status_code=400, detail=f"没有可转换的{'或'.join(input_exts)}文件")
+        if len(datasets) > settings.MAX_FILE_COUNT:
+            raise HTTPException(
+                status_code=400, detail=f"数据集数量 {len(datasets)} 超过上限 {settings.MAX_FILE_COUNT}"
+            )
+
+        handler = job_manager.handler(kind)
+
+        async def convert(index: int, dataset: Dataset) -> Tuple[BatchItem, Optional[str]]:
+            item_started = time.perf_counter()
+            stem = os.path.splitext(dataset.name)[0]
+            output_path = os.path.join(settings.UPLOAD_DIR, f"{batch_id}_{index}_{stem}{output_ext}")
+            try:
+                params = await build_params(
+                    kind, dataset.path, encoding, x_field, y_field, delimiter, geometry_field
+                )
+                result, cached = await convert_cached(
+                    kind, handler, dataset.path, output_path, dataset.sha256, **params
+                )
+            except Exception as e:
+                result, cached = {"success": False, "error": str(e)}, False
+            elapsed = round(time.perf_counter() - item_started, 3)
+            if not result.get("success"):
+                return BatchItem(name=dataset.name, success=False, elapsed=elapsed, error=result.get("error")), None
+            return BatchItem(
+                name=dataset.name,
+                success=True,
+                feature_count=result.get("feature_count", 0),
+                file_size=result.get("file_size", 0),
+                cached=cached,
+                elapsed=elapsed,
+                download_url=f"/api/download/{os.path.basename(result['output_path'])}",
+                stats=result.get("stats"),
+            ), result["output_path"]
+
+        outcomes = await asyncio.gather(*[convert(i, dataset) for i, dataset in enumerate(datasets)])
+    finally:
+        await run_blocking(shutil.rmtree, temp_dir, ignore_errors=True)
+
+    results, outputs = [], []
+    used_names = set()
+    for dataset, (item, output_path) in zip(datasets, outcomes):
+        results.append(item)
+        if output_path is None:
+            continue
+        # zip 内保留数据集在上传zip中的相对路径，重名时加序号
+        relative = os.path.relpath(dataset.path, input_dir)
+        arcname = os.path.splitext(relative)[0] + output_ext
+        suffix = 1
+        while arcname.lower() in used_names:
+            suffix += 1
+            arcname = f"{os.path.splitext(relative)[0]}_{suffix}{output_ext}"
+        used_names.add(arcname.lower())
+        outputs.append((output_path, arcname))
+
+    succeeded = sum(item.success for item in results)
+    response = BatchResponse(
+        batch_id=batch_id,
+        kind=kind,
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        elapsed=0.0,
+        results=results,
+    )
+    if outputs:
+        zip_name = f"{batch_id}_batch.zip"
+        manifest = response.model_dump(exclude={"download_url", "zip_size", "elapsed"})
+        response.zip_size = await run_blocking(
+            build_zip, os.path.join(settings.UPLOAD_DIR, zip_name), outputs, manifest
+        )
+        response.download_url = f"/api/download/{zip_name}"
+    response.elapsed = round(time.perf_counter() - started, 3)
+    logger.info("%s 完成: %s/%s 成功, 耗时 %ss", batch_id, succeeded, len(results), response.elapsed)
+    return response
@@ -1,21 +1,27 @@
 """
 CSV转换路由
-提供CSV到SHP的转换API接口
+提供CSV到SHP / GeoJSON / GeoParquet的转换API接口
 """
+import logging
 import os
 import shutil
 import uuid
+from typing import Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
 from app.core.config import settings
+from app.core.download import stream_response
+from app.core.executor import run_blocking
+from app.core.profiling import profile_path_for, profile_url, require_admin
+from app.core.upload import save_upload
+from app.services import converters
+from app.services.result_cache import convert_cached
+from app.services.csv_export import CsvExporter
+from app.services.csv_sniffer import SNIFF_PREFIX_SIZE, resolve_csv_params, sniff_csv, sniff_csv_file
 
-# 尝试导入真实服务，如果失败则使用Mock版本
-try:
-    from app.services.csv_service import CsvConverter
-    print("[INFO] Using GDAL service for CSV")
-except ImportError:
-    print("[WARNING] GDAL not installed, CSV conversion not available")
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -27,80 +33,257 @@ class ConversionResponse(BaseModel):
     feature_count: int = 0
     file_size: int = 0
     download_url: str = None
-    x_field: str = None
-    y_field: str = None
+    x_field: Optional[str] = None
+    y_field: Optional[str] = None
+    geometry_field: Optional[str] = None
+    geometry_type: Optional[str] = None
+    encoding: str = None
+    delimiter: str = None
+    cached: bool = False
     error: str = None
+    # 本次转换的资源统计（耗时、CPU时间、内存峰值、要素数、输入 / 输出字节数），命中缓存时为空
+    stats: Optional[dict] = None
+    # 性能分析结果的下载地址（profile=true 时）
+    profile_url: Optional[str] = None
+
+
+class InspectResponse(BaseModel):
+    """CSV嗅探响应模型"""
+    success: bool
+    encoding: str | None = None
+    delimiter: str | None = None
+    headers: list = []
+    x_field: str | None = None
+    y_field: str | None = None
+    geometry_field: str | None = None
+    coordinate_system: str | None = None
+    sample_rows: int = 0
+    numeric_fields: dict = {}
+    warnings: list = []
+    error: str | None = None
+
+
+@router.post("/inspect", response_model=InspectResponse)
+async def inspect_csv(file: UploadFile = File(...)):
+    """
+    嗅探CSV文件：识别编码、分隔符和坐标字段
+
+    - **file**: CSV文件（只读取开头 64KB，前端可以只上传文件开头的切片）
+    """
+    if not file.filename.lower().endswith('.csv'):
+        raise HTTPException(status_code=400, detail="只支持.csv文件")
+
+    prefix = await file.read(SNIFF_PREFIX_SIZE + 1)
+    complete = len(prefix) <= SNIFF_PREFIX_SIZE
+    result = sniff_csv(prefix[:SNIFF_PREFIX_SIZE], complete)
+    return InspectResponse(**result)
 
 
 @router.post("/to-shp", response_model=ConversionResponse)
 async def csv_to_shp(
     request: Request,
     file: UploadFile = File(...),
-    encoding: str = "UTF-8",
-    x_field: str = "lon",
-    y_field: str = "lat",
+    encoding: Optional[str] = None,
+    x_field: Optional[str] = None,
+    y_field: Optional[str] = None,
+    delimiter: Optional[str] = None,
+    geometry_field: Optional[str] = None,
+    profile: bool = False,
     background_tasks: BackgroundTasks = None
 ):
     """
     将CSV文件转换为SHP格式
 
     - **file**: CSV文件
-    - **encoding**: 输入文件编码
-    - **x_field**: X坐标字段名（默认lon）
-    - **y_field**: Y坐标字段名（默认lat）
+    - **encoding**: 输入文件编码（不指定则自动识别 UTF-8 / UTF-8-SIG / GBK）
+    - **x_field**: X坐标字段名（不指定则自动识别 lon/lng/x/经度 等）
+    - **y_field**: Y坐标字段名（不指定则自动识别 lat/y/纬度 等）
+    - **delimiter**: 分隔符（不指定则自动识别）
+    - **geometry_field**: WKT/十六进制WKB几何字段名（支持线、面），设置后忽略 x_field / y_field；
+      未指定且识别不到坐标字段时自动识别
+    - **profile**: 为 true 时在分析器下重新转换（不使用结果缓存），分析结果保存在输出文件旁边，
+      需要 X-Admin-Token 请求头
+    """
+    return await _convert_csv(
+        request, file, "shp", encoding, x_field, y_field, delimiter, geometry_field, background_tasks,
+        profile=profile
+    )
+
+
+@router.post("/to-geojson", response_model=ConversionResponse)
+async def csv_to_geojson(
+    request: Request,
+    file: UploadFile = File(...),
+    encoding: Optional[str] = None,
+    x_field: Optional[str] = None,
+    y_field: Optional[str] = None,
+    delimiter: Optional[str] = None,
+    geometry_field: Optional[str] = None,
+    seq: bool = False,
+    inline: bool = False,
+    profile: bool = False,
+    background_tasks: BackgroundTasks = None
+):
+    """
+    将CSV文件转换为GeoJSON格式（不受Shapefile字段名长度和文件大小限制）
+
+    - **file**: CSV文件
+    - **encoding** / **x_field** / **y_field** / **delimiter** / **geometry_field**: 同 /to-shp
+    - **seq**: 为 true 时输出 GeoJSONSeq（.geojsonl，每行一个Feature）
+    - **inline**: 为 true 时边转换边在响应体中返回结果（客户端支持时 gzip 压缩），
+      不写输出文件、不生成下载链接，也不使用结果缓存
+    - **profile**: 同 /to-shp，不能与 inline 同时使用
+    """
+    return await _convert_csv(
+        request, file, "geojsonl" if seq else "geojson",
+        encoding, x_field, y_field, delimiter, geometry_field, background_tasks, inline=inline, profile=profile
+    )
+
+
+@router.post("/to-geoparquet", response_model=ConversionResponse)
+async def csv_to_geoparquet(
+    request: Request,
+    file: UploadFile = File(...),
+    encoding: Optional[str] = None,
+    x_field: Optional[str] = None,
+    y_field: Optional[str] = None,
+    delimiter: Optional[str] = None,
+    geometry_field: Optional[str] = None,
+    profile: bool = False,
+    background_tasks: BackgroundTasks = None
+):
+    """
+    将CSV文件转换为GeoParquet格式（WKB几何列，按行组写出，便于并行读取）
+
+    - **file**: CSV文件
+    - **encoding** / **x_field** / **y_field** / **delimiter** / **geometry_field** / **profile**: 同 /to-shp
     """
+    return await _convert_csv(
+        request, file, "parquet", encoding, x_field, y_field, delimiter, geometry_field, background_tasks,
+        profile=profile
+    )
+
+
+def _get_csv_target(target: str):
+    """输出格式 → (转换类型, 转换函数, 额外参数)，转换类型与 /api/jobs 的 kind 一致"""
+    if target == "shp":
+        return "csv-to-shp", converters.csv_to_shp, {}
+    if target == "parquet":
+        return "csv-to-geoparquet", CsvExporter.csv_to_geoparquet, {}
+    return f"csv-to-{target}", CsvExporter.csv_to_geojson, {"seq": target == "geojsonl"}
+
+
+async def _convert_csv(
+    request: Request,
+    file: UploadFile,
+    target: str,
+    encoding: Optional[str],
+    x_field: Optional[str],
+    y_field: Optional[str],
+    delimiter: Optional[str],
+    geometry_field: Optional[str],
+    background_tasks: BackgroundTasks,
+    inline: bool = False,
+    profile: bool = False
+):
+    """CSV转换公共流程：保存上传、嗅探参数、转换、返回下载链接（inline 时直接返回流式响应）"""
     try:
-        print("[后端] ========== 收到请求 =========")
-        print(f"[后端] 请求来源: {request.client.host}")
-        print(f"[后端] 文件名: {file.filename}")
-        print(f"[后端] 文件大小: {file.size}")
-        print(f"[后端] 编码: {encoding}")
-        print(f"[后端] X字段: {x_field}, Y字段: {y_field}")
+        logger.debug("========== 收到请求 =========")
+        logger.debug("请求来源: %s", request.client.host)
+        logger.debug("文件名: %s", file.filename)
+        logger.debug("文件大小: %s", file.size)
+        logger.debug("输出格式: %s", target)
+        logger.debug("编码: %s", encoding)
+        logger.debug("X字段: %s, Y字段: %s", x_field, y_field)
 
         # 检查文件扩展名
         if not file.filename.lower().endswith('.csv'):
-            print("[后端] 错误: 文件扩展名不正确")
+            logger.warning("文件扩展名不正确")
             raise HTTPException(status_code=400, detail="只支持.csv文件")
+        if profile:
+            require_admin(request)
+            if inline:
+                raise HTTPException(status_code=400, detail="inline 模式不支持性能分析")
 
         # 创建临时目录
         file_id = str(uuid.uuid4())
         temp_dir = os.path.join(settings.TEMP_DIR, file_id)
         os.makedirs(temp_dir, exist_ok=True)
-        print(f"[后端] 临时目录: {temp_dir}")
+        logger.debug("临时目录: %s", temp_dir)
 
         # 保存主文件
         csv_path = os.path.join(temp_dir, file.filename)
-        with open(csv_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        print(f"[后端] 文件已保存: {csv_path}")
+        upload = await save_upload(file, csv_path, cleanup_dir=temp_dir)
+        logger.debug("文件已保存: %s (%s bytes, sha256=%s)", csv_path, upload.size, upload.sha256[:12])
+
+        # 嗅探文件开头，补全未指定的参数；参数明显错误时在转换前快速失败
+        sniffed = await run_blocking(sniff_csv_file, csv_path, encoding=encoding, delimiter=delimiter)
+        try:
+            encoding, delimiter, x_field, y_field, geometry_field = resolve_csv_params(
+                sniffed, x_field, y_field, geometry_field
+            )
+        except ValueError as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise HTTPException(status_code=400, detail=str(e))
+        logger.debug(
+            "解析参数: 编码=%s, 分隔符=%r, X字段=%s, Y字段=%s, 几何字段=%s",
+            encoding, delimiter, x_field, y_field, geometry_field
+        )
+
+        output_filename = os.path.splitext(file.filename)[0] + f".{target}"
+        # 大文件按字节范围分块并行解析
+        workers = 1
+        if os.path.getsize(csv_path) >= settings.CSV_PARALLEL_MIN_SIZE:
+            workers = settings.csv_parallel_workers
+
+        if inline:
+            try:
+                chunks = await run_blocking(
+                    CsvExporter.iter_geojson, csv_path, encoding=encoding, x_field=x_field, y_field=y_field,
+                    delimiter=delimiter, seq=target == "geojsonl", workers=workers, geometry_field=geometry_field
+                )
+            except ValueError as e:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                raise HTTPException(status_code=400, detail=str(e))
+            logger.debug("inline 模式，直接流式返回")
+            return stream_response(
+                request, chunks, output_filename,
+                background=BackgroundTask(shutil.rmtree, temp_dir, ignore_errors=True)
+            )
 
         # 输出路径
-        output_filename = file.filename.replace('.csv', '.shp')
         output_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}_{output_filename}")
-        print(f"[后端] 输出路径: {output_path}")
+        logger.debug("输出路径: %s", output_path)
 
         # 执行转换
-        print("[后端] 开始转换...")
-        result = CsvConverter.csv_to_shp(csv_path, output_path, encoding, x_field, y_field)
+        logger.debug("开始转换...")
+        kind, convert, options = _get_csv_target(target)
+        profile_path = profile_path_for(output_path) if profile else None
+        result, cached = await convert_cached(
+            kind, convert, csv_path, output_path, upload.sha256, profile_path=profile_path,
+            encoding=encoding, x_field=x_field, y_field=y_field, delimiter=delimiter,
+            geometry_field=geometry_field, workers=workers, **options
+        )
 
         if not result["success"]:
-            print(f"[后端] 转换失败: {result['error']}")
+            logger.warning("转换失败: %s", result['error'])
             shutil.rmtree(temp_dir, ignore_errors=True)
             raise HTTPException(status_code=400, detail=result["error"])
 
-        print("[后端] 转换成功!")
-        print(f"[后端] 要素数量: {result['feature_count']}")
-        print(f"[后端] 文件大小: {result['file_size']} bytes")
+        logger.info(
+            "%s: %s 个要素, %s bytes", "命中缓存" if cached else "转换成功",
+            result['feature_count'], result['file_size']
+        )
 
         # 添加清理任务
         if background_tasks:
             background_tasks.add_task(lambda: shutil.rmtree(temp_dir, ignore_errors=True))
-            print(f"[后端] 添加清理任务: {temp_dir}")
+            logger.debug("添加清理任务: %s", temp_dir)
 
         # 构造下载URL
-        download_url = f"/api/download/{os.path.basename(output_path)}"
-        print(f"[后端] 下载URL: {download_url}")
-        print("[后端] ========== 处理完成 =========")
+        download_url = f"/api/download/{os.path.basename(result['output_path'])}"
+        logger.debug("下载URL: %s", download_url)
+        logger.debug("========== 处理完成 =========")
 
         return ConversionResponse(
             success=True,
@@ -108,14 +291,19 @@ async def csv_to_shp(
             feature_count=result["feature_count"],
             file_size=result["file_size"],
             download_url=download_url,
-            x_field=x_field,
-            y_field=y_field
+            x_field=result.get("x_field"),
+            y_field=result.get("y_field"),
+            geometry_field=geometry_field,
+            geometry_type=result.get("geometry_type"),
+            encoding=encoding,
+            delimiter=delimiter,
+            cached=cached,
+            stats=result.get("stats"),
+            profile_url=profile_url(profile_path)
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[后端] 异常: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("异常: %s", str(e))
         raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
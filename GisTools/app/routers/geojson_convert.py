@@ -2,6 +2,7 @@
 GeoJSON转换路由
 提供GeoJSON到SHP的转换API接口
 """
+import logging
 import os
 import shutil
 import uuid
@@ -9,16 +10,13 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks,
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.profiling import profile_path_for, profile_url, require_admin
+from app.core.upload import save_upload
+from app.services import converters
+from app.services.result_cache import convert_cached, run_validation
 
-# 尝试导入真实服务，如果失败则使用Mock版本
-try:
-    from app.services.geojson_service import GeoJsonConverter
-    print("[INFO] Using GDAL service for GeoJSON")
-    USE_GDAL = True
-except ImportError:
-    print("[WARNING] GDAL not available, using Mock service for GeoJSON")
-    from app.services.geojson_service_mock import GeoJsonConverter
-    USE_GDAL = False
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -32,7 +30,12 @@ class ConversionResponse(BaseModel):
     file_size: int = 0
     download_url: str | None = None
     geometry_type: str | None = None
+    cached: bool = False
     error: str | None = None
+    # 本次转换的资源统计（耗时、CPU时间、内存峰值、要素数、输入 / 输出字节数），命中缓存时为空
+    stats: dict | None = None
+    # 性能分析结果的下载地址（profile=true 时）
+    profile_url: str | None = None
 
 
 class ValidateResponse(BaseModel):
@@ -47,6 +50,8 @@ class ValidateResponse(BaseModel):
     valid_geometry_count: int = 0
     bounds: dict | None = None
     error: str | None = None
+    # 本次验证的资源统计
+    stats: dict | None = None
 
 
 @router.post("/to-shp", response_model=ConversionResponse)
@@ -54,6 +59,7 @@ async def geojson_to_shp(
     request: Request,
     file: UploadFile = File(...),
     encoding: str = "UTF-8",
+    profile: bool = False,
     background_tasks: BackgroundTasks = None
 ):
     """
@@ -61,59 +67,65 @@ async def geojson_to_shp(
 
     - **file**: GeoJSON文件
     - **encoding**: 输出编码
+    - **profile**: 为 true 时在分析器下重新转换（不使用结果缓存），分析结果保存在输出文件旁边，
+      需要 X-Admin-Token 请求头
     """
     try:
-        print("[后端] ========== 收到请求 =========")
-        print(f"[后端] 请求来源: {request.client.host}")
-        print(f"[后端] 文件名: {file.filename}")
-        print(f"[后端] 文件大小: {file.size}")
-        print(f"[后端] 编码: {encoding}")
+        logger.debug("========== 收到请求 =========")
+        logger.debug("请求来源: %s", request.client.host)
+        logger.debug("文件名: %s", file.filename)
+        logger.debug("文件大小: %s", file.size)
+        logger.debug("编码: %s", encoding)
 
         # 检查文件扩展名
         if not (file.filename.lower().endswith('.geojson') or file.filename.lower().endswith('.json')):
-            print("[后端] 错误: 文件扩展名不正确")
+            logger.warning("文件扩展名不正确")
             raise HTTPException(status_code=400, detail="只支持.geojson或.json文件")
+        if profile:
+            require_admin(request)
 
         # 创建临时目录
         file_id = str(uuid.uuid4())
         temp_dir = os.path.join(settings.TEMP_DIR, file_id)
         os.makedirs(temp_dir, exist_ok=True)
-        print(f"[后端] 临时目录: {temp_dir}")
+        logger.debug("临时目录: %s", temp_dir)
 
         # 保存主文件
         geojson_path = os.path.join(temp_dir, file.filename)
-        with open(geojson_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        print(f"[后端] 文件已保存: {geojson_path}")
+        upload = await save_upload(file, geojson_path, cleanup_dir=temp_dir)
+        logger.debug("文件已保存: %s (%s bytes, sha256=%s)", geojson_path, upload.size, upload.sha256[:12])
 
         # 输出路径
         output_filename = file.filename.replace('.geojson', '.shp')
         output_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}_{output_filename}")
-        print(f"[后端] 输出路径: {output_path}")
+        logger.debug("输出路径: %s", output_path)
 
         # 执行转换
-        print("[后端] 开始转换...")
-        if not USE_GDAL:
-            print("[后端] 注意：使用Mock模式，无法生成真正的Shapefile")
-        result = GeoJsonConverter.geojson_to_shp(geojson_path, output_path, encoding)
+        logger.debug("开始转换...")
+        profile_path = profile_path_for(output_path) if profile else None
+        result, cached = await convert_cached(
+            "geojson-to-shp", converters.geojson_to_shp, geojson_path, output_path, upload.sha256,
+            profile_path=profile_path, encoding=encoding
+        )
 
         if not result["success"]:
-            print(f"[后端] 转换失败: {result['error']}")
+            logger.warning("转换失败: %s", result['error'])
             shutil.rmtree(temp_dir, ignore_errors=True)
             raise HTTPException(status_code=400, detail=result["error"])
 
-        print("[后端] 转换成功!")
-        print(f"[后端] 要素数量: {result['feature_count']}")
-        print(f"[后端] 文件大小: {result['file_size']} bytes")
+        logger.info(
+            "%s: %s 个要素, %s bytes", "命中缓存" if cached else "转换成功",
+            result['feature_count'], result['file_size']
+        )
 
         # 添加清理任务
         if background_tasks:
             background_tasks.add_task(lambda: shutil.rmtree(temp_dir, ignore_errors=True))
-            print(f"[后端] 添加清理任务: {temp_dir}")
+            logger.debug("添加清理任务: %s", temp_dir)
 
         # Mock 模式下不提供下载链接
-        if not USE_GDAL:
-            print("[后端] Mock模式：不提供下载链接")
+        if not await run_blocking(converters.using_gdal, "GeoJsonConverter"):
+            logger.debug("Mock模式：不提供下载链接")
             return ConversionResponse(
                 success=True,
                 message="Mock转换成功（需要安装GDAL才能生成真正的Shapefile）",
@@ -121,13 +133,15 @@ async def geojson_to_shp(
                 geometry_count=result.get("geometry_count", result["feature_count"]),
                 file_size=result["file_size"],
                 download_url=None,
-                geometry_type=result.get("geometry_type")
+                geometry_type=result.get("geometry_type"),
+                stats=result.get("stats"),
+                profile_url=profile_url(profile_path)
             )
 
         # 构造下载URL
-        download_url = f"/api/download/{os.path.basename(output_path)}"
-        print(f"[后端] 下载URL: {download_url}")
-        print("[后端] ========== 处理完成 =========")
+        download_url = f"/api/download/{os.path.basename(result['output_path'])}"
+        logger.debug("下载URL: %s", download_url)
+        logger.debug("========== 处理完成 =========")
 
         return ConversionResponse(
             success=True,
@@ -136,15 +150,16 @@ async def geojson_to_shp(
             geometry_count=result.get("geometry_count", result["feature_count"]),
             file_size=result["file_size"],
             download_url=download_url,
-            geometry_type=result.get("geometry_type")
+            geometry_type=result.get("geometry_type"),
+            cached=cached,
+            stats=result.get("stats"),
+            profile_url=profile_url(profile_path)
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[后端] 异常: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("异常: %s", str(e))
         raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
 
 
@@ -159,8 +174,8 @@ async def validate_geojson(
     - **file**: GeoJSON文件
     """
     try:
-        print("[后端] ========== 验证请求 =========")
-        print(f"[后端] 文件名: {file.filename}")
+        logger.debug("========== 验证请求 =========")
+        logger.debug("文件名: %s", file.filename)
 
         # 检查文件扩展名
         if not (file.filename.lower().endswith('.geojson') or file.filename.lower().endswith('.json')):
@@ -172,26 +187,21 @@ async def validate_geojson(
         os.makedirs(temp_dir, exist_ok=True)
 
         geojson_path = os.path.join(temp_dir, file.filename)
-        with open(geojson_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, geojson_path, cleanup_dir=temp_dir)
 
         # 执行验证
-        print("[后端] 开始验证...")
-        if not USE_GDAL:
-            print("[后端] 注意：使用Mock模式")
-        result = GeoJsonConverter.validate_geojson(geojson_path)
+        logger.debug("开始验证...")
+        result = await run_validation("geojson-validate", converters.validate_geojson, geojson_path)
 
         # 清理临时文件
         shutil.rmtree(temp_dir, ignore_errors=True)
 
-        print(f"[后端] 验证完成: {result['valid']}")
+        logger.debug("验证完成: %s", result['valid'])
 
         return ValidateResponse(**result)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[后端] 异常: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("异常: %s", str(e))
         raise HTTPException(status_code=500, detail=f"验证失败: {str(e)}")
@@ -0,0 +1,286 @@
+"""
+异步任务路由
+提交转换任务后立即返回任务ID，通过轮询查询状态并获取结果，避免大文件转换超时
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.download import file_response
+from app.core.executor import run_blocking
+from app.core.upload import save_upload
+from app.services import converters
+from app.services.csv_export import CsvExporter
+from app.services.csv_sniffer import resolve_csv_params, sniff_csv_file
+from app.services.job_service import JOB_SUCCEEDED, FINISHED_STATES, job_manager
+from app.services.result_cache import ResultCache, get_result_cache, output_sha256
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# 进度事件流检查任务表的间隔（秒）
+EVENTS_POLL_INTERVAL = 0.5
+# 事件流保活注释的间隔（秒），避免代理关闭空闲连接
+EVENTS_KEEPALIVE_INTERVAL = 15.0
+
+# 任务类型 → (允许的输入扩展名, 输出扩展名)
+JOB_TYPES = {
+    "shp-to-geojson": ((".shp",), ".geojson"),
+    "geojson-to-shp": ((".geojson", ".json"), ".shp"),
+    "csv-to-shp": ((".csv",), ".shp"),
+    "csv-to-geojson": ((".csv",), ".geojson"),
+    "csv-to-geojsonl": ((".csv",), ".geojsonl"),
+    "csv-to-geoparquet": ((".csv",), ".parquet"),
+    # 以下由转换流水线直接执行（converters.convert）
+    "shp-to-geojsonl": ((".shp",), ".geojsonl"),
+    "shp-to-csv": ((".shp",), ".csv"),
+    "shp-to-geoparquet": ((".shp",), ".parquet"),
+    "geojson-to-geojsonl": ((".geojson", ".json"), ".geojsonl"),
+    "geojson-to-csv": ((".geojson", ".json"), ".csv"),
+    "geojson-to-geoparquet": ((".geojson", ".json"), ".parquet"),
+    "geojsonl-to-geojson": ((".geojsonl",), ".geojson"),
+}
+
+job_manager.register("shp-to-geojson", converters.shp_to_geojson)
+job_manager.register("geojson-to-shp", converters.geojson_to_shp)
+job_manager.register("csv-to-geojson", CsvExporter.csv_to_geojson)
+job_manager.register("csv-to-geojsonl", CsvExporter.csv_to_geojson)
+job_manager.register("csv-to-geoparquet", CsvExporter.csv_to_geoparquet)
+job_manager.register("csv-to-shp", converters.csv_to_shp)
+job_manager.register("shp-to-geojsonl", converters.convert)
+job_manager.register("shp-to-csv", converters.convert)
+job_manager.register("shp-to-geoparquet", converters.convert)
+job_manager.register("geojson-to-geojsonl", converters.convert)
+job_manager.register("geojson-to-csv", converters.convert)
+job_manager.register("geojson-to-geoparquet", converters.convert)
+job_manager.register("geojsonl-to-geojson", converters.convert)
+
+
+class JobResponse(BaseModel):
+    """任务响应模型"""
+    job_id: str
+    kind: str
+    status: str
+    attempts: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    feature_count: int = 0
+    file_size: int = 0
+    progress: Optional[dict] = None
+    cached: bool = False
+    download_url: Optional[str] = None
+    result_url: Optional[str] = None
+    error: Optional[str] = None
+    # 转换的资源统计（耗时、CPU时间、内存峰值等），命中缓存时为空
+    stats: Optional[dict] = None
+
+
+def _to_response(job: dict) -> JobResponse:
+    result = job["result"] or {}
+    succeeded = job["status"] == JOB_SUCCEEDED
+    return JobResponse(
+        job_id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        feature_count=result.get("feature_count", 0),
+        file_size=result.get("file_size", 0),
+        progress=job["progress"],
+        cached=result.get("cached", False),
+        download_url=f"/api/download/{os.path.basename(job['output_path'])}" if succeeded else None,
+        result_url=f"/api/jobs/{job['id']}/result" if succeeded else None,
+        error=job["error"] if job["status"] != JOB_SUCCEEDED else None,
+        stats=result.get("stats"),
+    )
+
+
+async def build_params(
+    kind: str, input_path: str, encoding: Optional[str] = None, x_field: Optional[str] = None,
+    y_field: Optional[str] = None, delimiter: Optional[str] = None, geometry_field: Optional[str] = None
+) -> dict:
+    """
+    任务类型的转换参数；CSV 任务嗅探文件补全未指定的参数
+
+    Raises:
+        ValueError: CSV 参数有误
+    """
+    if not kind.startswith("csv-"):
+        return {"encoding": encoding or "UTF-8"}
+
+    sniffed = await run_blocking(sniff_csv_file, input_path, encoding=encoding, delimiter=delimiter)
+    encoding, delimiter, x_field, y_field, geometry_field = resolve_csv_params(
+        sniffed, x_field, y_field, geometry_field
+    )
+    workers = 1
+    if os.path.getsize(input_path) >= settings.CSV_PARALLEL_MIN_SIZE:
+        workers = settings.csv_parallel_workers
+    params = {
+        "encoding": encoding, "x_field": x_field, "y_field": y_field,
+        "delimiter": delimiter, "geometry_field": geometry_field, "workers": workers,
+    }
+    if kind in ("csv-to-geojson", "csv-to-geojsonl"):
+        params["seq"] = kind == "csv-to-geojsonl"
+    return params
+
+
+async def _get_job(job_id: str) -> dict:
+    job = await run_blocking(job_manager.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@router.post("", response_model=JobResponse, status_code=202)
+async def submit_job(
+    kind: str,
+    file: UploadFile = File(...),
+    encoding: Optional[str] = None,
+    x_field: Optional[str] = None,
+    y_field: Optional[str] = None,
+    delimiter: Optional[str] = None,
+    geometry_field: Optional[str] = None,
+):
+    """
+    提交转换任务，立即返回任务ID
+
+    - **kind**: 任务类型 shp-to-geojson / geojson-to-shp / csv-to-shp / csv-to-geojson /
+      csv-to-geojsonl / csv-to-geoparquet
+    - **file**: 输入文件
+    - **encoding**: 编码（SHP / GeoJSON 默认 UTF-8，CSV 不指定则自动识别）
+    - **x_field** / **y_field** / **delimiter** / **geometry_field**: CSV参数，同 /api/csv/to-shp
+    """
+    if kind not in JOB_TYPES or kind not in job_manager.kinds or not await run_blocking(converters.supports, kind):
+        raise HTTPException(status_code=400, detail=f"不支持的任务类型: {kind}，可选: {job_manager.kinds}")
+    input_exts, output_ext = JOB_TYPES[kind]
+    if not file.filename.lower().endswith(input_exts):
+        raise HTTPException(status_code=400, detail=f"只支持{'或'.join(input_exts)}文件")
+
+    job_id = str(uuid.uuid4())
+    temp_dir = os.path.join(settings.TEMP_DIR, job_id)
+    os.makedirs(temp_dir, exist_ok=True)
+    input_path = os.path.join(temp_dir, file.filename)
+    upload = await save_upload(file, input_path, cleanup_dir=temp_dir)
+
+    output_filename = os.path.splitext(file.filename)[0] + output_ext
+    output_path = os.path.join(settings.UPLOAD_DIR, f"{job_id}_{output_filename}")
+
+    # 提交时完成参数嗅探和校验，参数有误直接返回 400
+    try:
+        params = await build_params(kind, input_path, encoding, x_field, y_field, delimiter, geometry_field)
+    except ValueError as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cache = get_result_cache()
+    cache_key = ResultCache.make_key(kind, upload.sha256, params) if cache else None
+    cached = await run_blocking(cache.get, cache_key) if cache else None
+    if cached is not None:
+        job = await job_manager.submit_cached(kind, params, input_path, cached, job_id=job_id)
+        logger.debug("命中缓存 %s (%s): %s", job_id, kind, file.filename)
+        return _to_response(job)
+
+    job = await job_manager.submit(kind, params, input_path, output_path, job_id=job_id, cache_key=cache_key)
+    logger.debug("已提交 %s (%s): %s", job_id, kind, file.filename)
+    return _to_response(job)
+
+
+@router.get("", response_model=list[JobResponse])
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """
+    列出最近的任务
+
+    - **status**: 按状态过滤 queued / running / succeeded / failed / cancelled
+    - **limit**: 最多返回的任务数
+    """
+    jobs = await run_blocking(job_manager.store.list, status, min(limit, 500))
+    return [_to_response(job) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """查询任务状态"""
+    return _to_response(await _get_job(job_id))
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    任务进度事件流（Server-Sent Events）
+
+    - **status**: 任务状态变化（queued / running / ...）
+    - **progress**: 转换进度（features、bytes、features_per_second、percent、eta_seconds 等）
+    - **done**: 任务结束，数据与 GET /api/jobs/{job_id} 相同，随后关闭连接
+    """
+    await _get_job(job_id)
+
+    def sse(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def stream():
+        last_status = last_progress = None
+        idle = 0.0
+        while not await request.is_disconnected():
+            # 每个连接定期打开一次数据库，放到执行池中，连接数多时不阻塞事件循环
+            job = await run_blocking(job_manager.store.get, job_id)
+            if job is None:
+                break
+            if job["status"] != last_status:
+                last_status = job["status"]
+                idle = 0.0
+                yield sse("status", {"status": last_status, "attempts": job["attempts"]})
+            if job["progress"] is not None and job["progress"] != last_progress:
+                last_progress = job["progress"]
+                idle = 0.0
+                yield sse("progress", last_progress)
+            if job["status"] in FINISHED_STATES:
+                yield sse("done", _to_response(job).model_dump())
+                break
+            if idle >= EVENTS_KEEPALIVE_INTERVAL:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+            idle += EVENTS_POLL_INTERVAL
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """
+    取消任务
+
+    排队中的任务立即取消；运行中的任务在当前转换结束后丢弃结果并标记为 cancelled
+    """
+    job = await _get_job(job_id)
+    if job["status"] in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"任务已结束: {job['status']}")
+    return _to_response(await job_manager.cancel(job_id))
+
+
+@router.get("/{job_id}/result")
+@router.head("/{job_id}/result", include_in_schema=False)
+async def get_job_result(job_id: str, request: Request):
+    """下载任务结果文件（支持 Range / ETag，同 /api/download）"""
+    job = await _get_job(job_id)
+    if job["status"] != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"任务尚未完成: {job['status']}")
+    # 去掉文件名的 uuid 前缀（缓存命中时为原任务的 uuid）
+    filename = os.path.basename(job["output_path"]).split("_", 1)[-1]
+    return await file_response(request, job["output_path"], filename=filename, sha256_lookup=output_sha256)
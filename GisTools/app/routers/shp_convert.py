@@ -2,23 +2,24 @@
 Shapefile转换路由
 提供SHP到GeoJSON的转换API接口
 """
+import logging
 import os
 import shutil
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
 from app.core.config import settings
+from app.core.download import stream_response
+from app.core.executor import run_blocking
+from app.core.profiling import profile_path_for, profile_url, require_admin
+from app.core.upload import save_upload
+from app.services import converters
+from app.services.result_cache import convert_cached
 
-# 尝试导入真实服务，如果失败则使用Mock版本
-try:
-    from app.services.shp_service import ShpConverter
-    print("[INFO] Using GDAL service")
-except ImportError:
-    from app.services.shp_service_mock import ShpConverter
-    print("[WARNING] GDAL not installed, using Mock service (for testing only)")
-    print("[INFO] Install GDAL: run 'pip install gdal' or see INSTALL_WINDOWS.md")
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -30,7 +31,12 @@ class ConversionResponse(BaseModel):
     feature_count: int = 0
     file_size: int = 0
     download_url: str = None
+    cached: bool = False
     error: str = None
+    # 本次转换的资源统计（耗时、CPU时间、内存峰值、要素数、输入 / 输出字节数），命中缓存时为空
+    stats: Optional[dict] = None
+    # 性能分析结果的下载地址（profile=true 时）
+    profile_url: Optional[str] = None
 
 
 @router.post("/info", response_model=Dict[str, Any])
@@ -52,11 +58,10 @@ async def get_shp_info(file: UploadFile = File(...)):
 
         shp_path = os.path.join(temp_dir, file.filename)
 
-        with open(shp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, shp_path, cleanup_dir=temp_dir)
 
         # 获取文件信息
-        info = ShpConverter.get_shp_info(shp_path)
+        info = await run_blocking(converters.shp_info, shp_path)
 
         if info is None:
             raise HTTPException(status_code=400, detail="无法读取SHP文件")
@@ -80,6 +85,8 @@ async def shp_to_geojson(
     request: Request,
     file: UploadFile = File(...),
     encoding: str = "UTF-8",
+    inline: bool = False,
+    profile: bool = False,
     background_tasks: BackgroundTasks = None
 ):
     """
@@ -87,79 +94,103 @@ async def shp_to_geojson(
 
     - **file**: SHP文件
     - **encoding**: 输出编码，默认UTF-8
+    - **inline**: 为 true 时直接在响应体中流式返回 GeoJSON（UTF-8，客户端支持时 gzip 压缩），
+      不生成下载链接，也不使用结果缓存
+    - **profile**: 为 true 时在分析器下重新转换（不使用结果缓存），分析结果保存在输出文件旁边，
+      需要 X-Admin-Token 请求头，不能与 inline 同时使用
 
     上传SHP文件后，系统会自动查找同目录下的.shx、.dbf、.prj等关联文件
     如果需要完整转换，请确保这些文件都在同一目录
     """
     try:
-        print("[后端] ========== 收到请求 =========")
-        print(f"[后端] 请求来源: {request.client.host}")
-        print(f"[后端] 文件名: {file.filename}")
-        print(f"[后端] 文件大小: {file.size} bytes")
-        print(f"[后端] 编码: {encoding}")
-        print(f"[后端] Content-Type: {file.content_type}")
+        logger.debug("========== 收到请求 =========")
+        logger.debug("请求来源: %s", request.client.host)
+        logger.debug("文件名: %s", file.filename)
+        logger.debug("文件大小: %s bytes", file.size)
+        logger.debug("编码: %s", encoding)
+        logger.debug("Content-Type: %s", file.content_type)
 
         # 检查文件扩展名
         if not file.filename.lower().endswith('.shp'):
-            print("[后端] 错误: 文件扩展名不正确")
+            logger.warning("文件扩展名不正确")
             raise HTTPException(status_code=400, detail="只支持.shp文件")
+        if profile:
+            require_admin(request)
+            if inline:
+                raise HTTPException(status_code=400, detail="inline 模式不支持性能分析")
 
         # 创建临时目录
         file_id = str(uuid.uuid4())
         temp_dir = os.path.join(settings.TEMP_DIR, file_id)
         os.makedirs(temp_dir, exist_ok=True)
-        print(f"[后端] 临时目录: {temp_dir}")
+        logger.debug("临时目录: %s", temp_dir)
 
         # 保存主文件
         shp_path = os.path.join(temp_dir, file.filename)
-        with open(shp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        print(f"[后端] 文件已保存: {shp_path}")
+        upload = await save_upload(file, shp_path, cleanup_dir=temp_dir)
+        logger.debug("文件已保存: %s (%s bytes, sha256=%s)", shp_path, upload.size, upload.sha256[:12])
 
-        # 输出路径
         output_filename = file.filename.replace('.shp', '.geojson')
+        if inline:
+            try:
+                chunks = await run_blocking(converters.shp_iter_geojson, shp_path)
+            except ValueError as e:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                raise HTTPException(status_code=400, detail=str(e))
+            logger.debug("inline 模式，直接流式返回")
+            return stream_response(
+                request, chunks, output_filename,
+                background=BackgroundTask(shutil.rmtree, temp_dir, ignore_errors=True)
+            )
+
+        # 输出路径
         output_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}_{output_filename}")
-        print(f"[后端] 输出路径: {output_path}")
-        print(f"[后端] UPLOAD_DIR: {settings.UPLOAD_DIR}")
-        print(f"[后端] UPLOAD_DIR 绝对路径: {os.path.abspath(settings.UPLOAD_DIR)}")
+        logger.debug("输出路径: %s", output_path)
+        logger.debug("UPLOAD_DIR: %s", settings.UPLOAD_DIR)
+        logger.debug("UPLOAD_DIR 绝对路径: %s", os.path.abspath(settings.UPLOAD_DIR))
 
         # 执行转换
-        print("[后端] 开始转换...")
-        result = ShpConverter.shp_to_geojson(shp_path, output_path, encoding)
+        logger.debug("开始转换...")
+        profile_path = profile_path_for(output_path) if profile else None
+        result, cached = await convert_cached(
+            "shp-to-geojson", converters.shp_to_geojson, shp_path, output_path, upload.sha256,
+            profile_path=profile_path, encoding=encoding
+        )
 
         if not result["success"]:
-            print(f"[后端] 转换失败: {result['error']}")
+            logger.warning("转换失败: %s", result['error'])
             # 清理临时文件
             shutil.rmtree(temp_dir)
             raise HTTPException(status_code=400, detail=result["error"])
 
-        print("[后端] 转换成功!")
-        print(f"[后端] 要素数量: {result['feature_count']}")
-        print(f"[后端] 文件大小: {result['file_size']} bytes")
+        logger.info(
+            "%s: %s 个要素, %s bytes", "命中缓存" if cached else "转换成功",
+            result['feature_count'], result['file_size']
+        )
 
         # 添加清理任务
         if background_tasks:
             background_tasks.add_task(lambda: shutil.rmtree(temp_dir, ignore_errors=True))
-            print(f"[后端] 添加清理任务: {temp_dir}")
+            logger.debug("添加清理任务: %s", temp_dir)
 
         # 构造下载URL
-        download_url = f"/api/download/{os.path.basename(output_path)}"
-        print(f"[后端] 下载URL: {download_url}")
-        print("[后端] ========== 处理完成 =========")
+        download_url = f"/api/download/{os.path.basename(result['output_path'])}"
+        logger.debug("下载URL: %s", download_url)
+        logger.debug("========== 处理完成 =========")
 
         return ConversionResponse(
             success=True,
             message=result["message"],
             feature_count=result["feature_count"],
             file_size=result["file_size"],
-            download_url=download_url
+            download_url=download_url,
+            cached=cached,
+            stats=result.get("stats"),
+            profile_url=profile_url(profile_path)
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[后端] 异常: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("异常: %s", str(e))
         raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
-
@@ -0,0 +1,142 @@
+"""
+批量转换服务
+整理上传的多个文件（或一个zip中的多个数据集）为待转换的数据集，并把转换结果打包为一个zip
+"""
+import hashlib
+import json
+import os
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.result_cache import output_files
+
+# 与 .shp 一起上传时归入同一数据集的关联文件
+SHP_SIDECAR_EXTS = (".shx", ".dbf", ".prj", ".cpg", ".qix", ".sbn", ".sbx")
+
+# 解压 / 计算哈希时每次读取的块大小
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class Dataset:
+    """一个待转换的数据集：主文件及其关联文件"""
+    name: str
+    path: str
+    sha256: str
+    sidecars: Dict[str, str] = field(default_factory=dict)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_zip(zip_path: str, dest_dir: str, max_bytes: int) -> List[str]:
+    """
+    安全解压zip：拒绝绝对路径和 .. 路径，解压总大小超过 max_bytes 时中止
+
+    Returns:
+        解压出的文件路径
+
+    Raises:
+        ValueError: 不是有效的zip、路径非法或解压后超过大小限制
+    """
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except zipfile.BadZipFile:
+        raise ValueError("不是有效的zip文件")
+
+    paths = []
+    total = 0
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = os.path.normpath(info.filename.replace("\\", "/"))
+            if os.path.isabs(name) or name.startswith(".."):
+                raise ValueError(f"zip中包含非法路径: {info.filename}")
+            if os.path.basename(name).startswith(".") or name.startswith("__MACOSX"):
+                # macOS 打包时附带的元数据文件
+                continue
+            target = os.path.join(dest_dir, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # 按实际解压字节数计数，不信任zip目录中记录的大小
+            with archive.open(info) as src, open(target, "wb") as dst:
+                for chunk in iter(lambda: src.read(_COPY_CHUNK_SIZE), b""):
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise ValueError(f"zip解压后超过大小限制 ({max_bytes} bytes)")
+                    dst.write(chunk)
+            paths.append(target)
+    return paths
+
+
+def find_datasets(
+    paths: Iterable[str], input_exts: Tuple[str, ...], hashes: Optional[Dict[str, str]] = None
+) -> List[Dataset]:
+    """
+    按扩展名挑出数据集，Shapefile 的同名关联文件（.shx / .dbf / .prj 等）归入同一数据集
+
+    Args:
+        paths: 文件路径
+        input_exts: 主文件扩展名
+        hashes: 已知的文件 SHA-256（上传时已计算），缺少的在此计算
+
+    数据集的 SHA-256 包含关联文件的内容，关联文件变化时不会命中旧的缓存结果。
+    """
+    hashes = dict(hashes or {})
+    paths = sorted(paths)
+    by_stem = {}
+    for path in paths:
+        by_stem.setdefault(os.path.splitext(path)[0].lower(), []).append(path)
+
+    datasets = []
+    for path in paths:
+        if not path.lower().endswith(input_exts):
+            continue
+        sidecars = {}
+        if path.lower().endswith(".shp"):
+            for other in by_stem[os.path.splitext(path)[0].lower()]:
+                ext = os.path.splitext(other)[1].lower()
+                if ext in SHP_SIDECAR_EXTS:
+                    sidecars[ext] = other
+
+        for member in [path, *sidecars.values()]:
+            if member not in hashes:
+                hashes[member] = _file_sha256(member)
+        if sidecars:
+            digest = hashlib.sha256(hashes[path].encode("ascii"))
+            for ext in sorted(sidecars):
+                digest.update(f"{ext}:{hashes[sidecars[ext]]}".encode("ascii"))
+            sha256 = digest.hexdigest()
+        else:
+            sha256 = hashes[path]
+        datasets.append(Dataset(name=os.path.basename(path), path=path, sha256=sha256, sidecars=sidecars))
+    return datasets
+
+
+def build_zip(zip_path: str, outputs: List[Tuple[str, str]], manifest: Dict[str, Any]) -> int:
+    """
+    把转换结果打包为一个zip，附带 manifest.json
+
+    Args:
+        zip_path: zip文件路径
+        outputs: (输出文件路径, zip内文件名) 列表，Shapefile 的关联文件一并打包
+        manifest: 批量转换清单
+
+    Returns:
+        zip文件大小
+    """
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for output_path, arcname in outputs:
+            arc_base = os.path.splitext(arcname)[0]
+            for path in output_files(output_path):
+                if not os.path.exists(path):
+                    continue
+                archive.write(path, arc_base + os.path.splitext(path)[1])
+        archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    return os.path.getsize(zip_path)
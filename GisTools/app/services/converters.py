@@ -0,0 +1,111 @@
+"""
+转换服务入口
+路由和任务通过本模块调用转换服务：第一次调用时按 GDAL 是否可用加载真实服务或 Mock 服务，
+导入本模块不会导入 osgeo。这里的函数都是模块级函数，可以提交到进程池执行
+"""
+import importlib
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import settings
+from app.core.gdal import gdal_available
+
+logger = logging.getLogger(__name__)
+
+# 服务类 → (GDAL 实现模块, Mock 模块)；没有 Mock 的服务在未安装GDAL时不可用
+_SERVICES = {
+    "ShpConverter": ("app.services.shp_service", "app.services.shp_service_mock"),
+    "GeoJsonConverter": ("app.services.geojson_service", "app.services.geojson_service_mock"),
+    "CsvConverter": ("app.services.csv_service", None),
+}
+
+# 只在 MOCK_CONVERTERS=True 时使用的 Mock（未安装GDAL时这些服务仍然不可用）
+_FORCED_MOCKS = {"CsvConverter": "app.services.csv_service_mock"}
+
+# 没有 Mock 实现、需要GDAL的任务类型
+REQUIRES_GDAL = {"csv-to-shp"}
+
+# 直接由转换流水线执行（convert）、读写Shapefile的任务类型：只在安装了GDAL时可用
+PIPELINE_GDAL_KINDS = {"shp-to-geojsonl", "shp-to-csv", "shp-to-geoparquet"}
+
+
+@lru_cache(maxsize=None)
+def load_service(name: str):
+    """加载服务类，GDAL不可用或 MOCK_CONVERTERS=True 时返回 Mock 版本（没有 Mock 版本时返回 None）"""
+    module_name, mock_name = _SERVICES[name]
+    if settings.MOCK_CONVERTERS:
+        logger.warning("MOCK_CONVERTERS enabled, using Mock %s", name)
+        return getattr(importlib.import_module(mock_name or _FORCED_MOCKS[name]), name)
+    if gdal_available():
+        try:
+            return getattr(importlib.import_module(module_name), name)
+        except ImportError as e:
+            logger.warning("无法加载 %s: %s", module_name, e)
+    if mock_name is None:
+        return None
+    logger.warning("GDAL not installed, using Mock %s (for testing only)", name)
+    return getattr(importlib.import_module(mock_name), name)
+
+
+def using_gdal(name: str) -> bool:
+    """服务是否使用GDAL实现（而不是 Mock）"""
+    service = load_service(name)
+    return service is not None and service.__module__ == _SERVICES[name][0]
+
+
+def supports(kind: str) -> bool:
+    """当前环境是否支持该转换类型"""
+    if kind in PIPELINE_GDAL_KINDS:
+        return gdal_available() and not settings.MOCK_CONVERTERS
+    return kind not in REQUIRES_GDAL or load_service("CsvConverter") is not None
+
+
+def convert(input_path: str, output_path: str, encoding: str = "UTF-8", **params) -> Dict[str, Any]:
+    """
+    任意格式之间的转换（格式按扩展名判断，见 pipeline.FORMAT_EXTS）
+
+    encoding 对CSV输入是输入编码，其它情况是输出编码（GeoParquet 忽略）；
+    其余参数（如 progress，CSV输入的坐标字段）原样传给流水线 / CSV读取器。
+    """
+    from app.services import pipeline
+
+    input_format = pipeline.detect_format(input_path)
+    output_format = pipeline.detect_format(output_path)
+    progress = params.pop("progress", None)
+    reader_options, writer_options = {}, {}
+    if input_format == "csv":
+        reader_options = dict(params, encoding=encoding)
+    elif output_format != "parquet":
+        writer_options["encoding"] = encoding
+    return pipeline.convert(
+        input_path, output_path, input_format, output_format,
+        reader_options=reader_options, writer_options=writer_options, progress=progress
+    )
+
+
+def shp_to_geojson(shp_path: str, output_path: str, **params) -> Dict[str, Any]:
+    return load_service("ShpConverter").shp_to_geojson(shp_path, output_path, **params)
+
+
+def shp_iter_geojson(shp_path: str) -> Iterator[str]:
+    return load_service("ShpConverter").iter_geojson(shp_path)
+
+
+def shp_info(shp_path: str) -> Optional[Dict[str, Any]]:
+    return load_service("ShpConverter").get_shp_info(shp_path)
+
+
+def geojson_to_shp(geojson_path: str, output_path: str, **params) -> Dict[str, Any]:
+    return load_service("GeoJsonConverter").geojson_to_shp(geojson_path, output_path, **params)
+
+
+def validate_geojson(geojson_path: str) -> Dict[str, Any]:
+    return load_service("GeoJsonConverter").validate_geojson(geojson_path)
+
+
+def csv_to_shp(csv_path: str, output_path: str, **params) -> Dict[str, Any]:
+    converter = load_service("CsvConverter")
+    if converter is None:
+        return {"success": False, "error": "未安装GDAL，不支持转换为Shapefile"}
+    return converter.csv_to_shp(csv_path, output_path, **params)
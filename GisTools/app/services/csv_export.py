@@ -0,0 +1,156 @@
+"""
+CSV导出服务
+将CSV点数据（或WKT/WKB几何列）流式转换为 GeoJSON / GeoJSONSeq / GeoParquet（不依赖GDAL），
+同时提供转换流水线的CSV读取器
+"""
+import logging
+import os
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.progress import ProgressCallback
+from app.services import pipeline
+from app.services.csv_reader import CsvSchema, infer_schema, read_point_batches
+from app.services.feature_writers import DEFAULT_ROW_GROUP_SIZE
+from app.services.pipeline import LayerSchema, Source
+
+logger = logging.getLogger(__name__)
+
+
+def read_csv(
+    csv_path: str, encoding: str = "UTF-8", x_field: str = "lon", y_field: str = "lat",
+    delimiter: str = ",", geometry_field: Optional[str] = None, workers: int = 1
+) -> Source:
+    """
+    转换流水线的CSV读取器：点坐标模式产出 xs / ys 批次，几何字段模式产出 shapely 几何批次
+
+    Raises:
+        ValueError: 文件不存在、缺少坐标 / 几何字段或没有有效数据
+    """
+    if geometry_field:
+        logger.debug("几何字段: %s", geometry_field)
+    else:
+        logger.debug("X字段: %s, Y字段: %s", x_field, y_field)
+    schema = CsvExporter._prepare(csv_path, encoding, x_field, y_field, delimiter, geometry_field)
+    return Source(
+        schema=LayerSchema(fields=schema.fields, geometry_type=None if geometry_field else "Point"),
+        batches=read_point_batches(csv_path, schema, encoding, workers),
+        total_bytes=os.path.getsize(csv_path),
+        info={"x_field": schema.x_field, "y_field": schema.y_field, "geometry_field": geometry_field},
+    )
+
+
+def _reader_options(
+    encoding: str, x_field: str, y_field: str, delimiter: str, workers: int, geometry_field: Optional[str]
+) -> Dict[str, Any]:
+    return {
+        "encoding": encoding, "x_field": x_field, "y_field": y_field,
+        "delimiter": delimiter, "workers": workers, "geometry_field": geometry_field,
+    }
+
+
+class CsvExporter:
+    """CSV文件导出器（GeoJSON / GeoJSONSeq / GeoParquet）"""
+
+    @staticmethod
+    def csv_to_geojson(
+        csv_path: str, output_path: str, encoding: str = "UTF-8",
+        x_field: str = "lon", y_field: str = "lat", delimiter: str = ",",
+        seq: bool = False, workers: int = 1, geometry_field: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        将CSV文件转换为GeoJSON格式
+
+        Args:
+            csv_path: CSV文件路径
+            output_path: 输出文件路径
+            encoding: 输入文件编码
+            x_field: X坐标字段名
+            y_field: Y坐标字段名
+            delimiter: 分隔符
+            seq: True 时输出 GeoJSONSeq（每行一个Feature），否则输出 FeatureCollection
+            workers: 解析进程数，大于1时分块并行解析
+            geometry_field: WKT/十六进制WKB几何字段名，设置后忽略 x_field / y_field
+            progress: 进度回调，每 PROGRESS_EVERY 个要素调用一次
+
+        Returns:
+            转换结果字典
+        """
+        return pipeline.convert(
+            csv_path, output_path, "csv", "geojsonl" if seq else "geojson",
+            reader_options=_reader_options(encoding, x_field, y_field, delimiter, workers, geometry_field),
+            progress=progress
+        )
+
+    @staticmethod
+    def iter_geojson(
+        csv_path: str, encoding: str = "UTF-8", x_field: str = "lon", y_field: str = "lat",
+        delimiter: str = ",", seq: bool = False, workers: int = 1, geometry_field: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        不写文件，逐批次生成 GeoJSON / GeoJSONSeq 文本（用于直接流式返回给客户端）
+
+        输入检查在调用时立即完成，生成器只负责读取和编码。
+
+        Raises:
+            ValueError: 文件不存在、缺少坐标 / 几何字段或没有有效数据
+        """
+        return pipeline.iter_geojson(
+            csv_path, "csv", seq=seq,
+            **_reader_options(encoding, x_field, y_field, delimiter, workers, geometry_field)
+        )
+
+    @staticmethod
+    def csv_to_geoparquet(
+        csv_path: str, output_path: str, encoding: str = "UTF-8",
+        x_field: str = "lon", y_field: str = "lat", delimiter: str = ",",
+        workers: int = 1, row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        geometry_field: Optional[str] = None, progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        将CSV文件转换为GeoParquet格式（几何列为WKB编码，按行组写出）
+
+        Args:
+            csv_path: CSV文件路径
+            output_path: 输出 .parquet 文件路径
+            encoding: 输入文件编码
+            x_field: X坐标字段名
+            y_field: Y坐标字段名
+            delimiter: 分隔符
+            workers: 解析进程数，大于1时分块并行解析
+            row_group_size: 每个行组的行数
+            geometry_field: WKT/十六进制WKB几何字段名，设置后忽略 x_field / y_field
+            progress: 进度回调，每 PROGRESS_EVERY 个要素调用一次
+
+        Returns:
+            转换结果字典
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return {
+                "success": False,
+                "error": "GeoParquet输出需要安装 pyarrow"
+            }
+        return pipeline.convert(
+            csv_path, output_path, "csv", "parquet",
+            reader_options=_reader_options(encoding, x_field, y_field, delimiter, workers, geometry_field),
+            writer_options={"row_group_size": row_group_size}, progress=progress
+        )
+
+    @staticmethod
+    def _prepare(
+        csv_path: str, encoding: str, x_field: str, y_field: str, delimiter: str, geometry_field: Optional[str]
+    ) -> CsvSchema:
+        """检查输入并推断字段结构，输入无效时抛出 ValueError"""
+        if not os.path.exists(csv_path):
+            raise ValueError(f"CSV文件不存在: {csv_path}")
+        try:
+            schema, sample_count = infer_schema(csv_path, encoding, x_field, y_field, delimiter, geometry_field)
+        except KeyError as e:
+            missing = e.args[0]
+            kind = "几何" if geometry_field else ("X坐标" if missing == x_field else "Y坐标")
+            raise ValueError(f"CSV中缺少{kind}字段: {missing}")
+        if sample_count == 0:
+            raise ValueError("CSV中没有有效的坐标数据")
+        return schema
@@ -0,0 +1,552 @@
+"""
+CSV分块读取服务
+流式读取CSV点数据（或WKT/WKB几何列），按批次输出已转换为目标字段类型的列式数据（不依赖GDAL）
+"""
+import csv
+import io
+import logging
+import math
+import multiprocessing
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.log import RowWarnings, setup_logging
+
+logger = logging.getLogger(__name__)
+
+# 字段类型（与OGR字段类型一一对应，由写出端映射）
+FIELD_INTEGER = "Integer"
+FIELD_REAL = "Real"
+FIELD_STRING = "String"
+
+# 推断字段类型时检查的有效行数
+SCHEMA_SAMPLE_ROWS = 10
+
+# 每批次行数（写出端以批次为单位提交事务）
+DEFAULT_BATCH_SIZE = 10000
+
+# 并行模式下每个分块的目标字节数
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+# 切分分块时每次读取的字节数
+_SCAN_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+@dataclass
+class CsvSchema:
+    """CSV结构：表头、坐标字段（或几何字段）和属性字段类型"""
+    headers: List[str]
+    x_field: Optional[str]
+    y_field: Optional[str]
+    # 属性字段 [(字段名, 字段类型)]，不含坐标/几何字段，顺序与表头一致
+    fields: List[Tuple[str, str]] = field(default_factory=list)
+    delimiter: str = ","
+    # WKT或十六进制WKB几何字段，设置后忽略 x_field / y_field
+    geometry_field: Optional[str] = None
+
+
+@dataclass
+class PointBatch:
+    """一批有效要素数据（列式存储）"""
+    xs: array = field(default_factory=lambda: array('d'))
+    ys: array = field(default_factory=lambda: array('d'))
+    # 每个属性字段一列，顺序与 CsvSchema.fields 一致，空值为 None
+    columns: List[List[Any]] = field(default_factory=list)
+    # 几何字段模式下为 shapely 几何数组（此时 xs / ys 为空）
+    geometries: Optional[np.ndarray] = None
+    # 产出该批次时已读取到的文件偏移（用于进度估算，串行读取时按读缓冲粒度近似）
+    bytes_read: int = 0
+
+    def __len__(self) -> int:
+        if self.geometries is not None:
+            return len(self.geometries)
+        return len(self.xs)
+
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except (ValueError, OverflowError):
+            return None
+
+
+def _to_real(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _to_string(value: str) -> str:
+    return value
+
+
+_CONVERTERS = {
+    FIELD_INTEGER: _to_int,
+    FIELD_REAL: _to_real,
+    FIELD_STRING: _to_string,
+}
+
+
+def field_converter(field_type: str) -> Callable[[str], Any]:
+    """获取字段类型对应的值转换函数"""
+    return _CONVERTERS[field_type]
+
+
+def _guess_field_type(values: List[Optional[str]]) -> str:
+    """根据样本值猜测字段类型：第一个可解析为数字的值决定类型"""
+    for value in values:
+        if value is None:
+            continue
+        try:
+            int(value)
+            return FIELD_INTEGER
+        except (ValueError, TypeError):
+            try:
+                float(value)
+                return FIELD_REAL
+            except (ValueError, TypeError):
+                pass
+    return FIELD_STRING
+
+
+def _parse_coords(row: dict, x_field: str, y_field: str) -> Optional[Tuple[float, float]]:
+    """解析坐标，缺失或无效时返回 None"""
+    x_val = row.get(x_field)
+    y_val = row.get(y_field)
+    if x_val is None or y_val is None:
+        return None
+    try:
+        x, y = float(x_val), float(y_val)
+    except ValueError:
+        return None
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return None
+    return x, y
+
+
+def parse_geometries(values: List[str]) -> np.ndarray:
+    """
+    批量解析WKT或十六进制WKB字符串（shapely向量化解析）
+
+    以 00 / 01 开头的值按十六进制WKB解析，其余按WKT解析。
+
+    Returns:
+        shapely 几何数组，无法解析或为空几何的位置为 None
+    """
+    import shapely
+
+    raw = np.asarray(values, dtype=object)
+    prefixes = np.asarray([value[:2] for value in values], dtype=object)
+    wkb_mask = (prefixes == "00") | (prefixes == "01")
+
+    geometries = np.empty(len(values), dtype=object)
+    if wkb_mask.any():
+        geometries[wkb_mask] = shapely.from_wkb(raw[wkb_mask], on_invalid="ignore")
+    if not wkb_mask.all():
+        geometries[~wkb_mask] = shapely.from_wkt(raw[~wkb_mask], on_invalid="ignore")
+    geometries[shapely.is_missing(geometries) | shapely.is_empty(geometries)] = None
+    return geometries
+
+
+# shapely 几何类型编号 → (几何族, 名称)
+_SHAPELY_TYPES = {
+    0: ("Point", "Point"),
+    1: ("LineString", "LineString"),
+    2: ("LineString", "LineString"),  # LinearRing
+    3: ("Polygon", "Polygon"),
+    4: ("Point", "MultiPoint"),
+    5: ("LineString", "MultiLineString"),
+    6: ("Polygon", "MultiPolygon"),
+}
+
+
+def infer_geometry_type(geometries: np.ndarray) -> Tuple[Optional[str], bool]:
+    """
+    根据已解析的几何推断图层几何类型
+
+    同一几何族内出现多部件几何时提升为 Multi 类型（如 Polygon + MultiPolygon → MultiPolygon）。
+
+    Returns:
+        (几何类型名称, 是否含Z值)；混合几何族或包含 GeometryCollection 时类型为 None
+    """
+    import shapely
+
+    type_ids = set(np.unique(shapely.get_type_id(geometries)).tolist())
+    has_z = bool(shapely.has_z(geometries).any())
+    if not type_ids or not type_ids <= set(_SHAPELY_TYPES):
+        return None, has_z
+    families = {_SHAPELY_TYPES[t][0] for t in type_ids}
+    if len(families) > 1:
+        return None, has_z
+    family = families.pop()
+    names = {_SHAPELY_TYPES[t][1] for t in type_ids}
+    return (family if names == {family} else f"Multi{family}"), has_z
+
+
+def infer_schema(
+    csv_path: str, encoding: str = "UTF-8",
+    x_field: str = "lon", y_field: str = "lat", delimiter: str = ",",
+    geometry_field: Optional[str] = None
+) -> Tuple[CsvSchema, int]:
+    """
+    只读取文件开头推断CSV结构
+
+    Args:
+        csv_path: CSV文件路径
+        encoding: 输入文件编码
+        x_field: X坐标字段名
+        y_field: Y坐标字段名
+        delimiter: 分隔符
+        geometry_field: WKT/WKB几何字段名，设置后忽略 x_field / y_field
+
+    Returns:
+        (CSV结构, 样本中的有效行数)；有效行数为0说明整个文件没有有效坐标
+
+    Raises:
+        KeyError: 缺少坐标字段或几何字段（异常参数为缺失的字段名）
+    """
+    if geometry_field:
+        x_field = y_field = None
+        required = (geometry_field,)
+    else:
+        required = (x_field, y_field)
+
+    with open(csv_path, 'r', encoding=encoding, newline='') as f:
+        csv_reader = csv.DictReader(f, delimiter=delimiter)
+        headers = csv_reader.fieldnames or []
+
+        for name in required:
+            if name not in headers:
+                raise KeyError(name)
+
+        samples = []
+        if geometry_field:
+            # 几何字段：读取足够多的非空行，再批量校验能否解析
+            candidates = []
+            for row in csv_reader:
+                if row.get(geometry_field):
+                    candidates.append(row)
+                    if len(candidates) >= SCHEMA_SAMPLE_ROWS:
+                        geometries = parse_geometries([r[geometry_field] for r in candidates])
+                        samples.extend(r for r, g in zip(candidates, geometries) if g is not None)
+                        candidates = []
+                        if len(samples) >= SCHEMA_SAMPLE_ROWS:
+                            break
+            if candidates:
+                geometries = parse_geometries([r[geometry_field] for r in candidates])
+                samples.extend(r for r, g in zip(candidates, geometries) if g is not None)
+            samples = samples[:SCHEMA_SAMPLE_ROWS]
+        else:
+            for row in csv_reader:
+                if _parse_coords(row, x_field, y_field) is None:
+                    continue
+                samples.append(row)
+                if len(samples) >= SCHEMA_SAMPLE_ROWS:
+                    break
+
+    fields = [
+        (header, _guess_field_type([row.get(header) for row in samples]))
+        for header in headers
+        if header not in required
+    ]
+    schema = CsvSchema(
+        headers=list(headers), x_field=x_field, y_field=y_field, fields=fields,
+        delimiter=delimiter, geometry_field=geometry_field
+    )
+    return schema, len(samples)
+
+
+def _iter_rows_as_batches(
+    rows: Iterable[List[str]], schema: CsvSchema, batch_size: int, label: str = "行"
+) -> Iterator[PointBatch]:
+    """将原始行（csv.reader 的输出，不含表头）转换为类型化的点批次"""
+    if schema.geometry_field:
+        yield from _iter_rows_as_geometry_batches(rows, schema, batch_size, label)
+        return
+
+    headers = schema.headers
+    x_pos = headers.index(schema.x_field)
+    y_pos = headers.index(schema.y_field)
+    header_pos = {name: pos for pos, name in enumerate(headers)}
+    # (列位置, 转换函数)
+    plan = [(header_pos[name], _CONVERTERS[field_type]) for name, field_type in schema.fields]
+    n_headers = len(headers)
+
+    batch = PointBatch(columns=[[] for _ in plan])
+    xs, ys, columns = batch.xs, batch.ys, batch.columns
+    row_no = 0
+    warnings = RowWarnings(logger, label)
+
+    for values in rows:
+        row_no += 1
+        if len(values) < n_headers:
+            # 与 DictReader 一致：缺失的列视为 None
+            values = values + [None] * (n_headers - len(values))
+        x_val = values[x_pos]
+        y_val = values[y_pos]
+        if x_val is None or y_val is None:
+            warnings.warn("缺少坐标", row_no)
+            continue
+        try:
+            x = float(x_val)
+            y = float(y_val)
+        except ValueError:
+            x = y = math.nan
+        if not (math.isfinite(x) and math.isfinite(y)):
+            warnings.warn("无效坐标值", row_no)
+            continue
+
+        xs.append(x)
+        ys.append(y)
+        for column, (pos, convert) in zip(columns, plan):
+            value = values[pos]
+            column.append(convert(value) if value else None)
+
+        if len(xs) >= batch_size:
+            yield batch
+            batch = PointBatch(columns=[[] for _ in plan])
+            xs, ys, columns = batch.xs, batch.ys, batch.columns
+
+    warnings.summary()
+    if xs:
+        yield batch
+
+
+def _iter_rows_as_geometry_batches(
+    rows: Iterable[List[str]], schema: CsvSchema, batch_size: int, label: str
+) -> Iterator[PointBatch]:
+    """几何字段模式：按批次收集原始字符串，整批向量化解析后过滤无效几何"""
+    import shapely
+
+    headers = schema.headers
+    geom_pos = headers.index(schema.geometry_field)
+    header_pos = {name: pos for pos, name in enumerate(headers)}
+    plan = [(header_pos[name], _CONVERTERS[field_type]) for name, field_type in schema.fields]
+    n_headers = len(headers)
+    warnings = RowWarnings(logger, label)
+
+    def flush(raw: List[str], columns: List[List[Any]], first_row: int) -> Optional[PointBatch]:
+        geometries = parse_geometries(raw)
+        valid = ~shapely.is_missing(geometries)
+        invalid_count = len(raw) - int(valid.sum())
+        if invalid_count:
+            warnings.warn("几何无效", first_row, count=invalid_count)
+            columns = [[v for v, ok in zip(column, valid) if ok] for column in columns]
+            geometries = geometries[valid]
+        if not len(geometries):
+            return None
+        return PointBatch(columns=columns, geometries=geometries)
+
+    raw: List[str] = []
+    columns: List[List[Any]] = [[] for _ in plan]
+    row_no = 0
+    first_row = 1
+
+    for values in rows:
+        row_no += 1
+        if len(values) < n_headers:
+            values = values + [None] * (n_headers - len(values))
+        geom_val = values[geom_pos]
+        if not geom_val:
+            warnings.warn("缺少几何", row_no)
+            continue
+
+        raw.append(geom_val)
+        for column, (pos, convert) in zip(columns, plan):
+            value = values[pos]
+            column.append(convert(value) if value else None)
+
+        if len(raw) >= batch_size:
+            batch = flush(raw, columns, first_row)
+            if batch is not None:
+                yield batch
+            raw, columns = [], [[] for _ in plan]
+            first_row = row_no + 1
+
+    if raw:
+        batch = flush(raw, columns, first_row)
+        if batch is not None:
+            yield batch
+    warnings.summary()
+
+
+def iter_point_batches(
+    csv_path: str, schema: CsvSchema, encoding: str = "UTF-8",
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[PointBatch]:
+    """
+    流式读取CSV，按批次产出有效点数据
+
+    坐标缺失或无效的行被跳过；属性值已按 schema 中的字段类型转换，
+    无法转换或为空字符串的值为 None。
+
+    Args:
+        csv_path: CSV文件路径
+        schema: infer_schema 得到的CSV结构
+        encoding: 输入文件编码
+        batch_size: 每批次行数
+
+    Yields:
+        PointBatch
+    """
+    with open(csv_path, 'rb') as raw:
+        f = io.TextIOWrapper(raw, encoding=encoding, newline='')
+        reader = csv.reader(f, delimiter=schema.delimiter)
+        next(reader, None)  # 跳过表头
+        for batch in _iter_rows_as_batches(reader, schema, batch_size):
+            batch.bytes_read = raw.tell()
+            yield batch
+
+
+def split_byte_ranges(csv_path: str, chunk_count: int) -> List[Tuple[int, int]]:
+    """
+    按字节范围切分CSV数据区（不含表头），切分点对齐到行首
+
+    通过统计双引号的奇偶性跟踪是否处于引号字段内，引号内的换行不会被当作切分点。
+    只在目标切分位置附近逐行查找，其余区域按块计数，扫描速度接近磁盘读取速度。
+    UTF-8 和 GBK 的多字节字符中不会出现 0x0A 和 0x22，因此可以直接按字节扫描。
+
+    Args:
+        csv_path: CSV文件路径
+        chunk_count: 期望的分块数量
+
+    Returns:
+        [(起始偏移, 结束偏移)]，按文件顺序排列，覆盖整个数据区
+    """
+    size = os.path.getsize(csv_path)
+    data_start = None
+    boundaries = []
+    targets = deque([0])  # 第一个切分点即表头结束位置
+    in_quotes = 0
+
+    with open(csv_path, 'rb') as f:
+        offset = 0
+        while targets:
+            block = f.read(_SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            pos = 0
+            block_end = offset + len(block)
+            while targets and targets[0] < block_end:
+                # 统计到目标位置为止的引号，然后逐行查找引号外的行尾
+                target = max(targets[0] - offset, pos)
+                in_quotes ^= block.count(b'"', pos, target) & 1
+                pos = target
+                newline = -1
+                while True:
+                    newline = block.find(b'\n', pos)
+                    if newline < 0:
+                        break
+                    in_quotes ^= block.count(b'"', pos, newline) & 1
+                    pos = newline + 1
+                    if not in_quotes:
+                        break
+                if newline < 0:
+                    # 本块内没有合适的行尾，继续在下一块查找
+                    in_quotes ^= block.count(b'"', pos) & 1
+                    pos = len(block)
+                    targets[0] = block_end
+                    break
+
+                line_start = offset + pos
+                if data_start is None:
+                    data_start = line_start
+                    targets.popleft()
+                    data_size = size - data_start
+                    targets.extend(
+                        data_start + data_size * k // chunk_count for k in range(1, chunk_count)
+                    )
+                else:
+                    while targets and targets[0] <= line_start:
+                        targets.popleft()
+                    if line_start < size:
+                        boundaries.append(line_start)
+            else:
+                in_quotes ^= block.count(b'"', pos) & 1
+            offset = block_end
+
+    if data_start is None:
+        # 只有表头（或空文件）
+        return []
+    edges = [data_start] + boundaries + [size]
+    return [(a, b) for a, b in zip(edges, edges[1:]) if b > a]
+
+
+def parse_byte_range(
+    csv_path: str, start: int, end: int, schema: CsvSchema, encoding: str = "UTF-8"
+) -> PointBatch:
+    """
+    解析CSV中的一个字节范围（由 split_byte_ranges 得到），返回该分块的全部有效点
+
+    供进程池调用：只依赖可序列化的参数，返回值为一个列式批次。
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    reader = csv.reader(io.StringIO(data.decode(encoding), newline=''), delimiter=schema.delimiter)
+    batches = list(_iter_rows_as_batches(reader, schema, batch_size=end - start + 1, label=f"分块@{start} 行"))
+    batch = batches[0] if batches else PointBatch(columns=[[] for _ in schema.fields])
+    batch.bytes_read = end
+    return batch
+
+
+def iter_point_batches_parallel(
+    csv_path: str, schema: CsvSchema, encoding: str = "UTF-8", workers: int = 2,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES
+) -> Iterator[PointBatch]:
+    """
+    按字节范围分块，在进程池中并行解析，按文件顺序产出批次
+
+    产出顺序与 iter_point_batches 一致，写出端按顺序编号即可得到与串行路径相同的 id。
+    同时在途的分块数量限制为 workers 的2倍，内存占用与文件大小无关。
+
+    Args:
+        csv_path: CSV文件路径
+        schema: infer_schema 得到的CSV结构
+        encoding: 输入文件编码
+        workers: 解析进程数
+        chunk_bytes: 每个分块的目标字节数
+
+    Yields:
+        PointBatch（每个分块一个）
+    """
+    size = os.path.getsize(csv_path)
+    chunk_count = max(workers, -(-size // chunk_bytes))
+    ranges = iter(split_byte_ranges(csv_path, chunk_count))
+
+    # 在服务的转换线程中调用，fork 可能继承其它线程占用的锁，与转换执行池一样使用 spawn
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=setup_logging
+    ) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(parse_byte_range, csv_path, start, end, schema, encoding))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            batch = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                pending.append(pool.submit(parse_byte_range, csv_path, *next_range, schema, encoding))
+            if len(batch):
+                yield batch
+
+
+def read_point_batches(
+    csv_path: str, schema: CsvSchema, encoding: str = "UTF-8", workers: int = 1
+) -> Iterator[PointBatch]:
+    """按 workers 选择串行或分块并行读取，产出顺序相同"""
+    if workers > 1:
+        logger.debug("分块并行解析: %s 个进程", workers)
+        return iter_point_batches_parallel(csv_path, schema, encoding, workers)
+    return iter_point_batches(csv_path, schema, encoding)
@@ -0,0 +1,93 @@
+"""
+CSV转换服务 Mock 版本
+不依赖 GDAL，只在 MOCK_CONVERTERS=True 时使用（压测 HTTP 层）：
+读取全部数据行统计要素数，输出占位的 Shapefile 文件
+"""
+import csv
+import logging
+import os
+from typing import Dict, Any, Optional
+
+from app.core.progress import ProgressCallback, ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+
+class CsvConverter:
+    """CSV文件转换器 Mock 版本"""
+
+    @staticmethod
+    def csv_to_shp(
+        csv_path: str, output_path: str, encoding: str = "UTF-8",
+        x_field: str = "lon", y_field: str = "lat", workers: int = 1,
+        delimiter: str = ",", geometry_field: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Mock: 将CSV文件转换为SHP格式
+
+        参数与 csv_service.CsvConverter.csv_to_shp 相同，workers 被忽略
+
+        Returns:
+            转换结果字典
+        """
+        try:
+            logger.debug("Mock ========== 开始转换 =========")
+            logger.debug("输入路径: %s", csv_path)
+            logger.debug("输出路径: %s", output_path)
+
+            if not os.path.exists(csv_path):
+                return {
+                    "success": False,
+                    "error": f"CSV文件不存在: {csv_path}"
+                }
+
+            with open(csv_path, "r", encoding=encoding, newline="") as f:
+                reader = csv.reader(f, delimiter=delimiter)
+                headers = next(reader, [])
+                required = [geometry_field] if geometry_field else [x_field, y_field]
+                for field in required:
+                    if field not in headers:
+                        kind = "几何" if geometry_field else ("X坐标" if field == x_field else "Y坐标")
+                        return {
+                            "success": False,
+                            "error": f"CSV中缺少{kind}字段: {field}"
+                        }
+                feature_count = sum(1 for row in reader if row)
+
+            if feature_count == 0:
+                return {
+                    "success": False,
+                    "error": "CSV中没有有效的坐标数据"
+                }
+
+            # Mock: 创建占位的输出文件
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write("# Mock Shapefile - 需要 GDAL 才能真正转换\n")
+            base_path = os.path.splitext(output_path)[0]
+            for ext in ('.shx', '.dbf'):
+                with open(base_path + ext, 'wb') as f:
+                    f.write(b'Mock')
+
+            ProgressReporter(progress, total=feature_count).finish(feature_count)
+            logger.debug("Mock ========== 转换完成 =========")
+
+            return {
+                "success": True,
+                "message": "Mock转换成功（需要安装GDAL才能生成真正的Shapefile）",
+                "feature_count": feature_count,
+                "output_path": output_path,
+                "file_size": os.path.getsize(output_path),
+                "x_field": None if geometry_field else x_field,
+                "y_field": None if geometry_field else y_field,
+                "geometry_field": geometry_field,
+                "geometry_type": "Point" if not geometry_field else "Unknown"
+            }
+
+        except Exception as e:
+            logger.exception("异常: %s", str(e))
+            return {
+                "success": False,
+                "error": f"转换失败: {str(e)}"
+            }
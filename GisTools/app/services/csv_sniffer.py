@@ -0,0 +1,319 @@
+"""
+CSV嗅探服务
+只读取文件开头的一小段，自动识别编码、分隔符、坐标字段和WKT/WKB几何字段（不依赖GDAL）
+"""
+import codecs
+import csv
+import io
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 嗅探读取的字节数
+SNIFF_PREFIX_SIZE = 64 * 1024
+
+# 嗅探时最多解析的数据行数
+SNIFF_MAX_ROWS = 200
+
+# 候选分隔符
+DELIMITERS = ",;\t|"
+
+# 坐标字段候选名（按优先级排列，比较时忽略大小写、空格、下划线和连字符）
+X_FIELD_CANDIDATES = ["lon", "lng", "longitude", "long", "经度", "x", "pointx", "xcoord", "x坐标", "东经"]
+Y_FIELD_CANDIDATES = ["lat", "latitude", "纬度", "y", "pointy", "ycoord", "y坐标", "北纬"]
+
+# 几何字段候选名
+GEOMETRY_FIELD_CANDIDATES = ["wkt", "geometry", "geom", "thegeom", "shape", "wkb", "几何"]
+
+# WKT 或十六进制 WKB 取值
+_WKT_PATTERN = re.compile(
+    r"^\s*(SRID=\d+;\s*)?(MULTI)?(POINT|LINESTRING|POLYGON)|^\s*GEOMETRYCOLLECTION", re.IGNORECASE
+)
+_HEX_WKB_PATTERN = re.compile(r"^0[01][0-9A-Fa-f]{8,}$")
+
+# 按数值范围推断坐标字段时所需的有效值比例
+_MIN_VALID_RATIO = 0.9
+# 字段名匹配的坐标字段所需的数值比例（允许少量无效行）
+_MIN_NAMED_RATIO = 0.5
+
+
+def _normalize_name(name: str) -> str:
+    return re.sub(r"[\s_\-]", "", name.strip().lower())
+
+
+def _trim_to_last_line(prefix: bytes, complete: bool) -> bytes:
+    """截断到最后一个换行，避免末尾出现不完整的行或被截断的多字节字符"""
+    if complete:
+        return prefix
+    newline = prefix.rfind(b"\n")
+    return prefix[:newline + 1] if newline >= 0 else prefix
+
+
+def detect_encoding(prefix: bytes, complete: bool = False) -> Optional[str]:
+    """
+    识别编码：UTF-8-SIG（带BOM）、UTF-8、GBK
+
+    Args:
+        prefix: 文件开头的字节
+        complete: prefix 是否为完整文件
+
+    Returns:
+        编码名称，无法识别时返回 None
+    """
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "UTF-8-SIG"
+    data = _trim_to_last_line(prefix, complete)
+    for encoding in ("UTF-8", "GBK"):
+        try:
+            data.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def detect_delimiter(text: str) -> str:
+    """识别分隔符，无法识别时默认为逗号"""
+    sample = "\n".join(text.splitlines()[:50])
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # 退化为统计表头中各候选分隔符的出现次数
+        header = sample.split("\n", 1)[0]
+        counts = {d: header.count(d) for d in DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] > 0 else ","
+
+
+def _to_float_array(values: List[str]) -> np.ndarray:
+    """字符串列转换为浮点数组，无法解析的值为 NaN"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except ValueError:
+        out = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _column_stats(values: np.ndarray) -> Dict[str, Any]:
+    """数值列的向量化范围检查"""
+    finite = np.isfinite(values)
+    n = len(values)
+    numeric_ratio = float(finite.sum()) / n if n else 0.0
+    in_lon = float((finite & (values >= -180) & (values <= 180)).sum()) / n if n else 0.0
+    in_lat = float((finite & (values >= -90) & (values <= 90)).sum()) / n if n else 0.0
+    return {
+        "numeric_ratio": numeric_ratio,
+        "lon_ratio": in_lon,
+        "lat_ratio": in_lat,
+        "min": float(np.nanmin(values)) if finite.any() else None,
+        "max": float(np.nanmax(values)) if finite.any() else None,
+    }
+
+
+def _match_by_name(headers: List[str], candidates: List[str], exclude: Optional[str] = None) -> Optional[str]:
+    normalized = {_normalize_name(h): h for h in headers if h != exclude}
+    for candidate in candidates:
+        if candidate in normalized:
+            return normalized[candidate]
+    return None
+
+
+def detect_coordinate_fields(
+    headers: List[str], rows: List[List[str]]
+) -> Tuple[Optional[str], Optional[str], Optional[str], Dict[str, Dict[str, Any]]]:
+    """
+    识别坐标字段
+
+    先按字段名匹配（lon/lat、x/y、经度/纬度等），再用数值范围校验；
+    字段名无法匹配时，选择数值全部落在经纬度范围内的前两列。
+
+    Returns:
+        (x字段, y字段, 坐标类型 geographic/projected, 各数值列的统计信息)
+    """
+    stats = {}
+    for pos, header in enumerate(headers):
+        column = [row[pos] if pos < len(row) else "" for row in rows]
+        values = _to_float_array(column)
+        column_stats = _column_stats(values)
+        if column_stats["numeric_ratio"] >= _MIN_NAMED_RATIO:
+            stats[header] = column_stats
+
+    x_field = _match_by_name(headers, X_FIELD_CANDIDATES)
+    y_field = _match_by_name(headers, Y_FIELD_CANDIDATES, exclude=x_field)
+
+    if x_field not in stats or y_field not in stats:
+        # 按数值范围推断：经度列在 [-180, 180]，纬度列在 [-90, 90]
+        x_field = y_field = None
+        numeric = [h for h, s in stats.items() if s["numeric_ratio"] >= _MIN_VALID_RATIO]
+        for header in numeric:
+            if x_field is None and stats[header]["lon_ratio"] >= _MIN_VALID_RATIO:
+                x_field = header
+            elif x_field is not None and stats[header]["lat_ratio"] >= _MIN_VALID_RATIO:
+                y_field = header
+                break
+
+    coordinate_system = None
+    if x_field and y_field:
+        geographic = (
+            stats[x_field]["lon_ratio"] >= _MIN_VALID_RATIO * stats[x_field]["numeric_ratio"]
+            and stats[y_field]["lat_ratio"] >= _MIN_VALID_RATIO * stats[y_field]["numeric_ratio"]
+        )
+        coordinate_system = "geographic" if geographic else "projected"
+
+    return x_field, y_field, coordinate_system, stats
+
+
+def detect_geometry_field(headers: List[str], rows: List[List[str]]) -> Optional[str]:
+    """
+    识别WKT/十六进制WKB几何字段：优先按字段名匹配，再检查取值是否为WKT或WKB
+
+    Returns:
+        几何字段名，无法识别时返回 None
+    """
+    def looks_like_geometry(pos: int) -> bool:
+        values = [row[pos] for row in rows if pos < len(row) and row[pos]]
+        if not values:
+            return False
+        matched = sum(1 for v in values if _WKT_PATTERN.match(v) or _HEX_WKB_PATTERN.match(v))
+        return matched >= _MIN_VALID_RATIO * len(values)
+
+    named = _match_by_name(headers, GEOMETRY_FIELD_CANDIDATES)
+    if named is not None and looks_like_geometry(headers.index(named)):
+        return named
+    for pos, header in enumerate(headers):
+        if looks_like_geometry(pos):
+            return header
+    return None
+
+
+def sniff_csv(
+    prefix: bytes, complete: bool = False,
+    encoding: Optional[str] = None, delimiter: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    嗅探CSV开头内容
+
+    Args:
+        prefix: 文件开头的字节（建议 SNIFF_PREFIX_SIZE）
+        complete: prefix 是否为完整文件
+        encoding: 已知编码（为空则自动识别）；带BOM的文件会自动改用 UTF-8-SIG
+        delimiter: 已知分隔符（为空则自动识别）
+
+    Returns:
+        嗅探结果字典
+    """
+    detected = detect_encoding(prefix, complete)
+    if encoding is None or (detected == "UTF-8-SIG" and encoding.upper().replace("_", "-") == "UTF-8"):
+        encoding = detected
+    if encoding is None:
+        return {
+            "success": False,
+            "error": "无法识别文件编码（支持 UTF-8、UTF-8-SIG、GBK）"
+        }
+
+    try:
+        text = _trim_to_last_line(prefix, complete).decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        hint = f"，识别到的编码为 {detected}" if detected else ""
+        return {
+            "success": False,
+            "error": f"文件无法按 {encoding} 编码读取{hint}"
+        }
+    if delimiter is None:
+        delimiter = detect_delimiter(text)
+
+    reader = csv.reader(io.StringIO(text, newline=""), delimiter=delimiter)
+    headers = next(reader, None)
+    if not headers:
+        return {
+            "success": False,
+            "error": "CSV文件为空或缺少表头"
+        }
+
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) >= SNIFF_MAX_ROWS:
+            break
+    if not complete and rows and len(rows) < SNIFF_MAX_ROWS:
+        # 最后一行可能因引号内换行被截断
+        rows.pop()
+
+    x_field, y_field, coordinate_system, stats = detect_coordinate_fields(headers, rows)
+    geometry_field = detect_geometry_field(headers, rows)
+
+    warnings = []
+    if (x_field is None or y_field is None) and geometry_field is None:
+        warnings.append("未能识别坐标字段，请手动指定 x_field 和 y_field（或 geometry_field）")
+    elif coordinate_system == "projected":
+        warnings.append("坐标值超出经纬度范围，可能是投影坐标")
+
+    return {
+        "success": True,
+        "encoding": encoding,
+        "delimiter": delimiter,
+        "headers": headers,
+        "x_field": x_field,
+        "y_field": y_field,
+        "geometry_field": geometry_field,
+        "coordinate_system": coordinate_system,
+        "sample_rows": len(rows),
+        "numeric_fields": {name: {"min": s["min"], "max": s["max"]} for name, s in stats.items()},
+        "warnings": warnings,
+    }
+
+
+def sniff_csv_file(
+    csv_path: str, prefix_size: int = SNIFF_PREFIX_SIZE,
+    encoding: Optional[str] = None, delimiter: Optional[str] = None
+) -> Dict[str, Any]:
+    """只读取文件开头 prefix_size 字节进行嗅探"""
+    with open(csv_path, "rb") as f:
+        prefix = f.read(prefix_size + 1)
+    complete = len(prefix) <= prefix_size
+    return sniff_csv(prefix[:prefix_size], complete, encoding, delimiter)
+
+
+def resolve_csv_params(
+    sniffed: Dict[str, Any], x_field: Optional[str], y_field: Optional[str], geometry_field: Optional[str]
+):
+    """
+    用嗅探结果补全未指定的坐标字段（或几何字段），并校验已指定的字段
+
+    未指定任何字段时优先使用识别到的坐标字段，识别不到再使用识别到的WKT/WKB几何字段。
+
+    Returns:
+        (编码, 分隔符, X字段, Y字段, 几何字段)
+
+    Raises:
+        ValueError: 无法确定参数或参数与文件内容不符
+    """
+    if not sniffed["success"]:
+        raise ValueError(sniffed["error"])
+
+    headers = sniffed["headers"]
+    encoding, delimiter = sniffed["encoding"], sniffed["delimiter"]
+
+    if geometry_field is None and x_field is None and y_field is None:
+        if (sniffed["x_field"] is None or sniffed["y_field"] is None) and sniffed["geometry_field"]:
+            geometry_field = sniffed["geometry_field"]
+
+    if geometry_field is not None:
+        if geometry_field not in headers:
+            raise ValueError(f"CSV中缺少几何字段: {geometry_field}，可选字段: {headers}")
+        return encoding, delimiter, None, None, geometry_field
+
+    for name, value, detected in (("X", x_field, sniffed["x_field"]), ("Y", y_field, sniffed["y_field"])):
+        if value is None and detected is None:
+            raise ValueError(f"无法自动识别{name}坐标字段，请指定 {name.lower()}_field，可选字段: {headers}")
+        if value is not None and value not in headers:
+            hint = f"，识别到的坐标字段为 {detected}" if detected else ""
+            raise ValueError(f"CSV中缺少{name}坐标字段: {value}{hint}")
+
+    return encoding, delimiter, x_field or sniffed["x_field"], y_field or sniffed["y_field"], None
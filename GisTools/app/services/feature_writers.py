@@ -0,0 +1,224 @@
+"""
+要素写出器（不依赖GDAL）
+流式写出 GeoJSON / GeoJSONSeq / CSV / GeoParquet，签名见 pipeline 模块说明
+"""
+import csv
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.progress import ProgressReporter
+from app.services.csv_reader import FIELD_INTEGER, FIELD_REAL, PointBatch
+from app.services.pipeline import LayerSchema
+
+logger = logging.getLogger(__name__)
+
+# GeoParquet 每个行组的行数（行组是并行读取的最小单位）
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+# 输出文件写缓冲大小
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 点的WKB编码：字节序(1) + 几何类型(4) + X(8) + Y(8)
+_POINT_WKB_DTYPE = np.dtype([("byte_order", "u1"), ("geom_type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+
+
+def write_geojson(
+    output_path: str, schema: LayerSchema, batches: Iterable[PointBatch], reporter: ProgressReporter,
+    encoding: str = "UTF-8", seq: bool = False
+) -> int:
+    """流式写出 GeoJSON FeatureCollection（seq=True 时为 GeoJSONSeq），返回要素数"""
+    counter = []
+    with open(output_path, "w", encoding=encoding, buffering=_WRITE_BUFFER_SIZE) as f:
+        for chunk in iter_geojson_text(schema, batches, seq, reporter, counter):
+            f.write(chunk)
+    return counter[0]
+
+
+def write_geojsonl(
+    output_path: str, schema: LayerSchema, batches: Iterable[PointBatch], reporter: ProgressReporter,
+    encoding: str = "UTF-8"
+) -> int:
+    """流式写出 GeoJSONSeq（每行一个Feature），返回要素数"""
+    return write_geojson(output_path, schema, batches, reporter, encoding, seq=True)
+
+
+def iter_geojson_text(
+    schema: LayerSchema, batches: Iterable[PointBatch], seq: bool, reporter: ProgressReporter,
+    counter: Optional[List[int]] = None
+) -> Iterator[str]:
+    """
+    逐批次生成 GeoJSON FeatureCollection 或 GeoJSONSeq 文本，要素 id 与 SHP 输出的 id 字段一致
+
+    Args:
+        counter: 生成结束时追加写出的要素数
+    """
+    names = [name for name, _ in schema.fields]
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    written = 0
+
+    if not seq:
+        head = '{"type":"FeatureCollection",'
+        if schema.crs:
+            head += '"crs":' + dumps({"type": "name", "properties": {"name": schema.crs}}) + ","
+        yield head + '"features":[\n'
+    separator = "\n" if seq else ",\n"
+    for batch in batches:
+        xs, ys, columns = batch.xs, batch.ys, batch.columns
+        if batch.geometries is not None:
+            import shapely
+
+            # 整批向量化导出几何JSON
+            geometries = [geometry or "null" for geometry in shapely.to_geojson(batch.geometries)]
+        else:
+            geometries = [
+                f'{{"type":"Point","coordinates":[{x!r},{y!r}]}}' for x, y in zip(xs, ys)
+            ]
+        lines = []
+        for i, geometry in enumerate(geometries):
+            written += 1
+            properties = dumps({name: column[i] for name, column in zip(names, columns)})
+            lines.append(
+                f'{{"type":"Feature","id":{written},'
+                f'"geometry":{geometry},"properties":{properties}}}'
+            )
+        if lines:
+            # 与上一批次之间需要分隔符
+            yield (separator if written > len(lines) else "") + separator.join(lines)
+        reporter.update(written, batch.bytes_read)
+    if seq:
+        if written:
+            yield "\n"
+    else:
+        yield "\n]}\n"
+
+    if counter is not None:
+        counter.append(written)
+
+
+def write_csv(
+    output_path: str, schema: LayerSchema, batches: Iterable[PointBatch], reporter: ProgressReporter,
+    encoding: str = "UTF-8", delimiter: str = ",", x_field: str = "lon", y_field: str = "lat",
+    geometry_field: str = "wkt"
+) -> int:
+    """
+    流式写出CSV：点图层写为 x_field / y_field 两列，其它几何写为 WKT 列，之后为属性字段
+
+    Returns:
+        写出的要素数
+    """
+    points = schema.geometry_type == "Point"
+    names = [name for name, _ in schema.fields]
+    written = 0
+    with open(output_path, "w", encoding=encoding, newline="", buffering=_WRITE_BUFFER_SIZE) as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(([x_field, y_field] if points else [geometry_field]) + names)
+        for batch in batches:
+            if batch.geometries is None:
+                geometry_columns = [batch.xs, batch.ys] if points else [
+                    [f"POINT ({x!r} {y!r})" for x, y in zip(batch.xs, batch.ys)]
+                ]
+            else:
+                import shapely
+
+                if points:
+                    geometry_columns = [shapely.get_x(batch.geometries), shapely.get_y(batch.geometries)]
+                else:
+                    geometry_columns = [shapely.to_wkt(batch.geometries, rounding_precision=-1)]
+            columns = [
+                ["" if value is None else value for value in column] for column in batch.columns
+            ]
+            writer.writerows(zip(*geometry_columns, *columns))
+            written += len(batch)
+            reporter.update(written, batch.bytes_read)
+    return written
+
+
+def _point_wkb_array(xs, ys):
+    """向量化生成点的WKB二进制列（无需逐行构造几何对象）"""
+    import pyarrow as pa
+
+    n = len(xs)
+    records = np.empty(n, dtype=_POINT_WKB_DTYPE)
+    records["byte_order"] = 1  # 小端
+    records["geom_type"] = 1   # Point
+    records["x"] = np.frombuffer(xs, dtype=np.float64)
+    records["y"] = np.frombuffer(ys, dtype=np.float64)
+    offsets = np.arange(0, (n + 1) * _POINT_WKB_DTYPE.itemsize, _POINT_WKB_DTYPE.itemsize, dtype=np.int32)
+    return pa.Array.from_buffers(
+        pa.binary(), n, [None, pa.py_buffer(offsets), pa.py_buffer(records.tobytes())]
+    )
+
+
+def _geoparquet_metadata(geometry_types: List[str], crs_projjson: Optional[Dict[str, Any]]) -> bytes:
+    """GeoParquet 1.0 文件级元数据（crs 必须为 PROJJSON；省略即为 OGC:CRS84，与 WGS 84 经纬度一致）"""
+    column = {"encoding": "WKB", "geometry_types": geometry_types}
+    if crs_projjson:
+        column["crs"] = crs_projjson
+    return json.dumps({
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": column},
+    }).encode("utf-8")
+
+
+def write_geoparquet(
+    output_path: str, schema: LayerSchema, batches: Iterable[PointBatch], reporter: ProgressReporter,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> int:
+    """按行组写出GeoParquet（几何列为WKB编码），每凑满 row_group_size 行写出一个行组"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("GeoParquet输出需要安装 pyarrow")
+
+    arrow_types = {FIELD_INTEGER: pa.int64(), FIELD_REAL: pa.float64()}
+    # 输入已有 id 字段（如本服务输出的Shapefile）时沿用，不再生成
+    with_id = all(name != "id" for name, _ in schema.fields)
+    fields = [pa.field("id", pa.int64())] if with_id else []
+    fields += [pa.field(name, arrow_types.get(field_type, pa.string())) for name, field_type in schema.fields]
+    fields.append(pa.field("geometry", pa.binary()))
+    attribute_fields = fields[1 if with_id else 0:-1]
+    # 几何类型在写完前无法确定时，按规范用空列表表示未知
+    geometry_types = [schema.geometry_type] if schema.geometry_type else []
+    metadata = _geoparquet_metadata(geometry_types, schema.crs_projjson)
+    arrow_schema = pa.schema(fields, metadata={b"geo": metadata})
+
+    written = 0
+    pending: List[pa.RecordBatch] = []
+    pending_rows = 0
+
+    with pq.ParquetWriter(output_path, arrow_schema) as writer:
+        for batch in batches:
+            n = len(batch)
+            arrays = [pa.array(np.arange(written + 1, written + n + 1, dtype=np.int64))] if with_id else []
+            arrays += [
+                pa.array(column, type=field.type)
+                for column, field in zip(batch.columns, attribute_fields)
+            ]
+            if batch.geometries is not None:
+                import shapely
+
+                arrays.append(pa.array(shapely.to_wkb(batch.geometries), type=pa.binary()))
+            else:
+                arrays.append(_point_wkb_array(batch.xs, batch.ys))
+            pending.append(pa.RecordBatch.from_arrays(arrays, schema=arrow_schema))
+            pending_rows += n
+            written += n
+            reporter.update(written, batch.bytes_read)
+
+            if pending_rows >= row_group_size:
+                # 写出完整的行组，余下的行留到下一个行组
+                table = pa.Table.from_batches(pending)
+                full = pending_rows - pending_rows % row_group_size
+                writer.write_table(table.slice(0, full), row_group_size=row_group_size)
+                pending = table.slice(full).to_batches()
+                pending_rows -= full
+
+        if pending_rows:
+            writer.write_table(pa.Table.from_batches(pending, schema=arrow_schema), row_group_size=row_group_size)
+
+    return written
@@ -0,0 +1,303 @@
+"""
+GeoJSON流式读取服务
+逐个解析 FeatureCollection 的 features 数组元素（不把整个文件读入内存），按批次输出列式要素（不依赖GDAL）
+"""
+import io
+import itertools
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from app.core.log import RowWarnings
+from app.services.csv_reader import (
+    DEFAULT_BATCH_SIZE, FIELD_INTEGER, FIELD_REAL, FIELD_STRING, PointBatch, _to_int, _to_real,
+)
+from app.services.pipeline import LayerSchema, Source
+
+logger = logging.getLogger(__name__)
+
+# 每次从文件读取的字符数
+_READ_CHUNK_CHARS = 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JsonStream:
+    """在按需补充的文本缓冲上逐个解析JSON值（单个值可以跨越多次读取）"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = _READ_CHUNK_CHARS) -> bool:
+        """丢弃已解析的部分并读入更多文本，已到文件末尾时返回 False"""
+        if self.eof:
+            return False
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（不消费），文件结束时返回空字符串"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        found = self.peek()
+        if found != ch:
+            raise ValueError(f"GeoJSON解析错误: 位置 {self.pos} 处应为 '{ch}'" if found else "GeoJSON文件不完整")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """解析下一个完整的JSON值"""
+        if not self.peek():
+            raise ValueError("GeoJSON文件不完整")
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # 值被缓冲截断：每次至少读入与当前剩余部分等量的文本，避免大要素反复重试
+                if self._fill(max(_READ_CHUNK_CHARS, len(self.buf) - self.pos)):
+                    continue
+                raise ValueError(f"GeoJSON解析错误: {e.msg}")
+            # 数字可能恰好在缓冲末尾被截断
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_features(stream: _JsonStream) -> Iterator[Dict[str, Any]]:
+    """
+    逐个产出顶层对象中的要素
+
+    顶层 features 数组逐个元素解析，其它成员（type、crs 等）整体解析；
+    单个 Feature 在对象结束后作为唯一要素产出。
+
+    Raises:
+        ValueError: JSON语法错误、不是GeoJSON对象或类型不受支持
+    """
+    if stream.peek() != "{":
+        raise ValueError("无效的GeoJSON格式")
+    stream.pos += 1
+
+    header: Dict[str, Any] = {}
+    streamed = False
+    first = True
+    while stream.peek() != "}":
+        if not first:
+            stream.expect(",")
+        first = False
+        key = stream.value()
+        stream.expect(":")
+        if key == "features" and stream.peek() == "[":
+            _check_type(header.get("type"), "FeatureCollection")
+            stream.pos += 1
+            streamed = True
+            first_item = True
+            while stream.peek() != "]":
+                if not first_item:
+                    stream.expect(",")
+                first_item = False
+                yield stream.value()
+            stream.pos += 1
+        else:
+            header[key] = stream.value()
+    stream.pos += 1
+
+    geojson_type = header.get("type")
+    if streamed or geojson_type == "FeatureCollection":
+        _check_type(geojson_type, "FeatureCollection")
+    elif geojson_type == "Feature":
+        yield header
+    else:
+        _check_type(geojson_type, "Feature")
+
+
+def _check_type(geojson_type: Any, expected: str) -> None:
+    if geojson_type is None:
+        raise ValueError("无效的GeoJSON格式")
+    if geojson_type != expected:
+        raise ValueError(f"不支持的GeoJSON类型: {geojson_type}")
+
+
+def _iter_lines(f) -> Iterator[Dict[str, Any]]:
+    """GeoJSONSeq：每行一个要素（兼容 RFC 8142 的记录分隔符）"""
+    for line_no, line in enumerate(f, 1):
+        line = line.strip().lstrip("\x1e")
+        if not line:
+            continue
+        try:
+            feature = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"GeoJSON解析错误: 第 {line_no} 行 {e.msg}")
+        if isinstance(feature, dict) and feature.get("type") == "FeatureCollection":
+            # 整个集合写在一行
+            yield from feature.get("features") or []
+        else:
+            yield feature
+
+
+def _guess_field_type(values: List[Any]) -> str:
+    """根据样本值猜测字段类型：全部为整数（含布尔）为 Integer，全部为数字为 Real，否则为 String"""
+    field_type = None
+    for value in values:
+        if isinstance(value, (bool, int)):
+            field_type = field_type or FIELD_INTEGER
+        elif isinstance(value, float):
+            field_type = FIELD_REAL
+        else:
+            return FIELD_STRING
+    return field_type or FIELD_STRING
+
+
+def _coerce_integer(value: Any):
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        return _to_int(value) if value else None
+    return None
+
+
+def _coerce_real(value: Any):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return _to_real(value) if value else None
+    return None
+
+
+def _coerce_string(value: Any):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+_COERCERS = {
+    FIELD_INTEGER: _coerce_integer,
+    FIELD_REAL: _coerce_real,
+    FIELD_STRING: _coerce_string,
+}
+
+
+def _properties(feature: Any, feature_no: int) -> Dict[str, Any]:
+    if not isinstance(feature, dict):
+        raise ValueError(f"无效的GeoJSON要素: 第 {feature_no} 个")
+    return feature.get("properties") or {}
+
+
+def _infer_fields(features: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """字段为样本中所有属性名的并集（按首次出现的顺序），类型由非空值决定"""
+    samples: Dict[str, List[Any]] = {}
+    for feature_no, feature in enumerate(features, 1):
+        for key, value in _properties(feature, feature_no).items():
+            values = samples.setdefault(key, [])
+            if value is not None:
+                values.append(value)
+    return [(name, _guess_field_type(values)) for name, values in samples.items()]
+
+
+def _to_batch(
+    features: List[Dict[str, Any]], schema: LayerSchema, first_no: int, warnings: RowWarnings
+) -> PointBatch:
+    """把一组要素转换为列式批次，缺少几何或几何无效的要素被跳过"""
+    import shapely
+
+    raw = []
+    kept = []
+    for offset, feature in enumerate(features):
+        feature_no = first_no + offset
+        properties = _properties(feature, feature_no)
+        geometry = feature.get("geometry")
+        if not geometry:
+            warnings.warn("缺少几何", feature_no)
+            continue
+        raw.append(json.dumps(geometry))
+        kept.append(properties)
+
+    geometries = shapely.from_geojson(np.asarray(raw, dtype=object), on_invalid="ignore") if raw else \
+        np.empty(0, dtype=object)
+    valid = ~shapely.is_missing(geometries)
+    invalid_count = len(raw) - int(valid.sum())
+    if invalid_count:
+        warnings.warn("几何无效", first_no, count=invalid_count)
+        kept = [properties for properties, ok in zip(kept, valid) if ok]
+        geometries = geometries[valid]
+
+    columns = [
+        [_COERCERS[field_type](properties.get(name)) for properties in kept]
+        for name, field_type in schema.fields
+    ]
+    return PointBatch(columns=columns, geometries=geometries)
+
+
+def _read_features(features: Iterator[Dict[str, Any]], f, raw, batch_size: int, total_bytes: int) -> Source:
+    """按批次切分要素，用第一批推断结构；文件在批次迭代器结束或关闭时关闭"""
+    try:
+        chunks = iter(lambda: list(itertools.islice(features, batch_size)), [])
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            raise ValueError("GeoJSON中没有要素")
+        schema = LayerSchema(fields=_infer_fields(first_chunk))
+    except BaseException:
+        f.close()
+        raise
+    logger.debug("GeoJSON字段: %s", schema.fields)
+
+    def batches() -> Iterator[PointBatch]:
+        warnings = RowWarnings(logger, "要素")
+        first_no = 1
+        try:
+            for chunk in itertools.chain([first_chunk], chunks):
+                batch = _to_batch(chunk, schema, first_no, warnings)
+                first_no += len(chunk)
+                batch.bytes_read = raw.tell()
+                if len(batch):
+                    yield batch
+            warnings.summary()
+        finally:
+            f.close()
+
+    return Source(schema=schema, batches=batches(), total_bytes=total_bytes)
+
+
+def _open(input_path: str):
+    raw = open(input_path, "rb")
+    return io.TextIOWrapper(raw, encoding="utf-8-sig"), raw
+
+
+def read_geojson(input_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Source:
+    """
+    流式读取GeoJSON（FeatureCollection 或单个 Feature）
+
+    字段结构由第一批要素推断，之后出现的新属性被忽略；属性值按字段类型转换，无法转换时为 None。
+
+    Raises:
+        ValueError: 不是有效的GeoJSON、类型不受支持或没有要素
+    """
+    f, raw = _open(input_path)
+    return _read_features(_iter_features(_JsonStream(f)), f, raw, batch_size, os.path.getsize(input_path))
+
+
+def read_geojsonl(input_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Source:
+    """流式读取GeoJSONSeq（每行一个Feature），规则同 read_geojson"""
+    f, raw = _open(input_path)
+    return _read_features(_iter_lines(f), f, raw, batch_size, os.path.getsize(input_path))
@@ -2,16 +2,24 @@
 GeoJSON转换服务 Mock 版本
 不依赖 GDAL，用于开发和测试
 """
+import logging
 import os
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from app.core.progress import ProgressCallback, ProgressReporter
+
+logger = logging.getLogger(__name__)
 
 
 class GeoJsonConverter:
     """GeoJSON文件转换器 Mock 版本"""
 
     @staticmethod
-    def geojson_to_shp(geojson_path: str, output_path: str, encoding: str = "UTF-8") -> Dict[str, Any]:
+    def geojson_to_shp(
+        geojson_path: str, output_path: str, encoding: str = "UTF-8",
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """
         Mock: 将GeoJSON文件转换为SHP格式
 
@@ -19,32 +27,33 @@ class GeoJsonConverter:
             geojson_path: GeoJSON文件路径
             output_path: 输出SHP文件路径（.shp）
             encoding: 输出文件编码
+            progress: 进度回调
 
         Returns:
             转换结果字典
         """
         try:
-            print("[服务 Mock] ========== 开始转换 =========")
-            print(f"[服务 Mock] 输入路径: {geojson_path}")
-            print(f"[服务 Mock] 输出路径: {output_path}")
-            print(f"[服务 Mock] 编码: {encoding}")
+            logger.debug("Mock ========== 开始转换 =========")
+            logger.debug("输入路径: %s", geojson_path)
+            logger.debug("输出路径: %s", output_path)
+            logger.debug("编码: %s", encoding)
 
             # 检查文件是否存在
             if not os.path.exists(geojson_path):
-                print("[服务 Mock] 错误: 文件不存在")
+                logger.warning("文件不存在")
                 return {
                     "success": False,
                     "error": f"GeoJSON文件不存在: {geojson_path}"
                 }
 
             # 读取GeoJSON文件
-            print("[服务 Mock] 读取GeoJSON文件...")
+            logger.debug("读取GeoJSON文件...")
             with open(geojson_path, 'r', encoding='utf-8') as f:
                 geojson_data = json.load(f)
 
             # 检查GeoJSON格式
             if 'type' not in geojson_data:
-                print("[服务 Mock] 错误: 无效的GeoJSON格式")
+                logger.warning("无效的GeoJSON格式")
                 return {
                     "success": False,
                     "error": "无效的GeoJSON格式"
@@ -54,7 +63,7 @@ class GeoJsonConverter:
             geojson_type = geojson_data.get('type')
 
             # Mock: 模拟转换过程
-            print(f"[服务 Mock] GeoJSON类型: {geojson_type}")
+            logger.debug("GeoJSON类型: %s", geojson_type)
 
             feature_count = 0
             geometry_type = 'Unknown'
@@ -62,13 +71,13 @@ class GeoJsonConverter:
             if geojson_type == 'FeatureCollection':
                 features = geojson_data.get('features', [])
                 feature_count = len(features)
-                print(f"[服务 Mock] 要素数量: {feature_count}")
+                logger.debug("要素数量: %s", feature_count)
 
                 if features:
                     first_feature = features[0]
                     geometry = first_feature.get('geometry', {})
                     geometry_type = geometry.get('type', 'Unknown')
-                    print(f"[服务 Mock] 几何类型: {geometry_type}")
+                    logger.debug("几何类型: %s", geometry_type)
 
                 # Mock: 创建模拟的输出文件（只是空文件用于测试）
                 output_dir = os.path.dirname(output_path)
@@ -98,14 +107,15 @@ class GeoJsonConverter:
                     f.write("# Mock Shapefile - 需要 GDAL 才能真正转换\n")
 
             else:
-                print(f"[服务 Mock] 警告: 不支持的GeoJSON类型 {geojson_type}")
+                logger.warning("不支持的GeoJSON类型 %s", geojson_type)
                 return {
                     "success": False,
                     "error": f"不支持的GeoJSON类型: {geojson_type}"
                 }
 
-            print("[服务 Mock] ========== 转换完成 =========")
-            print(f"[服务 Mock] 要素数量: {feature_count}")
+            ProgressReporter(progress, total=feature_count).finish(feature_count)
+            logger.debug("Mock ========== 转换完成 =========")
+            logger.debug("要素数量: %s", feature_count)
 
             return {
                 "success": True,
@@ -117,9 +127,7 @@ class GeoJsonConverter:
             }
 
         except Exception as e:
-            print(f"[服务 Mock] 异常: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("异常: %s", str(e))
             return {
                 "success": False,
                 "error": f"转换失败: {str(e)}"
@@ -137,8 +145,8 @@ class GeoJsonConverter:
             验证结果
         """
         try:
-            print("[质检 Mock] ========== 开始验证 =========")
-            print(f"[质检 Mock] 文件: {geojson_path}")
+            logger.debug("Mock ========== 开始验证 =========")
+            logger.debug("文件: %s", geojson_path)
 
             # 检查文件是否存在
             if not os.path.exists(geojson_path):
@@ -171,7 +179,7 @@ class GeoJsonConverter:
             if 'crs' in geojson_data:
                 crs = geojson_data['crs']
                 results['crs'] = crs.get('properties', {}).get('name', 'Unknown')
-                print(f"[质检 Mock] 坐标系: {results['crs']}")
+                logger.debug("坐标系: %s", results['crs'])
             else:
                 results['warnings'].append("缺少坐标系信息，默认使用 WGS 84")
 
@@ -236,10 +244,10 @@ class GeoJsonConverter:
                             'min_y': min(c[1] for c in all_coords),
                             'max_y': max(c[1] for c in all_coords)
                         }
-                        print(f"[质检 Mock] 边界框: {results['bounds']}")
+                        logger.debug("边界框: %s", results['bounds'])
 
             elif geojson_type == 'Feature':
-                print("[质检 Mock] 单个Feature")
+                logger.debug("单个Feature")
                 results['feature_count'] = 1
 
                 geometry = geojson_data.get('geometry')
@@ -254,7 +262,7 @@ class GeoJsonConverter:
                 results['geometry_count'] = len(geometries)
 
             elif geojson_type in ['Point', 'LineString', 'Polygon', 'MultiPoint', 'MultiLineString', 'MultiPolygon']:
-                print(f"[质检 Mock] 单个几何对象: {geojson_type}")
+                logger.debug("单个几何对象: %s", geojson_type)
                 results['geometry_count'] = 1
                 results['geometry_type'] = geojson_type
 
@@ -262,10 +270,10 @@ class GeoJsonConverter:
                 results['valid'] = False
                 results['error'] = f"不支持的GeoJSON类型: {geojson_type}"
 
-            print("[质检 Mock] ========== 验证完成 =========")
-            print(f"[质检 Mock] 有效: {results['valid']}")
-            print(f"[质检 Mock] 错误数: {len(results['errors'])}")
-            print(f"[质检 Mock] 警告数: {len(results['warnings'])}")
+            logger.debug("Mock ========== 验证完成 =========")
+            logger.debug("有效: %s", results['valid'])
+            logger.debug("错误数: %s", len(results['errors']))
+            logger.debug("警告数: %s", len(results['warnings']))
 
             return results
 
@@ -275,9 +283,7 @@ class GeoJsonConverter:
                 "error": f"JSON解析错误: {str(e)}"
             }
         except Exception as e:
-            print(f"[质检 Mock] 异常: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("异常: %s", str(e))
             return {
                 "valid": False,
                 "error": f"验证失败: {str(e)}"
@@ -0,0 +1,252 @@
+"""
+文件清理任务
+定期删除 UPLOAD_DIR 中过期的转换结果，总大小超过上限时先删除最久未下载的结果；
+启动时清理上次运行遗留的临时目录，之后定期清理超时的临时目录和单飞锁文件。
+扫描和删除都在执行池中分批进行，不阻塞事件循环
+"""
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.single_flight import remove_stale_locks
+from app.services.job_service import job_manager
+from app.services.result_cache import get_result_cache
+
+logger = logging.getLogger(__name__)
+
+# 每批删除的文件组数，批次之间让出事件循环
+SWEEP_BATCH_SIZE = 200
+
+# 最近使用（生成或下载）不超过该时间（秒）的结果不会因容量超限被删除，避免删除刚返回的下载链接
+EVICTION_GRACE = 600
+
+# 与 .shp 同名、随 .shp 一起删除的关联文件
+_SHP_SIDECARS = (".shx", ".dbf", ".prj", ".cpg")
+
+
+@dataclass
+class OutputGroup:
+    """一个转换结果（Shapefile 包含同名的关联文件）"""
+    paths: List[str]
+    size: int
+    last_used: float
+
+
+def scan_outputs(upload_dir: str) -> List[OutputGroup]:
+    """列出转换结果，最近使用时间取访问时间（下载时更新）和修改时间中较晚的一个"""
+    entries = {}
+    try:
+        with os.scandir(upload_dir) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    stat_result = entry.stat(follow_symlinks=False)
+                    entries[entry.path] = (stat_result.st_size, max(stat_result.st_atime, stat_result.st_mtime))
+    except FileNotFoundError:
+        return []
+
+    groups = []
+    grouped: Set[str] = set()
+    for path in entries:
+        if path.lower().endswith(".shp"):
+            base = os.path.splitext(path)[0]
+            members = [path] + [
+                candidate for ext in _SHP_SIDECARS
+                for candidate in (base + ext, base + ext.upper()) if candidate in entries
+            ]
+            grouped.update(members)
+            groups.append(OutputGroup(
+                paths=members,
+                size=sum(entries[member][0] for member in members),
+                last_used=max(entries[member][1] for member in members),
+            ))
+    for path, (size, last_used) in entries.items():
+        if path not in grouped:
+            groups.append(OutputGroup(paths=[path], size=size, last_used=last_used))
+    return groups
+
+
+def select_evictions(
+    groups: List[OutputGroup], now: float, ttl: int, max_bytes: int, protected: Set[str]
+) -> List[OutputGroup]:
+    """
+    选出需要删除的结果：先删除超过 ttl 未使用的，总大小仍超过 max_bytes 时按最近使用时间从旧到新删除
+
+    Args:
+        protected: 不能删除的路径（未完成任务的输出）
+    """
+    evict, keep = [], []
+    for group in groups:
+        if any(path in protected for path in group.paths):
+            continue
+        if ttl and now - group.last_used > ttl:
+            evict.append(group)
+        else:
+            keep.append(group)
+
+    if max_bytes:
+        total = sum(group.size for group in keep) + sum(
+            group.size for group in groups if any(path in protected for path in group.paths)
+        )
+        for group in sorted(keep, key=lambda g: g.last_used):
+            if total <= max_bytes:
+                break
+            if now - group.last_used < EVICTION_GRACE:
+                break
+            evict.append(group)
+            total -= group.size
+    return evict
+
+
+def _remove_groups(groups: List[OutputGroup]) -> int:
+    freed = 0
+    for group in groups:
+        for path in group.paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+        freed += group.size
+    return freed
+
+
+def _stale_temp_dirs(temp_dir: str, older_than: float, protected: Set[str]) -> List[str]:
+    """修改时间早于 older_than 且不属于未完成任务的临时目录"""
+    stale = []
+    try:
+        with os.scandir(temp_dir) as it:
+            for entry in it:
+                if entry.path in protected:
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime < older_than:
+                    stale.append(entry.path)
+    except FileNotFoundError:
+        pass
+    return stale
+
+
+def _remove_paths(paths: List[str]) -> None:
+    for path in paths:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class Janitor:
+    """后台清理任务"""
+
+    def __init__(self, upload_dir: str, temp_dir: str, interval: float = 300.0,
+                 output_ttl: int = 0, output_max_bytes: int = 0, temp_ttl: int = 21600,
+                 lock_dir: Optional[str] = None):
+        self.upload_dir = upload_dir
+        self.temp_dir = temp_dir
+        self.lock_dir = lock_dir
+        self.interval = interval
+        self.output_ttl = output_ttl
+        self.output_max_bytes = output_max_bytes
+        self.temp_ttl = temp_ttl
+        self._task: Optional[asyncio.Task] = None
+        self.last_sweep: Optional[Dict[str, float]] = None
+
+    async def start(self, temp_older_than: Optional[float] = None) -> None:
+        """
+        启动定期清理
+
+        Args:
+            temp_older_than: 第一次清理删除修改时间早于该时间戳的临时目录（服务启动时传入启动时间，
+                清理上次运行遗留的全部临时目录），默认按 TEMP_TTL
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(temp_older_than))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self, temp_older_than: Optional[float]) -> None:
+        while True:
+            try:
+                await self.sweep(temp_older_than=temp_older_than)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("清理失败: %s", e)
+            temp_older_than = None
+            await asyncio.sleep(self.interval)
+
+    @staticmethod
+    def _protected_paths() -> Set[str]:
+        protected = set()
+        for path in job_manager.store.unfinished_paths():
+            protected.add(os.path.abspath(path))
+            # 任务输入保存在 TEMP_DIR/<任务ID>/ 下
+            protected.add(os.path.abspath(os.path.dirname(path)))
+        return protected
+
+    async def sweep(self, temp_older_than: Optional[float] = None) -> Dict[str, float]:
+        """
+        执行一次清理
+
+        Args:
+            temp_older_than: 删除修改时间早于该时间戳的临时目录，默认为当前时间减去 TEMP_TTL
+
+        Returns:
+            本次清理统计
+        """
+        started = time.time()
+        protected = await run_blocking(self._protected_paths)
+
+        if temp_older_than is None:
+            temp_older_than = started - self.temp_ttl
+        stale = await run_blocking(_stale_temp_dirs, os.path.abspath(self.temp_dir), temp_older_than, protected)
+        for i in range(0, len(stale), SWEEP_BATCH_SIZE):
+            await run_blocking(_remove_paths, stale[i:i + SWEEP_BATCH_SIZE])
+
+        # 单飞锁文件只在结果写入缓存后删除，失败的转换留下的锁文件超过 TEMP_TTL 未使用时删除
+        locks = []
+        if self.lock_dir:
+            locks = await run_blocking(remove_stale_locks, os.path.abspath(self.lock_dir), started - self.temp_ttl)
+
+        groups = await run_blocking(scan_outputs, os.path.abspath(self.upload_dir))
+        evictions = select_evictions(groups, started, self.output_ttl, self.output_max_bytes, protected)
+        freed = 0
+        for i in range(0, len(evictions), SWEEP_BATCH_SIZE):
+            freed += await run_blocking(_remove_groups, evictions[i:i + SWEEP_BATCH_SIZE])
+
+        cache = get_result_cache()
+        if evictions and cache is not None:
+            await run_blocking(cache.prune_missing)
+
+        self.last_sweep = {
+            "finished_at": time.time(),
+            "temp_dirs_removed": len(stale),
+            "locks_removed": len(locks),
+            "outputs_removed": len(evictions),
+            "bytes_freed": freed,
+            "output_bytes": sum(group.size for group in groups) - freed,
+        }
+        if stale or evictions:
+            logger.info("删除 %d 个临时目录、%d 个结果，释放 %d bytes", len(stale), len(evictions), freed)
+        return self.last_sweep
+
+
+janitor = Janitor(
+    settings.UPLOAD_DIR,
+    settings.TEMP_DIR,
+    interval=settings.JANITOR_INTERVAL,
+    output_ttl=settings.OUTPUT_TTL,
+    output_max_bytes=settings.OUTPUT_MAX_BYTES,
+    temp_ttl=settings.TEMP_TTL,
+    lock_dir=settings.LOCK_DIR,
+)
@@ -0,0 +1,485 @@
+"""
+异步任务服务
+转换任务持久化在本地 SQLite 任务表中，由进程内的工作协程领取，
+在转换执行池中运行；支持失败重试和取消，不需要外部消息队列
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.cluster import current_worker_id, prune_dead_workers, worker_alive
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import observe_cache_lookup
+from app.core.single_flight import single_flight
+from app.services.result_cache import get_result_cache, run_conversion
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress TEXT,
+    cache_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER,
+    worker_id TEXT,
+    not_before REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, not_before, created_at);
+"""
+
+# 旧版本任务表缺少的列
+_ADDED_COLUMNS = {"progress": "TEXT", "cache_key": "TEXT", "worker_id": "TEXT"}
+
+
+class JobStore:
+    """SQLite 任务表（每次操作使用独立连接，可在多线程、多进程间共享）"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, column_type in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(
+        self, kind: str, params: Dict[str, Any], input_path: str, output_path: str,
+        max_attempts: int, job_id: Optional[str] = None, cache_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        job_id = job_id or str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, input_path, output_path, cache_key, "
+                "max_attempts, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, JOB_QUEUED, json.dumps(params, ensure_ascii=False),
+                 input_path, output_path, cache_key, max_attempts, time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query, args = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def unfinished_paths(self) -> List[str]:
+        """排队中 / 执行中任务的输入和输出路径（清理时需要保留）"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT input_path, output_path FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [path for row in rows for path in (row["input_path"], row["output_path"])]
+
+    def claim_next(self, kinds: List[str]) -> Optional[Dict[str, Any]]:
+        """原子地领取最早的可执行任务（queued 且已过重试等待时间），标记为 running"""
+        if not kinds:
+            return None
+        now = time.time()
+        placeholders = ",".join("?" * len(kinds))
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = ? AND not_before <= ? AND kind IN ({placeholders}) "
+                "ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, now, *kinds)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_pid = ?, worker_id = ?, started_at = ? "
+                "WHERE id = ?",
+                (JOB_RUNNING, os.getpid(), current_worker_id(), now, row["id"])
+            )
+            conn.execute("COMMIT")
+        return self.get(row["id"])
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "worker_pid = NULL, worker_id = NULL WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, time.time(), job_id)
+            )
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id)
+            )
+
+    def retry_later(self, job_id: str, error: str, delay: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, not_before = ?, worker_pid = NULL, worker_id = NULL "
+                "WHERE id = ?",
+                (JOB_QUEUED, error, time.time() + delay, job_id)
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """取消任务：排队中的任务直接取消，运行中的任务标记取消请求，完成后丢弃结果"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ? AND status = ?",
+                (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED)
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, JOB_RUNNING)
+            )
+            conn.execute("COMMIT")
+        return self.get(job_id)
+
+    def requeue_orphans(self) -> int:
+        """把执行 worker 已退出的 running 任务放回队列（worker 或服务异常退出后恢复）"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, worker_pid, worker_id FROM jobs WHERE status = ?", (JOB_RUNNING,)
+            ).fetchall()
+            orphans = [row["id"] for row in rows if not _worker_alive(row)]
+            for job_id in orphans:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_pid = NULL, worker_id = NULL WHERE id = ? AND status = ?",
+                    (JOB_QUEUED, job_id, JOB_RUNNING)
+                )
+        return len(orphans)
+
+
+class JobProgressWriter:
+    """
+    把转换进度写入任务表的回调
+
+    只保存数据库路径和任务ID，可以 pickle 后在进程池中调用；
+    两次写入至少间隔 min_interval 秒（最终进度总是写入）
+    """
+
+    def __init__(self, db_path: str, job_id: str, min_interval: float = 0.25):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._store: Optional[JobStore] = None
+        self._last_write = 0.0
+
+    def __getstate__(self):
+        return {"db_path": self.db_path, "job_id": self.job_id, "min_interval": self.min_interval}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if not event["done"] and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        if self._store is None:
+            self._store = JobStore(self.db_path)
+        self._store.update_progress(self.job_id, event)
+
+
+def _worker_alive(row: sqlite3.Row) -> bool:
+    # 旧版本的任务记录只有 worker_pid
+    if row["worker_id"]:
+        return worker_alive(row["worker_id"])
+    return _pid_alive(row["worker_pid"])
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        # 当前进程刚启动，表中属于本进程PID的任务来自上一次运行
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobManager:
+    """
+    任务调度器
+
+    处理函数签名为 handler(input_path, output_path, progress=回调, **params) -> 转换结果字典，
+    与各转换服务的静态方法一致，进度写入任务表的 progress 列。处理函数抛出异常时按指数退避重试，
+    返回 success=False（输入有误等）时直接失败，不再重试。
+    带缓存键的任务在执行前查询结果缓存，成功后写入缓存。
+    """
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = 2,
+                 max_attempts: int = 3, retry_delay: float = 2.0, poll_interval: float = 1.0):
+        self._store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, Callable[..., Dict[str, Any]]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._recovery_task: Optional[asyncio.Task] = None
+
+    @property
+    def store(self) -> JobStore:
+        # 第一次使用时才创建数据库文件
+        if self._store is None:
+            self._store = JobStore(settings.JOB_DB_PATH)
+        return self._store
+
+    def register(self, kind: str, handler: Callable[..., Dict[str, Any]]) -> None:
+        """注册任务类型"""
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return list(self._handlers)
+
+    def handler(self, kind: str) -> Callable[..., Dict[str, Any]]:
+        """任务类型对应的转换函数（批量转换与异步任务共用）"""
+        return self._handlers[kind]
+
+    async def submit(self, kind: str, params: Dict[str, Any], input_path: str, output_path: str,
+                     job_id: Optional[str] = None, cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """提交任务，立即返回任务记录"""
+        if kind not in self._handlers:
+            raise ValueError(f"不支持的任务类型: {kind}")
+        job = await run_blocking(
+            self.store.create, kind, params, input_path, output_path, self.max_attempts, job_id, cache_key
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def submit_cached(self, kind: str, params: Dict[str, Any], input_path: str,
+                            result: Dict[str, Any], job_id: Optional[str] = None) -> Dict[str, Any]:
+        """缓存命中：直接创建已完成的任务，结果指向缓存的输出文件"""
+        return await run_blocking(self._create_finished, kind, params, input_path, result, job_id)
+
+    def _create_finished(self, kind: str, params: Dict[str, Any], input_path: str,
+                         result: Dict[str, Any], job_id: Optional[str]) -> Dict[str, Any]:
+        job = self.store.create(kind, params, input_path, result["output_path"], self.max_attempts, job_id)
+        self.store.finish(job["id"], JOB_SUCCEEDED, result={**result, "cached": True})
+        self._cleanup_input(job)
+        return self.store.get(job["id"])
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await run_blocking(self.store.request_cancel, job_id)
+        if job is not None and job["status"] == JOB_CANCELLED:
+            await run_blocking(self._cleanup_input, job)
+        return job
+
+    async def start(self) -> None:
+        """启动工作协程（在应用 lifespan 中调用）"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info("已启动 %s 个任务工作协程", self.workers)
+
+    async def stop(self) -> None:
+        """停止领取新任务；正在执行的转换在执行池关闭时等待完成"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    def recover_orphans(self) -> int:
+        """把执行 worker 已退出的任务放回队列，并清理已退出 worker 的锁文件（阻塞，在执行池中调用）"""
+        recovered = self.store.requeue_orphans()
+        if recovered:
+            logger.info("恢复了 %s 个中断的任务", recovered)
+        prune_dead_workers()
+        return recovered
+
+    async def start_recovery(self, interval: float) -> None:
+        """定期恢复中断的任务（多 worker 时只在主 worker 中运行）"""
+        if self._recovery_task is None:
+            self._recovery_task = asyncio.create_task(self._recovery_loop(interval))
+
+    async def stop_recovery(self) -> None:
+        if self._recovery_task is not None:
+            self._recovery_task.cancel()
+            await asyncio.gather(self._recovery_task, return_exceptions=True)
+            self._recovery_task = None
+
+    async def _recovery_loop(self, interval: float) -> None:
+        while True:
+            try:
+                if await run_blocking(self.recover_orphans) and self._wakeup is not None:
+                    self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("恢复中断任务失败: %s", e)
+            await asyncio.sleep(interval)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            # SQLite 写锁争用时可能等待数秒，不能在事件循环中执行
+            job = await run_blocking(self.store.claim_next, self.kinds)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    # 其它进程提交的任务靠轮询发现
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        logger.info("开始执行 %s (%s, 第 %s 次)", job_id, job['kind'], job['attempts'])
+        cache = get_result_cache() if job["cache_key"] else None
+        if cache is None:
+            await self._execute(job, None, None)
+            return
+        # 与同步接口、其它 worker 进程中相同的转换合并执行
+        async with single_flight.hold(job["cache_key"]) as flight:
+            await self._execute(job, cache, flight)
+
+    async def _execute(self, job: Dict[str, Any], cache, flight) -> None:
+        job_id = job["id"]
+        handler = self._handlers[job["kind"]]
+        if cache is not None:
+            # 排队期间相同的转换可能已经完成
+            cached = await run_blocking(cache.get, job["cache_key"])
+            observe_cache_lookup(job["kind"], cached is not None)
+            if cached is not None:
+                await run_blocking(self.store.finish, job_id, JOB_SUCCEEDED, result={**cached, "cached": True})
+                await run_blocking(self._cleanup_input, job)
+                logger.info("%s 命中缓存", job_id)
+                return
+        try:
+            result = await run_conversion(
+                job["kind"], handler, job["input_path"], job["output_path"],
+                progress=JobProgressWriter(self.store.db_path, job_id), **job["params"]
+            )
+        except asyncio.CancelledError:
+            # 服务关闭：放回队列，下次启动继续执行
+            # 服务关闭时工作协程已被取消，不能再等待执行池，直接写入
+            self.store.retry_later(job_id, "服务关闭，任务中断", 0)
+            raise
+        except Exception as e:
+            error = f"转换失败: {str(e)}"
+            logger.error("%s 异常: %s", job_id, error)
+            if job["attempts"] < job["max_attempts"] and not await self._cancel_requested(job_id):
+                delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+                await run_blocking(self.store.retry_later, job_id, error, delay)
+                logger.info("%s 将在 %.1fs 后重试", job_id, delay)
+            else:
+                await run_blocking(self.store.finish, job_id, JOB_FAILED, error=error)
+                await run_blocking(self._cleanup_input, job)
+            return
+
+        if await self._cancel_requested(job_id):
+            # 线程 / 进程中的转换无法中途打断，完成后丢弃结果
+            await run_blocking(self._remove_output, job["output_path"])
+            await run_blocking(self.store.finish, job_id, JOB_CANCELLED)
+            logger.info("%s 已取消", job_id)
+        elif result.get("success"):
+            if cache is not None and await run_blocking(
+                cache.put, job["cache_key"], job["kind"], job["output_path"], result
+            ):
+                flight.release(remove=True)
+            await run_blocking(self.store.finish, job_id, JOB_SUCCEEDED, result=result)
+            logger.info("%s 完成: %s 个要素", job_id, result.get('feature_count'))
+        else:
+            await run_blocking(self.store.finish, job_id, JOB_FAILED, result=result, error=result.get("error"))
+            logger.warning("%s 失败: %s", job_id, result.get('error'))
+        await run_blocking(self._cleanup_input, job)
+
+    async def _cancel_requested(self, job_id: str) -> bool:
+        job = await run_blocking(self.store.get, job_id)
+        return job is not None and job["cancel_requested"]
+
+    @staticmethod
+    def _cleanup_input(job: Dict[str, Any]) -> None:
+        shutil.rmtree(os.path.dirname(job["input_path"]), ignore_errors=True)
+
+    @staticmethod
+    def _remove_output(output_path: str) -> None:
+        # Shapefile 输出包含同名的 .shx / .dbf / .prj / .cpg
+        base = os.path.splitext(output_path)[0]
+        for ext in ("", ".shx", ".dbf", ".prj", ".cpg"):
+            path = output_path if not ext else base + ext
+            if os.path.exists(path):
+                os.remove(path)
+
+
+job_manager = JobManager(
+    workers=settings.JOB_WORKERS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    retry_delay=settings.JOB_RETRY_DELAY,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+)
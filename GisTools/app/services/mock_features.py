@@ -0,0 +1,49 @@
+"""
+Mock 服务的合成要素
+MOCK_FEATURE_COUNT 大于 0 时 Mock 服务输出该数量的合成点要素（每个序列化后约 MOCK_FEATURE_BYTES 字节），
+用于在不依赖GDAL的情况下按真实的输出规模压测上传、路由和下载
+"""
+import json
+from typing import Any, Dict, Iterator
+
+from app.core.config import settings
+
+
+def enabled() -> bool:
+    """是否输出合成要素（否则 Mock 服务使用固定的示例数据）"""
+    return settings.MOCK_FEATURE_COUNT > 0
+
+
+def _feature(index: int, payload: str) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [round(73.0 + (index * 0.37) % 62.0, 6), round(18.0 + (index * 0.23) % 35.0, 6)]
+        },
+        "properties": {"id": index + 1, "name": f"mock_{index + 1}", "payload": payload}
+    }
+
+
+def iter_features(count: int = None, size: int = None) -> Iterator[str]:
+    """
+    逐个生成要素的 JSON 文本
+
+    Args:
+        count: 要素数，默认 MOCK_FEATURE_COUNT
+        size: 每个要素的大致字节数（通过 payload 属性填充），默认 MOCK_FEATURE_BYTES
+    """
+    count = settings.MOCK_FEATURE_COUNT if count is None else count
+    size = settings.MOCK_FEATURE_BYTES if size is None else size
+    padding = max(0, size - len(json.dumps(_feature(count, ""), ensure_ascii=False)))
+    payload = "x" * padding
+    for index in range(count):
+        yield json.dumps(_feature(index, payload), ensure_ascii=False)
+
+
+def iter_feature_collection(count: int = None, size: int = None) -> Iterator[str]:
+    """逐块生成 FeatureCollection 文本"""
+    yield '{"type": "FeatureCollection", "features": [\n'
+    for index, feature in enumerate(iter_features(count, size)):
+        yield (",\n" if index else "") + feature
+    yield "\n]}\n"
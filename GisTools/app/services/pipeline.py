@@ -0,0 +1,214 @@
+"""
+转换流水线
+所有转换都由 读取器 → 转换步骤 → 写出器 组成，三者之间传递按批次的要素迭代器：
+
+- 读取器 reader(input_path, **options) -> Source：检查输入、推断图层结构，返回结构和批次迭代器；
+  输入无效时抛出 ValueError
+- 转换步骤 transform(schema, batches) -> batches：逐批次处理（可以修改结构），不物化整个数据集
+- 写出器 writer(output_path, schema, batches, reporter, **options) -> 写出的要素数
+
+批次为 csv_reader.PointBatch（列式属性 + 点坐标数组或 shapely 几何数组）。
+读取器和写出器按格式登记，任意两种格式之间都可以转换；Shapefile 的读写在第一次使用时才导入GDAL
+"""
+import importlib
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.core.progress import ProgressCallback, ProgressReporter
+from app.services.csv_reader import PointBatch
+
+logger = logging.getLogger(__name__)
+
+# 格式 → 扩展名（第一个为输出时使用的扩展名）
+FORMAT_EXTS = {
+    "shp": (".shp",),
+    "geojson": (".geojson", ".json"),
+    "geojsonl": (".geojsonl",),
+    "csv": (".csv",),
+    "parquet": (".parquet",),
+}
+
+# 读取器 / 写出器："模块:函数"，使用时才导入（也可以登记函数）
+READERS: Dict[str, Union[str, Callable[..., "Source"]]] = {
+    "shp": "app.services.shp_io:read_shp",
+    "geojson": "app.services.geojson_reader:read_geojson",
+    "geojsonl": "app.services.geojson_reader:read_geojsonl",
+    "csv": "app.services.csv_export:read_csv",
+}
+WRITERS: Dict[str, Union[str, Callable[..., int]]] = {
+    "shp": "app.services.shp_io:write_shp",
+    "geojson": "app.services.feature_writers:write_geojson",
+    "geojsonl": "app.services.feature_writers:write_geojsonl",
+    "csv": "app.services.feature_writers:write_csv",
+    "parquet": "app.services.feature_writers:write_geoparquet",
+}
+
+# 需要GDAL读写的格式
+GDAL_FORMATS = {"shp"}
+
+
+@dataclass
+class LayerSchema:
+    """图层结构：属性字段、几何类型和坐标系"""
+    # 属性字段 [(字段名, 字段类型)]，类型为 csv_reader 的 FIELD_INTEGER / FIELD_REAL / FIELD_STRING，
+    # 顺序与批次的 columns 一致
+    fields: List[Tuple[str, str]] = field(default_factory=list)
+    # 几何类型（Point / LineString / Polygon 等），未知为 None，由需要的写出器从第一批推断
+    geometry_type: Optional[str] = None
+    # 坐标系（PROJ 字符串，用于 GeoJSON 的旧式 crs 成员和 Shapefile 写出），None 表示 WGS 84 经纬度
+    crs: Optional[str] = None
+    # 同一坐标系的 PROJJSON（GeoParquet 元数据要求的格式），None 表示 WGS 84 经纬度（OGC:CRS84）
+    crs_projjson: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class Source:
+    """读取器的结果：图层结构和按批次产出要素的迭代器"""
+    schema: LayerSchema
+    batches: Iterator[PointBatch]
+    # 用于估算进度：输入字节数（批次的 bytes_read 与之对应）和要素总数，未知为 None
+    total_bytes: Optional[int] = None
+    total_features: Optional[int] = None
+    # 合并到转换结果中的信息（如 CSV 实际使用的坐标字段）
+    info: Dict[str, Any] = field(default_factory=dict)
+
+
+Transform = Callable[[LayerSchema, Iterator[PointBatch]], Iterator[PointBatch]]
+
+
+def _resolve(registry: Dict[str, Any], fmt: str, kind: str) -> Callable[..., Any]:
+    entry = registry.get(fmt)
+    if entry is None:
+        raise ValueError(f"不支持{kind}{fmt}格式")
+    if isinstance(entry, str):
+        module_name, _, name = entry.partition(":")
+        entry = getattr(importlib.import_module(module_name), name)
+    return entry
+
+
+def detect_format(path: str) -> str:
+    """按扩展名判断格式"""
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, exts in FORMAT_EXTS.items():
+        if ext in exts:
+            return fmt
+    raise ValueError(f"无法识别的文件格式: {ext or path}")
+
+
+def open_source(input_path: str, fmt: Optional[str] = None, **options) -> Source:
+    """
+    用对应格式的读取器打开输入
+
+    Raises:
+        ValueError: 格式不支持或输入无效
+    """
+    if not os.path.exists(input_path):
+        raise ValueError(f"输入文件不存在: {input_path}")
+    return _resolve(READERS, fmt or detect_format(input_path), "读取")(input_path, **options)
+
+
+def apply_transforms(
+    schema: LayerSchema, batches: Iterator[PointBatch], transforms: Iterable[Transform]
+) -> Iterator[PointBatch]:
+    for transform in transforms:
+        batches = transform(schema, batches)
+    return batches
+
+
+def convert(
+    input_path: str, output_path: str, input_format: Optional[str] = None, output_format: Optional[str] = None,
+    reader_options: Optional[Dict[str, Any]] = None, writer_options: Optional[Dict[str, Any]] = None,
+    transforms: Iterable[Transform] = (), progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    读取 → 转换步骤 → 写出
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        input_format / output_format: 格式（见 FORMAT_EXTS），默认按扩展名判断
+        reader_options / writer_options: 传给读取器 / 写出器的参数
+        transforms: 依次应用的转换步骤
+        progress: 进度回调，每 PROGRESS_EVERY 个要素调用一次
+
+    Returns:
+        转换结果字典（与各转换服务一致，另含读取器提供的信息）
+    """
+    try:
+        input_format = input_format or detect_format(input_path)
+        output_format = output_format or detect_format(output_path)
+        logger.debug("========== 开始转换 (%s → %s) =========", input_format, output_format)
+        logger.debug("输入路径: %s", input_path)
+        logger.debug("输出路径: %s", output_path)
+
+        write = _resolve(WRITERS, output_format, "写出")
+        try:
+            source = open_source(input_path, input_format, **(reader_options or {}))
+        except ValueError as e:
+            logger.warning("%s", e)
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        schema = source.schema
+        batches = apply_transforms(schema, source.batches, transforms)
+        reporter = ProgressReporter(progress, total=source.total_features, total_bytes=source.total_bytes)
+        try:
+            feature_count = write(output_path, schema, batches, reporter, **(writer_options or {}))
+        except ValueError as e:
+            # 写出过程中发现的输入问题（如 Shapefile 不支持的混合几何类型、GeoJSON 语法错误）
+            logger.warning("%s", e)
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+        reporter.finish(feature_count)
+
+        logger.debug("========== 转换完成 =========")
+        logger.debug("有效要素数量: %s", feature_count)
+        return {
+            "success": True,
+            "message": "转换成功",
+            "feature_count": feature_count,
+            "output_path": output_path,
+            "file_size": os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+            "geometry_type": schema.geometry_type,
+            **source.info,
+        }
+
+    except Exception as e:
+        logger.exception("异常: %s", str(e))
+        return {
+            "success": False,
+            "error": f"转换失败: {str(e)}"
+        }
+
+
+def iter_geojson(
+    input_path: str, input_format: Optional[str] = None, seq: bool = False,
+    transforms: Iterable[Transform] = (), **reader_options
+) -> Iterator[str]:
+    """
+    不写文件，逐批次生成 GeoJSON / GeoJSONSeq 文本（用于直接流式返回给客户端）
+
+    输入检查在调用时立即完成，生成器只负责读取和编码。
+
+    Raises:
+        ValueError: 格式不支持或输入无效
+    """
+    from app.services.feature_writers import iter_geojson_text
+
+    source = open_source(input_path, input_format, **reader_options)
+    batches = apply_transforms(source.schema, source.batches, transforms)
+    return iter_geojson_text(source.schema, batches, seq, ProgressReporter(None))
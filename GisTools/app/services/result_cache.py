@@ -0,0 +1,353 @@
+"""
+转换结果缓存
+以 输入文件SHA-256 + 转换类型 + 转换参数 为键缓存转换结果，相同数据重复上传时直接返回已有的下载链接；
+索引保存在本地 SQLite 中（多个 worker 进程共享），总大小超过上限时按最近使用时间淘汰
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.metrics import observe_cache_lookup, observe_conversion, observe_resource_usage
+from app.core.profiling import run_profiled
+from app.core.resource_usage import measure
+from app.core.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，转换输出格式变化时递增使旧缓存失效
+CACHE_VERSION = 1
+
+# 不影响输出内容、不参与缓存键的参数
+_IGNORED_PARAMS = {"workers", "progress"}
+
+# Shapefile 输出的关联文件
+_SHP_SIDECARS = (".shx", ".dbf", ".prj", ".cpg")
+
+# 计算输出文件哈希时每次读取的块大小
+_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    converter TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries (last_access);
+CREATE INDEX IF NOT EXISTS idx_cache_output_path ON cache_entries (output_path);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# 旧版本缓存表缺少的列：输出文件的内容哈希，以及计算哈希时的文件大小和修改时间（用于下载的 ETag）
+_ADDED_COLUMNS = {"sha256": "TEXT", "file_size": "INTEGER", "file_mtime_ns": "INTEGER"}
+
+
+def output_files(output_path: str):
+    """输出文件及其关联文件（Shapefile 的 .shx / .dbf 等）"""
+    yield output_path
+    if output_path.lower().endswith(".shp"):
+        base = os.path.splitext(output_path)[0]
+        for ext in _SHP_SIDECARS:
+            yield base + ext
+
+
+def _output_size(output_path: str) -> int:
+    return sum(os.path.getsize(path) for path in output_files(output_path) if os.path.exists(path))
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _remove_output(output_path: str) -> None:
+    for path in output_files(output_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ResultCache:
+    """基于 SQLite 索引的LRU结果缓存"""
+
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(cache_entries)")}
+            for name, column_type in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE cache_entries ADD COLUMN {name} {column_type}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(converter: str, input_sha256: str, params: Dict[str, Any]) -> str:
+        """缓存键：输入内容哈希 + 转换类型 + 转换参数（忽略 workers 等不影响输出的参数）"""
+        key_params = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+        material = json.dumps(
+            [CACHE_VERSION, converter, input_sha256, key_params], sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _count(conn, name: str) -> None:
+        conn.execute(
+            "INSERT INTO cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找缓存结果；输出文件已被删除的条目视为未命中并移除"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and not os.path.exists(row["output_path"]):
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(conn, "misses")
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET hits = hits + 1, last_access = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            self._count(conn, "hits")
+        return json.loads(row["result"])
+
+    def put(self, key: str, converter: str, output_path: str, result: Dict[str, Any]) -> bool:
+        """
+        加入缓存，并按最近使用时间淘汰超出容量的条目
+
+        同时计算输出文件的 SHA-256（刚写出的文件仍在页缓存中），下载时作为 ETag，不必在请求中读取整个文件
+
+        Returns:
+            是否已加入缓存（单个结果超过容量上限时不缓存）
+        """
+        size = _output_size(output_path)
+        if size > self.max_bytes:
+            return False
+        stat_result = os.stat(output_path)
+        sha256 = _file_sha256(output_path)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, converter, output_path, size, result, created_at, last_access, "
+                "sha256, file_size, file_mtime_ns) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, converter, os.path.abspath(output_path), size,
+                 json.dumps(_without_stats(result), ensure_ascii=False), now, now,
+                 sha256, stat_result.st_size, stat_result.st_mtime_ns)
+            )
+        self.evict(keep=key)
+        return True
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """淘汰最久未使用的条目直到总大小不超过上限，返回淘汰的条目数"""
+        evicted = []
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+            if total > self.max_bytes:
+                for row in conn.execute(
+                    "SELECT key, output_path, size FROM cache_entries ORDER BY last_access"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    if row["key"] == keep:
+                        continue
+                    conn.execute("DELETE FROM cache_entries WHERE key = ?", (row["key"],))
+                    total -= row["size"]
+                    evicted.append(row["output_path"])
+            conn.execute("COMMIT")
+        for output_path in evicted:
+            _remove_output(output_path)
+        if evicted:
+            logger.info("淘汰 %s 个结果", len(evicted))
+        return len(evicted)
+
+    def output_sha256(self, output_path: str, stat_result: os.stat_result) -> Optional[str]:
+        """写入缓存时记录的输出文件 SHA-256；文件之后被修改或替换（大小、修改时间不同）时返回 None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sha256, file_size, file_mtime_ns FROM cache_entries WHERE output_path = ? "
+                "AND sha256 IS NOT NULL ORDER BY created_at DESC LIMIT 1",
+                (output_path,)
+            ).fetchone()
+        if row is None:
+            return None
+        if (row["file_size"], row["file_mtime_ns"]) != (stat_result.st_size, stat_result.st_mtime_ns):
+            return None
+        return row["sha256"]
+
+    def prune_missing(self) -> int:
+        """删除输出文件已不存在的条目（文件被清理任务删除后调用），返回删除的条目数"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, output_path FROM cache_entries").fetchall()
+            missing = [row["key"] for row in rows if not os.path.exists(row["output_path"])]
+            conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in missing])
+        return len(missing)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """全局结果缓存（第一次使用时创建数据库），CACHE_ENABLED=False 时返回 None"""
+    global _cache
+    if not settings.CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResultCache(settings.CACHE_DB_PATH, settings.CACHE_MAX_BYTES)
+    return _cache
+
+
+def output_sha256(output_path: str, stat_result: os.stat_result) -> Optional[str]:
+    """已缓存的输出文件的内容哈希（供下载的 ETag 使用），未缓存或缓存未启用时返回 None"""
+    cache = get_result_cache()
+    return cache.output_sha256(os.path.abspath(output_path), stat_result) if cache is not None else None
+
+
+def _without_stats(result: Dict[str, Any]) -> Dict[str, Any]:
+    # 资源统计属于生成结果的那一次转换，命中缓存时不返回
+    return {name: value for name, value in result.items() if name != "stats"}
+
+
+async def _run_measured(
+    converter: str, func: Callable[..., Dict[str, Any]], input_path: str, *args,
+    profile_path: Optional[str] = None, **params
+) -> Tuple[Dict[str, Any], float, int]:
+    """
+    在执行池中执行并测量资源占用，结果中加入 stats；返回 (结果, 总耗时, 输入字节数)
+
+    指定 profile_path 时在分析器下执行，分析结果写到该路径
+    """
+    input_bytes = _output_size(input_path)
+    if profile_path:
+        func = functools.partial(run_profiled, profile_path, settings.PROFILER, func)
+    started = time.perf_counter()
+    try:
+        result, usage = await run_blocking(measure, func, input_path, *args, cpu_bound=True, **params)
+    except Exception:
+        observe_conversion(converter, time.perf_counter() - started, {"success": False}, input_bytes)
+        raise
+    elapsed = time.perf_counter() - started
+    result["stats"] = {
+        **usage,
+        # 在执行池中排队的时间
+        "queued_seconds": round(max(0.0, elapsed - usage["wall_seconds"]), 4),
+        "features": result.get("feature_count") or 0,
+        "input_bytes": input_bytes,
+        "output_bytes": result.get("file_size") or 0,
+    }
+    observe_resource_usage(converter, result["stats"])
+    return result, elapsed, input_bytes
+
+
+async def run_conversion(
+    converter: str, func: Callable[..., Dict[str, Any]], input_path: str, output_path: str,
+    profile_path: Optional[str] = None, **params
+) -> Dict[str, Any]:
+    """在执行池中执行转换，结果中加入资源统计（stats），并记录耗时、要素数、输入 / 输出字节数和资源占用指标"""
+    result, elapsed, input_bytes = await _run_measured(
+        converter, func, input_path, output_path, profile_path=profile_path, **params
+    )
+    observe_conversion(converter, elapsed, result, input_bytes)
+    return result
+
+
+async def run_validation(
+    converter: str, func: Callable[..., Dict[str, Any]], input_path: str
+) -> Dict[str, Any]:
+    """在执行池中执行验证（没有输出文件），结果中加入资源统计（stats）并记录资源占用指标"""
+    result, _, _ = await _run_measured(converter, func, input_path)
+    return result
+
+
+async def convert_cached(
+    converter: str, func: Callable[..., Dict[str, Any]], input_path: str, output_path: str,
+    input_sha256: str, profile_path: Optional[str] = None, **params
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    带缓存的转换：命中时直接返回缓存的结果，否则在执行池中转换并缓存成功的结果
+
+    相同缓存键的并发请求（包括其它 worker 进程中的请求）只执行一次转换，
+    其余请求等待其完成后从缓存读取结果。
+
+    Args:
+        converter: 转换类型（与 /api/jobs 的 kind 一致，同步接口与异步任务共享缓存）
+        func: 转换函数 func(input_path, output_path, **params)
+        input_sha256: 输入文件的SHA-256
+        profile_path: 性能分析结果路径；指定时不查找、不写入缓存，总是在分析器下重新转换
+        params: 转换参数
+
+    Returns:
+        (转换结果字典, 是否命中缓存)；结果中的 output_path 为实际的输出文件
+    """
+    cache = get_result_cache()
+    if cache is None or profile_path:
+        result = await run_conversion(converter, func, input_path, output_path, profile_path, **params)
+        return result, False
+
+    key = ResultCache.make_key(converter, input_sha256, params)
+    if single_flight.waiting(key):
+        logger.info("相同的转换正在进行，等待其结果: %s", converter)
+    async with single_flight.hold(key) as flight:
+        cached = await run_blocking(cache.get, key)
+        observe_cache_lookup(converter, cached is not None)
+        if cached is not None:
+            logger.info("命中 %s: %s", converter, os.path.basename(cached['output_path']))
+            return cached, True
+
+        result = await run_conversion(converter, func, input_path, output_path, **params)
+        # 写入时可能淘汰旧条目并删除其输出文件，同样在执行池中执行
+        if result.get("success") and await run_blocking(
+            cache.put, key, converter, result.get("output_path", output_path), result
+        ):
+            flight.release(remove=True)
+    return result, False
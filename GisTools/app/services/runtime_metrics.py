@@ -0,0 +1,122 @@
+"""
+运行状态指标
+执行池排队、结果缓存、上传 / 临时目录占用等状态在 /metrics 输出时读取，不在请求路径上记录
+"""
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Tuple
+
+from app.core.config import settings
+from app.core.executor import executor
+from app.core.metrics import registry
+from app.services.janitor import janitor
+from app.services.result_cache import get_result_cache
+
+# 目录占用需要遍历目录，结果缓存该时间（秒）
+DIR_USAGE_TTL = 15.0
+
+_dir_usage_lock = threading.Lock()
+_dir_usage: Dict[str, Tuple[float, int]] = {}
+
+
+def directory_size(path: str) -> int:
+    """目录下所有文件的总大小（不跟随符号链接）"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except FileNotFoundError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return total
+
+
+def _cached_directory_size(path: str) -> int:
+    now = time.monotonic()
+    with _dir_usage_lock:
+        cached = _dir_usage.get(path)
+        if cached is not None and now - cached[0] < DIR_USAGE_TTL:
+            return cached[1]
+    size = directory_size(path)
+    with _dir_usage_lock:
+        _dir_usage[path] = (now, size)
+    return size
+
+
+def _executor_stat(name: str):
+    def collect():
+        return {(kind,): stats[name] for kind, stats in executor.stats().items()}
+    return collect
+
+
+def _cache_stat(name: str):
+    def collect():
+        cache = get_result_cache()
+        return {(): cache.stats()[name]} if cache is not None else {}
+    return collect
+
+
+def _directory_bytes():
+    return {
+        ("temp",): _cached_directory_size(settings.TEMP_DIR),
+        ("upload",): _cached_directory_size(settings.UPLOAD_DIR),
+    }
+
+
+def _disk_free_bytes():
+    values = {}
+    for label, path in (("temp", settings.TEMP_DIR), ("upload", settings.UPLOAD_DIR)):
+        try:
+            values[(label,)] = shutil.disk_usage(path).free
+        except FileNotFoundError:
+            continue
+    return values
+
+
+def _last_sweep(name: str):
+    def collect():
+        return {(): janitor.last_sweep[name]} if janitor.last_sweep else {}
+    return collect
+
+
+registry.gauge(
+    "gistools_executor_workers", "Executor pool size", ("pool",), collect=_executor_stat("workers")
+)
+registry.gauge(
+    "gistools_executor_inflight", "Calls submitted to the executor and not yet finished", ("pool",),
+    collect=_executor_stat("inflight")
+)
+registry.gauge(
+    "gistools_executor_queue_depth", "Calls waiting for a free executor worker", ("pool",),
+    collect=_executor_stat("queued")
+)
+registry.gauge(
+    "gistools_cache_hit_ratio", "Result cache hit ratio across all workers", collect=_cache_stat("hit_rate")
+)
+registry.gauge("gistools_cache_entries", "Result cache entries", collect=_cache_stat("entries"))
+registry.gauge("gistools_cache_bytes", "Result cache size in bytes", collect=_cache_stat("total_bytes"))
+registry.gauge(
+    "gistools_directory_bytes", "Bytes used by the temp and upload directories", ("directory",),
+    collect=_directory_bytes
+)
+registry.gauge(
+    "gistools_disk_free_bytes", "Free bytes on the filesystem of the temp and upload directories", ("directory",),
+    collect=_disk_free_bytes
+)
+registry.gauge(
+    "gistools_janitor_last_sweep_timestamp_seconds", "Time of the last janitor sweep",
+    collect=_last_sweep("finished_at")
+)
+registry.gauge(
+    "gistools_janitor_bytes_freed", "Bytes freed by the last janitor sweep", collect=_last_sweep("bytes_freed")
+)
@@ -0,0 +1,280 @@
+"""
+Shapefile读写服务
+使用GDAL读取和写出Shapefile，作为转换流水线的读取器 / 写出器（见 pipeline 模块）
+"""
+import itertools
+import json
+import logging
+import os
+from typing import Iterable, Iterator, List
+
+from osgeo import ogr
+from osgeo import osr
+
+from app.core.log import RowWarnings
+from app.core.progress import ProgressReporter
+from app.services.csv_reader import (
+    DEFAULT_BATCH_SIZE, FIELD_INTEGER, FIELD_REAL, FIELD_STRING, PointBatch, infer_geometry_type,
+)
+from app.services.pipeline import LayerSchema, Source
+
+logger = logging.getLogger(__name__)
+
+# 读取器字段类型到OGR字段类型的映射
+_OGR_FIELD_TYPES = {
+    FIELD_INTEGER: ogr.OFTInteger,
+    FIELD_REAL: ogr.OFTReal,
+    FIELD_STRING: ogr.OFTString,
+}
+
+# 推断出的几何类型到OGR几何类型的映射
+_OGR_GEOMETRY_TYPES = {
+    'Point': ogr.wkbPoint,
+    'MultiPoint': ogr.wkbMultiPoint,
+    'LineString': ogr.wkbLineString,
+    'MultiLineString': ogr.wkbMultiLineString,
+    'Polygon': ogr.wkbPolygon,
+    'MultiPolygon': ogr.wkbMultiPolygon,
+}
+
+
+def _field_type(ogr_type: int) -> str:
+    """OGR字段类型到读取器字段类型（日期、列表等按字符串读取）"""
+    if ogr_type in (ogr.OFTInteger, ogr.OFTInteger64):
+        return FIELD_INTEGER
+    if ogr_type == ogr.OFTReal:
+        return FIELD_REAL
+    return FIELD_STRING
+
+
+def _is_wgs84_lonlat(spatial_ref) -> bool:
+    """是否为 WGS 84 经纬度（Shapefile 中坐标总是按 经度, 纬度 存放，与 OGC:CRS84 一致）"""
+    wgs84 = osr.SpatialReference()
+    wgs84.ImportFromEPSG(4326)
+    return bool(spatial_ref.IsSame(wgs84, [
+        "IGNORE_DATA_AXIS_TO_SRS_AXIS_MAPPING=YES", "CRITERION=EQUIVALENT_EXCEPT_AXIS_ORDER_GEOGCRS",
+    ]))
+
+
+def read_shp(input_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Source:
+    """
+    按批次读取Shapefile，几何按WKB整批交给 shapely 解析，没有几何的要素被跳过
+
+    Raises:
+        ValueError: 无法打开文件
+    """
+    data_source = ogr.Open(input_path)
+    if data_source is None:
+        raise ValueError(f"无法打开SHP文件: {input_path}")
+
+    layer = data_source.GetLayer()
+    layer_defn = layer.GetLayerDefn()
+    fields = []
+    for i in range(layer_defn.GetFieldCount()):
+        field_defn = layer_defn.GetFieldDefn(i)
+        fields.append((field_defn.GetName(), _field_type(field_defn.GetType())))
+    schema = LayerSchema(fields=fields)
+    spatial_ref = layer.GetSpatialRef()
+    if spatial_ref is not None:
+        schema.crs = spatial_ref.ExportToProj4()
+        if not _is_wgs84_lonlat(spatial_ref):
+            schema.crs_projjson = json.loads(spatial_ref.ExportToPROJJSON())
+    feature_count = layer.GetFeatureCount()
+    logger.debug("图层名: %s", layer.GetName())
+    logger.debug("几何类型: %s", ogr.GeometryTypeToName(layer.GetGeomType()))
+    logger.debug("要素数量: %s", feature_count)
+
+    batches = _iter_batches(data_source, layer, fields, batch_size)
+    return Source(schema=schema, batches=batches, total_features=feature_count)
+
+
+def _iter_batches(data_source, layer, fields, batch_size: int) -> Iterator[PointBatch]:
+    """逐要素读取图层（持有数据源引用，迭代结束前数据源不会关闭）"""
+    import shapely
+
+    warnings = RowWarnings(logger, "要素")
+    getters = []
+    for _, field_type in fields:
+        if field_type == FIELD_INTEGER:
+            getters.append(ogr.Feature.GetFieldAsInteger64)
+        elif field_type == FIELD_REAL:
+            getters.append(ogr.Feature.GetFieldAsDouble)
+        else:
+            getters.append(ogr.Feature.GetFieldAsString)
+
+    wkbs: List[bytes] = []
+    columns = [[] for _ in fields]
+    feature_no = 0
+    for feature in layer:
+        feature_no += 1
+        geom = feature.GetGeometryRef()
+        if geom is None:
+            warnings.warn("缺少几何", feature_no)
+            continue
+        wkbs.append(bytes(geom.ExportToIsoWkb()))
+        for i, (column, getter) in enumerate(zip(columns, getters)):
+            column.append(getter(feature, i) if feature.IsFieldSetAndNotNull(i) else None)
+        if len(wkbs) >= batch_size:
+            yield PointBatch(columns=columns, geometries=shapely.from_wkb(wkbs))
+            wkbs, columns = [], [[] for _ in fields]
+    if wkbs:
+        yield PointBatch(columns=columns, geometries=shapely.from_wkb(wkbs))
+    warnings.summary()
+
+
+def write_shp(
+    output_path: str, schema: LayerSchema, batches: Iterable[PointBatch], reporter: ProgressReporter,
+    encoding: str = "UTF-8"
+) -> int:
+    """
+    写出Shapefile
+
+    图层几何类型未知时由第一批推断（点批次为 Point），并写回 schema.geometry_type；
+    与图层类型不符的要素被跳过。
+
+    Raises:
+        ValueError: 没有有效的几何数据，或第一批包含混合几何类型
+    """
+    batches = iter(batches)
+    first_batch = next(batches, None)
+    if first_batch is None:
+        raise ValueError("输入中没有有效的几何数据")
+    has_z = False
+    if first_batch.geometries is None:
+        geometry_type = "Point"
+    else:
+        geometry_type, has_z = infer_geometry_type(first_batch.geometries)
+        if geometry_type is None:
+            raise ValueError("Shapefile不支持混合几何类型，请改用GeoJSON或GeoParquet输出")
+    ogr_geometry_type = _OGR_GEOMETRY_TYPES[geometry_type]
+    if has_z:
+        ogr_geometry_type = ogr.GT_SetZ(ogr_geometry_type)
+    schema.geometry_type = geometry_type
+    batches = itertools.chain([first_batch], batches)
+    logger.debug("几何类型: %s%s", geometry_type, ' Z' if has_z else '')
+
+    # 获取输出目录和文件名
+    output_dir = os.path.dirname(output_path)
+    shp_basename = os.path.basename(output_path).replace('.shp', '')
+
+    # 创建Shapefile驱动
+    logger.debug("创建驱动...")
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+
+    # 创建数据源
+    data_source = driver.CreateDataSource(output_dir, shp_basename)
+
+    # 创建空间参考（默认WGS 84）
+    spatial_ref = osr.SpatialReference()
+    if schema.crs:
+        spatial_ref.ImportFromProj4(schema.crs)
+    else:
+        spatial_ref.ImportFromEPSG(4326)
+
+    # 创建图层
+    layer = data_source.CreateLayer(shp_basename, spatial_ref, ogr_geometry_type, [f"ENCODING={encoding}"])
+
+    # 创建字段
+    logger.debug("创建字段...")
+    layer.CreateField(ogr.FieldDefn('id', ogr.OFTInteger))
+    # 字段索引在建表时一次性确定（Shapefile会截断/改写字段名，不能再按名称查找）
+    field_indices = []
+    for name, field_type in schema.fields:
+        before = layer.GetLayerDefn().GetFieldCount()
+        layer.CreateField(ogr.FieldDefn(name, _OGR_FIELD_TYPES[field_type]))
+        after = layer.GetLayerDefn().GetFieldCount()
+        field_indices.append(after - 1 if after > before else -1)
+
+    # 添加要素到图层
+    logger.debug("添加要素...")
+    written = _write_batches(layer, batches, schema, field_indices, reporter)
+
+    # 关闭数据源，确保数据落盘
+    layer = None
+    data_source = None
+    return written
+
+
+def _write_batches(
+    layer, batches: Iterable[PointBatch], schema: LayerSchema, field_indices: List[int],
+    reporter: ProgressReporter
+) -> int:
+    """
+    逐批次写出要素，每批次一个事务，字段索引只解析一次
+
+    点批次直接设置坐标；几何批次用 shapely 向量化导出WKB，OGR按二进制WKB构造几何。
+
+    Args:
+        layer: 已创建 id 字段（索引0）和属性字段的OGR图层
+        batches: 读取器产出的批次
+        schema: 图层结构
+        field_indices: schema.fields 中每个字段在图层中的索引，-1 表示未创建成功
+        reporter: 进度计数器，每批次提交后更新
+
+    Returns:
+        写出的要素数量
+    """
+    import shapely
+
+    feat = ogr.Feature(layer.GetLayerDefn())
+    point = ogr.Geometry(ogr.wkbPoint)
+
+    id_index = 0
+    setters = _field_setters(feat, schema, field_indices)
+    set_null = feat.SetFieldNull
+
+    row_id = 0
+    written = 0
+    rejected = 0
+    for batch in batches:
+        columns = batch.columns
+        if batch.geometries is None:
+            xs, ys = batch.xs, batch.ys
+            wkbs = None
+        else:
+            wkbs = shapely.to_wkb(batch.geometries)
+        layer.StartTransaction()
+        for i in range(len(batch)):
+            if wkbs is None:
+                point.SetPoint_2D(0, xs[i], ys[i])
+                feat.SetGeometry(point)
+            else:
+                feat.SetGeometryDirectly(ogr.CreateGeometryFromWkb(wkbs[i]))
+
+            row_id += 1
+            feat.SetFieldInteger64(id_index, row_id)
+            for column_no, field_index, setter in setters:
+                value = columns[column_no][i]
+                if value is None:
+                    set_null(field_index)
+                else:
+                    setter(field_index, value)
+
+            # 复用要素对象，清除上一次写入分配的FID
+            feat.SetFID(-1)
+            if layer.CreateFeature(feat) == 0:
+                written += 1
+            else:
+                rejected += 1
+        layer.CommitTransaction()
+        reporter.update(written, batch.bytes_read)
+
+    if rejected:
+        logger.warning("%s 个要素的几何类型与图层不符，已跳过", rejected)
+    return written
+
+
+def _field_setters(feat, schema: LayerSchema, field_indices: List[int]):
+    """按字段类型选择设置方法，返回 [(批次列序号, 图层字段索引, 设置方法)]"""
+    setters = []
+    for column_no, ((_, field_type), field_index) in enumerate(zip(schema.fields, field_indices)):
+        if field_index < 0:
+            continue
+        if field_type == FIELD_INTEGER:
+            setter = feat.SetFieldInteger64
+        elif field_type == FIELD_REAL:
+            setter = feat.SetFieldDouble
+        else:
+            setter = feat.SetFieldString
+        setters.append((column_no, field_index, setter))
+    return setters
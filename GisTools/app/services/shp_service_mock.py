@@ -3,89 +3,55 @@ Shapefile转换服务 - Mock版本（无GDAL）
 用于测试和开发，实际功能需要安装GDAL
 """
 import json
-from typing import Dict, Any, Optional
+import logging
+from typing import Dict, Any, Iterator, Optional
+
+from app.core.config import settings
+from app.core.progress import ProgressCallback, ProgressReporter
+from app.services import mock_features
+
+logger = logging.getLogger(__name__)
 
 
 class ShpConverter:
     """SHP文件转换器 - Mock版本"""
 
     @staticmethod
-    def shp_to_geojson(shp_path: str, output_path: str, encoding: str = "UTF-8") -> Dict[str, Any]:
+    def shp_to_geojson(
+        shp_path: str, output_path: str, encoding: str = "UTF-8",
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """
         将SHP文件转换为GeoJSON格式（Mock版本）
 
-        此版本仅用于测试，生成示例GeoJSON数据
+        此版本仅用于测试，生成示例GeoJSON数据（MOCK_FEATURE_COUNT 大于 0 时生成该数量的合成要素）
         实际使用需要安装GDAL并使用 shp_service.py
         """
         try:
-            # 生成示例GeoJSON数据
-            geojson_data = {
-                "type": "FeatureCollection",
-                "features": [
-                    {
-                        "type": "Feature",
-                        "geometry": {
-                            "type": "Point",
-                            "coordinates": [116.397428, 39.90923]
-                        },
-                        "properties": {
-                            "name": "示例点1",
-                            "id": 1
-                        }
-                    },
-                    {
-                        "type": "Feature",
-                        "geometry": {
-                            "type": "LineString",
-                            "coordinates": [
-                                [116.397428, 39.90923],
-                                [116.407428, 39.91923]
-                            ]
-                        },
-                        "properties": {
-                            "name": "示例线1",
-                            "id": 2
-                        }
-                    },
-                    {
-                        "type": "Feature",
-                        "geometry": {
-                            "type": "Polygon",
-                            "coordinates": [[
-                                [116.397428, 39.90923],
-                                [116.407428, 39.90923],
-                                [116.407428, 39.91923],
-                                [116.397428, 39.91923],
-                                [116.397428, 39.90923]
-                            ]]
-                        },
-                        "properties": {
-                            "name": "示例面1",
-                            "id": 3
-                        }
-                    }
-                ]
-            }
-
             # 写入输出文件
             import os
             output_dir = os.path.dirname(output_path)
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
 
-            print(f"[Mock服务] 保存文件到: {output_path}")
-            print(f"[Mock服务] 目录存在: {os.path.exists(output_dir)}")
-            print(f"[Mock服务] 目录绝对路径: {os.path.abspath(output_dir)}")
+            logger.debug("保存文件到: %s", output_path)
+            logger.debug("目录存在: %s", os.path.exists(output_dir))
+            logger.debug("目录绝对路径: %s", os.path.abspath(output_dir))
 
+            feature_count = ShpConverter._feature_count()
             with open(output_path, "w", encoding=encoding) as f:
-                json.dump(geojson_data, f, ensure_ascii=False, indent=2)
+                if mock_features.enabled():
+                    f.writelines(mock_features.iter_feature_collection())
+                else:
+                    json.dump(ShpConverter._sample_geojson(), f, ensure_ascii=False, indent=2)
 
-            print(f"[Mock服务] 文件已保存，大小: {os.path.getsize(output_path)} bytes")
+            logger.debug("文件已保存，大小: %s bytes", os.path.getsize(output_path))
+            ProgressReporter(progress, total=feature_count).finish(feature_count)
 
             return {
                 "success": True,
                 "message": "转换成功（Mock模式）",
-                "feature_count": 3,
+                "feature_count": feature_count,
                 "output_path": output_path,
                 "file_size": os.path.getsize(output_path),
                 "note": "这是示例数据，实际转换需要安装GDAL"
@@ -97,6 +63,76 @@ class ShpConverter:
                 "error": f"转换失败: {str(e)}"
             }
 
+    @staticmethod
+    def _feature_count() -> int:
+        return settings.MOCK_FEATURE_COUNT if mock_features.enabled() else 3
+
+    @staticmethod
+    def _sample_geojson() -> Dict[str, Any]:
+        """示例 GeoJSON 数据"""
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [116.397428, 39.90923]
+                    },
+                    "properties": {
+                        "name": "示例点1",
+                        "id": 1
+                    }
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [
+                            [116.397428, 39.90923],
+                            [116.407428, 39.91923]
+                        ]
+                    },
+                    "properties": {
+                        "name": "示例线1",
+                        "id": 2
+                    }
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [[
+                            [116.397428, 39.90923],
+                            [116.407428, 39.90923],
+                            [116.407428, 39.91923],
+                            [116.397428, 39.91923],
+                            [116.397428, 39.90923]
+                        ]]
+                    },
+                    "properties": {
+                        "name": "示例面1",
+                        "id": 3
+                    }
+                }
+            ]
+        }
+
+    @staticmethod
+    def iter_geojson(shp_path: str) -> Iterator[str]:
+        """
+        逐块生成 GeoJSON 文本（Mock版本，内容与 shp_to_geojson 的输出相同）
+
+        Raises:
+            ValueError: 文件不存在
+        """
+        import os
+        if not os.path.exists(shp_path):
+            raise ValueError(f"SHP文件不存在: {shp_path}")
+        if mock_features.enabled():
+            return mock_features.iter_feature_collection()
+        return iter([json.dumps(ShpConverter._sample_geojson(), ensure_ascii=False)])
+
     @staticmethod
     def get_shp_info(shp_path: str) -> Optional[Dict[str, Any]]:
         """
@@ -111,8 +147,8 @@ class ShpConverter:
                 "file_path": shp_path,
                 "file_size": os.path.getsize(shp_path),
                 "layer_name": "mock_layer",
-                "feature_count": 3,
-                "geometry_type": "Mixed",
+                "feature_count": ShpConverter._feature_count(),
+                "geometry_type": "Point" if mock_features.enabled() else "Mixed",
                 "fields": [
                     {"name": "id", "type": "Integer", "width": 10},
                     {"name": "name", "type": "String", "width": 50}
@@ -126,5 +162,5 @@ class ShpConverter:
             }
 
         except Exception as e:
-            print(f"获取SHP信息失败: {str(e)}")
+            logger.warning("获取SHP信息失败: %s", str(e))
             return None
@@ -0,0 +1,3 @@
+"""
+GisTools 性能基准测试套件
+"""
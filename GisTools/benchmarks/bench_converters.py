@@ -0,0 +1,286 @@
+"""
+转换服务基准测试
+
+用合成数据集（见 benchmarks/datasets.py）测量各转换的吞吐量和峰值内存，既直接调用转换服务，
+也通过 HTTP 接口（进程内的 TestClient，包含上传、参数识别、执行池调度）。
+每个用例在独立的子进程中运行，峰值内存（ru_maxrss）互不影响。
+
+结果可以保存为基准线；之后的运行与基准线比较，吞吐量下降或峰值内存增长超过容差时返回非零退出码。
+基准线与机器相关，应在同一台机器（或同规格的CI机器）上生成和比较。
+
+用法（在 GisTools 目录下运行）:
+    python -m benchmarks.bench_converters                               # 默认用例，只输出结果
+    python -m benchmarks.bench_converters --sizes 10000 100000 --fields 5 20
+    python -m benchmarks.bench_converters --update-baseline             # 保存为基准线
+    python -m benchmarks.bench_converters --tolerance 0.15              # 与基准线比较
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.datasets import DEFAULT_VERTICES, GEOMETRIES, WKT_FIELD, dataset_files, generate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BASELINE = os.path.join(_BASE_DIR, "benchmarks", "baselines", "converters.json")
+
+# 吞吐量下降 / 峰值内存增长超过该比例视为退化
+DEFAULT_TOLERANCE = 0.2
+
+DEFAULT_SIZES = [10000]
+DEFAULT_FIELDS = [5]
+
+# 用例名 → (输入格式, 任务类型, HTTP 接口)；任务类型同 /api/jobs，直接调用时使用同一个转换函数
+BENCHMARKS: Dict[str, Tuple[str, Optional[str], str]] = {
+    "shp_to_geojson": ("shp", "shp-to-geojson", "/api/batch/convert?kind=shp-to-geojson"),
+    "geojson_to_shp": ("geojson", "geojson-to-shp", "/api/geojson/to-shp"),
+    "geojson_validate": ("geojson", None, "/api/geojson/validate"),
+    "csv_to_shp": ("csv", "csv-to-shp", "/api/csv/to-shp"),
+    "csv_to_geojson": ("csv", "csv-to-geojson", "/api/csv/to-geojson"),
+}
+
+VIAS = ("direct", "http")
+
+# 比较基准线时用于匹配用例的字段
+_CASE_KEYS = ("benchmark", "via", "geometry", "features", "fields", "gdal")
+
+
+def _peak_rss() -> Optional[int]:
+    """当前进程的峰值常驻内存（字节）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _configure_env(workdir: str) -> None:
+    """子进程中的服务目录指向工作目录，关闭结果缓存（否则重复运行会命中缓存）"""
+    for name, sub in (("UPLOAD_DIR", "uploads"), ("TEMP_DIR", "temp"), ("LOCK_DIR", "locks")):
+        os.environ[name] = os.path.join(workdir, sub)
+        os.makedirs(os.environ[name], exist_ok=True)
+    os.environ["JOB_DB_PATH"] = os.path.join(workdir, "jobs.db")
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["JANITOR_ENABLED"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def _direct_call(benchmark: str, geometry: str, input_path: str, output_path: str):
+    """返回直接调用转换服务的函数"""
+    from app.routers.jobs import job_manager
+    from app.services import converters
+
+    if benchmark == "geojson_validate":
+        return lambda: converters.validate_geojson(input_path)
+    params = {}
+    if benchmark.startswith("csv_"):
+        if geometry == "point":
+            params = {"x_field": "lon", "y_field": "lat"}
+        else:
+            params = {"geometry_field": WKT_FIELD}
+    handler = job_manager.handler(BENCHMARKS[benchmark][1])
+    return lambda: handler(input_path, output_path, **params)
+
+
+def _http_call(benchmark: str, geometry: str, input_path: str):
+    """返回通过 HTTP 接口转换的函数"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    url = BENCHMARKS[benchmark][2]
+    if benchmark.startswith("csv_") and geometry != "point":
+        url += f"?geometry_field={WKT_FIELD}"
+    field = "files" if url.startswith("/api/batch/") else "file"
+
+    def call():
+        handles = [open(path, "rb") for path in dataset_files(input_path)]
+        try:
+            response = client.post(
+                url, files=[(field, (os.path.basename(h.name), h)) for h in handles]
+            )
+        finally:
+            for handle in handles:
+                handle.close()
+        response.raise_for_status()
+        body = response.json()
+        if "results" in body:
+            return body["results"][0]
+        return body
+    return call
+
+
+def run_case(benchmark: str, via: str, geometry: str, features: int, fields: int,
+             repeat: int, workdir: str, vertices: int = DEFAULT_VERTICES) -> Dict[str, Any]:
+    """运行一个用例（在子进程中调用），返回耗时、吞吐量和峰值内存"""
+    _configure_env(workdir)
+    from app.services import converters
+    from app.core.gdal import gdal_available
+
+    fmt, kind, _ = BENCHMARKS[benchmark]
+    case = {
+        "benchmark": benchmark, "via": via, "geometry": geometry, "features": features, "fields": fields,
+        "vertices": vertices, "gdal": gdal_available(),
+    }
+    if kind is not None and not converters.supports(kind):
+        return {**case, "skipped": "需要GDAL"}
+
+    input_path = generate(os.path.join(workdir, "data"), fmt, geometry, features, fields, vertices)
+    input_bytes = sum(os.path.getsize(path) for path in dataset_files(input_path))
+    output_ext = ".shp" if benchmark.endswith("_shp") else ".geojson"
+    output_path = os.path.join(workdir, "out", f"{benchmark}_{geometry}{output_ext}")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if via == "http":
+        call = _http_call(benchmark, geometry, input_path)
+    else:
+        call = _direct_call(benchmark, geometry, input_path, output_path)
+
+    rss_before = _peak_rss()
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        seconds.append(time.perf_counter() - started)
+        if not result.get("success", result.get("valid")):
+            raise RuntimeError(f"{benchmark} ({via}, {geometry}) 失败: {result.get('error')}")
+    rss_after = _peak_rss()
+
+    median = statistics.median(seconds)
+    return {
+        **case,
+        "input_bytes": input_bytes,
+        "runs": repeat,
+        "median_seconds": round(median, 4),
+        "min_seconds": round(min(seconds), 4),
+        "features_per_second": round(features / median, 1) if median > 0 else None,
+        "mb_per_second": round(input_bytes / median / 1048576, 2) if median > 0 else None,
+        "peak_rss_bytes": rss_after,
+        "peak_rss_delta_bytes": rss_after - rss_before if rss_after is not None else None,
+    }
+
+
+def run_suite(benchmarks: List[str], vias: List[str], geometries: List[str], sizes: List[int], fields: List[int],
+              repeat: int, workdir: str, vertices: int = DEFAULT_VERTICES) -> List[Dict[str, Any]]:
+    """依次运行所有用例，每个用例使用新的子进程"""
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for benchmark in benchmarks:
+        for via in vias:
+            for geometry in geometries:
+                for size in sizes:
+                    for width in fields:
+                        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                            result = pool.submit(
+                                run_case, benchmark, via, geometry, size, width, repeat, workdir, vertices
+                            ).result()
+                        _print_result(result)
+                        results.append(result)
+    return results
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    name = (f"{result['benchmark']} [{result['via']}] {result['geometry']} "
+            f"n={result['features']} fields={result['fields']}")
+    if "skipped" in result:
+        print(f"[基准] {name}: 跳过（{result['skipped']}）")
+        return
+    line = f"[基准] {name}: {result['median_seconds']}s, {result['features_per_second']} features/s"
+    if result["peak_rss_bytes"] is not None:
+        line += f", peak RSS {result['peak_rss_bytes'] / 1048576:.1f}MB"
+    print(line)
+
+
+def _case_key(result: Dict[str, Any]) -> tuple:
+    return tuple(result.get(key) for key in _CASE_KEYS)
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    与基准线比较
+
+    Returns:
+        退化说明列表（为空表示没有退化）；基准线中没有的用例不比较
+    """
+    expected = {_case_key(item): item for item in baseline if "skipped" not in item}
+    regressions = []
+    for result in results:
+        base = expected.get(_case_key(result))
+        if base is None or "skipped" in result:
+            continue
+        name = " ".join(f"{key}={result.get(key)}" for key in _CASE_KEYS)
+        throughput, base_throughput = result.get("features_per_second"), base.get("features_per_second")
+        if throughput and base_throughput and throughput < base_throughput * (1 - tolerance):
+            regressions.append(
+                f"{name}: 吞吐量 {throughput} < 基准 {base_throughput} features/s"
+                f"（下降 {1 - throughput / base_throughput:.0%}）"
+            )
+        rss, base_rss = result.get("peak_rss_bytes"), base.get("peak_rss_bytes")
+        if rss and base_rss and rss > base_rss * (1 + tolerance):
+            regressions.append(
+                f"{name}: 峰值内存 {rss} > 基准 {base_rss} bytes（增长 {rss / base_rss - 1:.0%}）"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="转换服务吞吐量 / 峰值内存基准测试")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--via", nargs="+", choices=VIAS, default=list(VIAS), help="直接调用或通过 HTTP 接口")
+    parser.add_argument("--geometries", nargs="+", choices=GEOMETRIES, default=list(GEOMETRIES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="要素数")
+    parser.add_argument("--fields", type=int, nargs="+", default=DEFAULT_FIELDS, help="属性字段数")
+    parser.add_argument("--vertices", type=int, default=DEFAULT_VERTICES, help="线、面几何的顶点数")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例的运行次数，取中位数")
+    parser.add_argument("--workdir", default=None, help="工作目录（默认使用临时目录）")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基准线JSON路径")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果保存为基准线")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的退化比例")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="gistools_bench_")
+    try:
+        results = run_suite(
+            args.benchmarks, args.via, args.geometries, args.sizes, args.fields, args.repeat, workdir, args.vertices
+        )
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"[基准] 已保存基准线: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"[基准] 没有基准线 {args.baseline}，跳过比较（使用 --update-baseline 生成）")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for line in regressions:
+        print(f"[退化] {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
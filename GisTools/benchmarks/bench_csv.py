@@ -0,0 +1,101 @@
+"""
+CSV → SHP 转换吞吐量基准测试
+
+生成指定行数的合成点数据CSV，测量 CsvConverter.csv_to_shp 的端到端吞吐量。
+
+用法（在 GisTools 目录下运行，需要安装GDAL）:
+    python -m benchmarks.bench_csv                      # 默认 1M、10M、50M 行
+    python -m benchmarks.bench_csv --rows 1000000       # 只测 1M 行
+    python -m benchmarks.bench_csv --output result.json # 保存结果
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+DEFAULT_ROWS = [1_000_000, 10_000_000, 50_000_000]
+
+
+def generate_points_csv(path: str, rows: int, seed: int = 42) -> int:
+    """
+    生成合成点数据CSV（lon, lat, name, value, level）
+
+    Returns:
+        文件大小（字节）
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("lon,lat,name,value,level\n")
+        lines = []
+        for i in range(rows):
+            lines.append(
+                f"{rng.uniform(73, 135):.6f},{rng.uniform(18, 53):.6f},"
+                f"p{i},{rng.random() * 1000:.3f},{i % 10}\n"
+            )
+            if len(lines) >= 100_000:
+                f.writelines(lines)
+                lines.clear()
+        f.writelines(lines)
+    return os.path.getsize(path)
+
+
+def run_csv_to_shp(rows: int, workdir: str) -> Dict[str, Any]:
+    """生成数据并计时一次 csv_to_shp 转换"""
+    from app.services.csv_service import CsvConverter
+
+    csv_path = os.path.join(workdir, f"points_{rows}.csv")
+    output_path = os.path.join(workdir, "out", f"points_{rows}.shp")
+
+    input_bytes = generate_points_csv(csv_path, rows)
+
+    start = time.perf_counter()
+    result = CsvConverter.csv_to_shp(csv_path, output_path)
+    elapsed = time.perf_counter() - start
+
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+    return {
+        "benchmark": "csv_to_shp",
+        "rows": rows,
+        "feature_count": result["feature_count"],
+        "input_bytes": input_bytes,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(result["feature_count"] / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="CSV → SHP 吞吐量基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="测试行数")
+    parser.add_argument("--workdir", default=None, help="工作目录（默认使用临时目录）")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="gistools_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    try:
+        for rows in args.rows:
+            print(f"[基准] csv_to_shp rows={rows} ...")
+            result = run_csv_to_shp(rows, workdir)
+            print(f"[基准] {result['seconds']}s, {result['rows_per_second']} rows/s")
+            results.append(result)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
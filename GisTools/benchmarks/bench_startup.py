@@ -0,0 +1,85 @@
+"""
+冷启动基准测试
+
+在新的解释器进程中导入 app.main（worker 启动、测试客户端都要经过这一步），测量导入耗时，
+并检查导入时没有加载 GDAL、没有输出。中位数超过预算时返回非零退出码。
+
+用法（在 GisTools 目录下运行）:
+    python -m benchmarks.bench_startup                  # 默认 5 次，预算 2 秒
+    python -m benchmarks.bench_startup --runs 10 --budget 1.5
+    python -m benchmarks.bench_startup --output result.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+DEFAULT_BUDGET = 2.0
+
+# 子进程中执行：测量导入耗时，报告导入后已加载的重型模块
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": elapsed,
+    "osgeo_loaded": "osgeo" in sys.modules,
+    "uvicorn_loaded": "uvicorn" in sys.modules,
+}))
+"""
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(env: Dict[str, str] = None) -> Dict[str, Any]:
+    """在新进程中导入一次 app.main"""
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=_BASE_DIR, capture_output=True, text=True,
+        env={**os.environ, **(env or {})}, check=True,
+    )
+    lines = completed.stdout.strip().splitlines()
+    result = json.loads(lines[-1])
+    # 导入时的输出（除探测结果外）
+    result["stdout"] = "\n".join(lines[:-1])
+    return result
+
+
+def run_startup(runs: int, budget: float) -> Dict[str, Any]:
+    samples = [measure_import() for _ in range(runs)]
+    seconds = [sample["seconds"] for sample in samples]
+    median = statistics.median(seconds)
+    return {
+        "benchmark": "import_app_main",
+        "runs": runs,
+        "median_seconds": round(median, 3),
+        "min_seconds": round(min(seconds), 3),
+        "max_seconds": round(max(seconds), 3),
+        "budget_seconds": budget,
+        "within_budget": median <= budget,
+        "osgeo_loaded": any(sample["osgeo_loaded"] for sample in samples),
+        "import_output": any(sample["stdout"] for sample in samples),
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="冷启动（导入 app.main）基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数，取中位数")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="导入耗时预算（秒）")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args(argv)
+
+    result = run_startup(args.runs, args.budget)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    ok = result["within_budget"] and not result["osgeo_loaded"] and not result["import_output"]
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
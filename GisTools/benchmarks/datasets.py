@@ -0,0 +1,275 @@
+"""
+合成测试数据生成
+
+按几何类型（点 / 线 / 面）、要素数和属性字段数生成 Shapefile、GeoJSON 和 CSV 数据集。
+同样的参数和随机种子总是生成相同的数据；Shapefile 直接按格式规范写出，不需要GDAL。
+
+用法（在 GisTools 目录下运行）:
+    python -m benchmarks.datasets --format shp --geometry polygon --count 100000 --fields 10 --output data/
+"""
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import random
+import struct
+from typing import Any, Iterator, List, Tuple
+
+GEOMETRIES = ("point", "line", "polygon")
+FORMATS = ("shp", "geojson", "csv")
+
+# 文件扩展名
+FORMAT_EXTS = {"shp": ".shp", "geojson": ".geojson", "csv": ".csv"}
+
+# 线、面几何的默认顶点数
+DEFAULT_VERTICES = 8
+
+# CSV 中线、面几何使用的 WKT 字段名（点使用 lon / lat 两列）
+WKT_FIELD = "wkt"
+
+# 坐标范围（中国范围内的经纬度）
+_EXTENT = (73.0, 18.0, 135.0, 53.0)
+
+# 线、面几何的大小（度）
+_FEATURE_SPAN = 0.05
+
+# 属性字段按 字符串 / 整数 / 浮点数 循环：(DBF类型, 宽度, 小数位数)
+_FIELD_TYPES = (("C", 24, 0), ("N", 10, 0), ("N", 18, 6))
+
+_SHP_TYPES = {"point": 1, "line": 3, "polygon": 5}
+
+_WGS84_PRJ = (
+    'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+    'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]'
+)
+
+def field_names(fields: int) -> List[str]:
+    return [f"f{i}" for i in range(fields)]
+
+
+def iter_features(geometry: str, count: int, fields: int, vertices: int = DEFAULT_VERTICES,
+                  seed: int = 42) -> Iterator[Tuple[Any, List[Any]]]:
+    """
+    逐个生成要素
+
+    Yields:
+        (坐标, 属性值列表)：点为 (x, y)，线为顶点列表，面为闭合的外环（逆时针）
+    """
+    if geometry not in GEOMETRIES:
+        raise ValueError(f"不支持的几何类型: {geometry}，可选: {GEOMETRIES}")
+    rng = random.Random(seed)
+    min_x, min_y, max_x, max_y = _EXTENT
+    for i in range(count):
+        x = rng.uniform(min_x, max_x - _FEATURE_SPAN)
+        y = rng.uniform(min_y, max_y - _FEATURE_SPAN)
+        if geometry == "point":
+            coords = (x, y)
+        elif geometry == "line":
+            step = _FEATURE_SPAN / max(vertices - 1, 1)
+            coords = [(x + step * k, y + rng.uniform(0, _FEATURE_SPAN)) for k in range(vertices)]
+        else:
+            radius = _FEATURE_SPAN / 2
+            coords = [
+                (x + radius + radius * math.cos(2 * math.pi * k / vertices),
+                 y + radius + radius * math.sin(2 * math.pi * k / vertices))
+                for k in range(vertices)
+            ]
+            coords.append(coords[0])
+        values = []
+        for j in range(fields):
+            field_type, _, decimals = _FIELD_TYPES[j % len(_FIELD_TYPES)]
+            if field_type == "C":
+                values.append(f"name_{i}_{j}")
+            elif not decimals:
+                values.append(rng.randrange(1_000_000))
+            else:
+                values.append(round(rng.uniform(0, 10000), 6))
+        yield coords, values
+
+
+def _geojson_geometry(geometry: str, coords: Any) -> dict:
+    if geometry == "point":
+        return {"type": "Point", "coordinates": list(coords)}
+    if geometry == "line":
+        return {"type": "LineString", "coordinates": [list(c) for c in coords]}
+    return {"type": "Polygon", "coordinates": [[list(c) for c in coords]]}
+
+
+def _wkt(geometry: str, coords: Any) -> str:
+    text = ", ".join(f"{x:.6f} {y:.6f}" for x, y in coords)
+    return f"LINESTRING ({text})" if geometry == "line" else f"POLYGON (({text}))"
+
+
+def write_geojson(path: str, geometry: str, count: int, fields: int,
+                  vertices: int = DEFAULT_VERTICES, seed: int = 42) -> None:
+    names = field_names(fields)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for i, (coords, values) in enumerate(iter_features(geometry, count, fields, vertices, seed)):
+            feature = {
+                "type": "Feature",
+                "geometry": _geojson_geometry(geometry, coords),
+                "properties": dict(zip(names, values)),
+            }
+            f.write((",\n" if i else "") + json.dumps(feature, ensure_ascii=False))
+        f.write("\n]}\n")
+
+
+def write_csv(path: str, geometry: str, count: int, fields: int,
+              vertices: int = DEFAULT_VERTICES, seed: int = 42) -> None:
+    """点写为 lon / lat 两列，线、面写为 WKT 列"""
+    geometry_columns = ["lon", "lat"] if geometry == "point" else [WKT_FIELD]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(geometry_columns + field_names(fields))
+        for coords, values in iter_features(geometry, count, fields, vertices, seed):
+            if geometry == "point":
+                row = [f"{coords[0]:.6f}", f"{coords[1]:.6f}"]
+            else:
+                row = [_wkt(geometry, coords)]
+            writer.writerow(row + values)
+
+
+def _shp_header(shape_type: int, length_bytes: int, bbox: List[float]) -> bytes:
+    return (
+        struct.pack(">6iI", 9994, 0, 0, 0, 0, 0, length_bytes // 2)
+        + struct.pack("<2i", 1000, shape_type)
+        + struct.pack("<8d", *bbox, 0.0, 0.0, 0.0, 0.0)
+    )
+
+
+def _shp_content(shape_type: int, coords: Any) -> Tuple[bytes, List[float]]:
+    if shape_type == 1:
+        x, y = coords
+        return struct.pack("<i2d", shape_type, x, y), [x, y, x, y]
+    points = list(coords)
+    if shape_type == 5:
+        # Shapefile 外环为顺时针
+        points.reverse()
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    bbox = [min(xs), min(ys), max(xs), max(ys)]
+    content = struct.pack("<i4d2i", shape_type, *bbox, 1, len(points)) + struct.pack("<i", 0)
+    content += struct.pack(f"<{len(points) * 2}d", *(v for p in points for v in p))
+    return content, bbox
+
+
+def _dbf_field_specs(fields: int) -> List[Tuple[str, str, int, int]]:
+    return [(name, *_FIELD_TYPES[j % len(_FIELD_TYPES)]) for j, name in enumerate(field_names(fields))]
+
+
+def _dbf_header(count: int, specs: List[Tuple[str, str, int, int]]) -> bytes:
+    today = datetime.date.today()
+    record_length = 1 + sum(spec[2] for spec in specs)
+    header_length = 32 + 32 * len(specs) + 1
+    header = struct.pack(
+        "<4BIHH20x", 3, today.year - 1900, today.month, today.day, count, header_length, record_length
+    )
+    for name, field_type, width, decimals in specs:
+        header += struct.pack(
+            "<11sc4xBB14x", name.encode("ascii"), field_type.encode("ascii"), width, decimals
+        )
+    return header + b"\r"
+
+
+def _dbf_record(specs: List[Tuple[str, str, int, int]], values: List[Any]) -> bytes:
+    parts = [b" "]
+    for (_, field_type, width, decimals), value in zip(specs, values):
+        if field_type == "C":
+            parts.append(str(value).encode("utf-8")[:width].ljust(width))
+        elif decimals:
+            parts.append(f"{value:.{decimals}f}".encode("ascii")[:width].rjust(width))
+        else:
+            parts.append(str(value).encode("ascii")[:width].rjust(width))
+    return b"".join(parts)
+
+
+def write_shapefile(path: str, geometry: str, count: int, fields: int,
+                    vertices: int = DEFAULT_VERTICES, seed: int = 42) -> None:
+    """写出 .shp / .shx / .dbf / .prj / .cpg（WGS84，属性为UTF-8）"""
+    shape_type = _SHP_TYPES[geometry]
+    base = os.path.splitext(path)[0]
+    specs = _dbf_field_specs(fields)
+    bbox = [math.inf, math.inf, -math.inf, -math.inf]
+    offset = 100
+    with open(base + ".shp", "wb") as shp, open(base + ".shx", "wb") as shx, open(base + ".dbf", "wb") as dbf:
+        # 文件头中的长度和范围在写完所有记录后回填
+        shp.write(b"\0" * 100)
+        shx.write(b"\0" * 100)
+        dbf.write(_dbf_header(count, specs))
+        for number, (coords, values) in enumerate(iter_features(geometry, count, fields, vertices, seed), 1):
+            content, record_bbox = _shp_content(shape_type, coords)
+            shp.write(struct.pack(">2i", number, len(content) // 2) + content)
+            shx.write(struct.pack(">2i", offset // 2, len(content) // 2))
+            offset += 8 + len(content)
+            bbox = [min(bbox[0], record_bbox[0]), min(bbox[1], record_bbox[1]),
+                    max(bbox[2], record_bbox[2]), max(bbox[3], record_bbox[3])]
+            dbf.write(_dbf_record(specs, values))
+        dbf.write(b"\x1a")
+        if not count:
+            bbox = [0.0, 0.0, 0.0, 0.0]
+        shp.seek(0)
+        shp.write(_shp_header(shape_type, offset, bbox))
+        shx.seek(0)
+        shx.write(_shp_header(shape_type, 100 + 8 * count, bbox))
+    with open(base + ".prj", "w", encoding="ascii") as f:
+        f.write(_WGS84_PRJ)
+    with open(base + ".cpg", "w", encoding="ascii") as f:
+        f.write("UTF-8")
+
+
+_WRITERS = {"shp": write_shapefile, "geojson": write_geojson, "csv": write_csv}
+
+
+def generate(directory: str, fmt: str, geometry: str, count: int, fields: int,
+             vertices: int = DEFAULT_VERTICES, seed: int = 42) -> str:
+    """
+    生成数据集（目录中已有相同参数的数据集时直接返回）
+
+    Returns:
+        数据集路径（Shapefile 为 .shp 路径）
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支持的格式: {fmt}，可选: {FORMATS}")
+    os.makedirs(directory, exist_ok=True)
+    name = f"{geometry}_{count}_{fields}f_{vertices}v_{seed}{FORMAT_EXTS[fmt]}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        partial = os.path.join(directory, f".partial_{name}")
+        _WRITERS[fmt](partial, geometry, count, fields, vertices, seed)
+        if fmt == "shp":
+            for ext in (".shx", ".dbf", ".prj", ".cpg"):
+                os.replace(os.path.splitext(partial)[0] + ext, os.path.splitext(path)[0] + ext)
+        # 主文件最后改名，存在即表示数据集完整
+        os.replace(partial, path)
+    return path
+
+
+def dataset_files(path: str) -> List[str]:
+    """数据集包含的全部文件（Shapefile 包含关联文件）"""
+    if not path.lower().endswith(".shp"):
+        return [path]
+    base = os.path.splitext(path)[0]
+    return [path] + [base + ext for ext in (".shx", ".dbf", ".prj", ".cpg") if os.path.exists(base + ext)]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="生成合成测试数据")
+    parser.add_argument("--format", choices=FORMATS, required=True)
+    parser.add_argument("--geometry", choices=GEOMETRIES, default="point")
+    parser.add_argument("--count", type=int, default=10000, help="要素数")
+    parser.add_argument("--fields", type=int, default=5, help="属性字段数")
+    parser.add_argument("--vertices", type=int, default=DEFAULT_VERTICES, help="线、面几何的顶点数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=".", help="输出目录")
+    args = parser.parse_args(argv)
+
+    path = generate(args.output, args.format, args.geometry, args.count, args.fields, args.vertices, args.seed)
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,291 @@
+"""
+HTTP 压测
+
+用 asyncio + httpx 按配置的比例并发请求转换、验证和下载接口，统计各接口的延迟分位数（p50 / p95 / p99）
+和每秒请求数，用于评估上传、路由、准入控制和下载这一层的容量。
+
+不指定 --url 时在本机启动一个服务实例（MOCK_CONVERTERS=true，关闭结果缓存），转换由 Mock 服务完成，
+输出 --mock-features 个约 --mock-feature-bytes 字节的合成要素，不包含GDAL的开销；
+指定 --url 时压测已有的实例（需要自行设置 MOCK_CONVERTERS 等配置）。
+
+用法（在 GisTools 目录下运行）:
+    python -m benchmarks.loadtest                                        # 默认比例，16 并发，1000 个请求
+    python -m benchmarks.loadtest --mix shp=1,download=3 --concurrency 64 --duration 30
+    python -m benchmarks.loadtest --mock-features 100000 --server-workers 4 --output result.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:8001
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.datasets import generate
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 操作名 → (上传格式, 接口)；download 下载之前转换生成的文件
+OPERATIONS = {
+    "shp": ("shp", "/api/shp/to-geojson"),
+    "validate": ("geojson", "/api/geojson/validate"),
+    "csv": ("csv", "/api/csv/to-shp"),
+    "download": (None, "/api/download/{filename}"),
+}
+
+DEFAULT_MIX = "shp=3,validate=2,csv=2,download=3"
+
+# 保留的下载地址数，下载时从中随机选择
+_MAX_DOWNLOAD_URLS = 64
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """解析请求比例，如 "shp=3,download=1"（权重不需要加起来等于 1）"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"未知的操作: {name}，可选: {list(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("请求比例为空")
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """最近秩法分位数（q 为 0~100），sorted_values 需已排序"""
+    if not sorted_values:
+        return None
+    rank = min(max(1, math.ceil(len(sorted_values) * q / 100)), len(sorted_values))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """汇总一组请求：请求数、失败数、每秒请求数、延迟分位数（毫秒）和各状态码次数"""
+    values = sorted(latencies)
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": len(values),
+        "errors": len(values) - ok,
+        "rps": round(len(values) / elapsed, 2) if elapsed > 0 else None,
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else None,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+class LoadTest:
+    """按比例并发发送请求并记录每个请求的延迟和状态码"""
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], inputs: Dict[str, str]):
+        self.client = client
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.inputs = inputs
+        self.download_urls: List[str] = []
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.names}
+        self.statuses: Dict[str, Dict[str, int]] = {name: {} for name in self.names}
+        self._uploads = {}
+        for fmt, path in inputs.items():
+            with open(path, "rb") as f:
+                self._uploads[fmt] = (os.path.basename(path), f.read())
+
+    async def _request(self, name: str) -> httpx.Response:
+        fmt, url = OPERATIONS[name]
+        if name == "download":
+            return await self.client.get(random.choice(self.download_urls))
+        filename, content = self._uploads[fmt]
+        params = {"x_field": "lon", "y_field": "lat"} if fmt == "csv" else None
+        response = await self.client.post(url, files={"file": (filename, content)}, params=params)
+        if name == "shp" and response.status_code == 200:
+            download_url = response.json().get("download_url")
+            if download_url:
+                self.download_urls.append(download_url)
+                del self.download_urls[:-_MAX_DOWNLOAD_URLS]
+        return response
+
+    async def _one(self, name: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await self._request(name)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+
+    async def run(self, concurrency: int, requests: Optional[int] = None,
+                  duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        并发执行，直到发出 requests 个请求或持续 duration 秒
+
+        Returns:
+            总体和各操作的统计
+        """
+        remaining = [requests]
+        deadline = time.perf_counter() + duration if duration else None
+
+        def take() -> bool:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            if remaining[0] is not None:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+            return True
+
+        async def worker():
+            while take():
+                await self._one(random.choices(self.names, self.weights)[0])
+
+        if "download" in self.names and not self.download_urls:
+            # 先转换一次，得到可下载的文件
+            response = await self._request("shp")
+            if not self.download_urls:
+                raise RuntimeError(f"无法生成下载文件: {response.status_code} {response.text[:200]}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        all_statuses: Dict[str, int] = {}
+        for statuses in self.statuses.values():
+            for status, count in statuses.items():
+                all_statuses[status] = all_statuses.get(status, 0) + count
+        return {
+            "concurrency": concurrency,
+            "seconds": round(elapsed, 3),
+            "total": summarize(all_latencies, all_statuses, elapsed),
+            "operations": {
+                name: summarize(self.latencies[name], self.statuses[name], elapsed) for name in self.names
+            },
+        }
+
+
+def prepare_inputs(directory: str, features: int, fields: int) -> Dict[str, str]:
+    """生成上传用的点数据集（Shapefile 只上传 .shp 主文件）"""
+    return {fmt: generate(directory, fmt, "point", features, fields) for fmt in ("shp", "geojson", "csv")}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, workers: int, mock_features: int, mock_feature_bytes: int,
+                 cache: bool = False, timeout: float = 30.0) -> Tuple[subprocess.Popen, str]:
+    """在本机启动 Mock 模式的服务实例，返回 (进程, 地址)"""
+    port = _free_port()
+    env = {**os.environ, "RELOAD": "false", "WORKERS": str(workers), "MOCK_CONVERTERS": "true",
+           "MOCK_FEATURE_COUNT": str(mock_features), "MOCK_FEATURE_BYTES": str(mock_feature_bytes),
+           "CACHE_ENABLED": str(cache).lower(), "JANITOR_ENABLED": "false", "LOG_LEVEL": "WARNING"}
+    for name, sub in (("UPLOAD_DIR", "uploads"), ("TEMP_DIR", "temp"), ("LOCK_DIR", "locks")):
+        env[name] = os.path.join(workdir, sub)
+        os.makedirs(env[name], exist_ok=True)
+    env["JOB_DB_PATH"] = os.path.join(workdir, "jobs.db")
+    env["CACHE_DB_PATH"] = os.path.join(workdir, "cache.db")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=_BASE_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务启动失败，退出码 {process.returncode}")
+        try:
+            if httpx.get(url + "/health", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("服务启动超时")
+
+
+async def run_load(url: str, mix: Dict[str, float], inputs: Dict[str, str], concurrency: int,
+                   requests: Optional[int], duration: Optional[float], timeout: float = 120.0) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        return await LoadTest(client, mix, inputs).run(concurrency, requests, duration)
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"[压测] 并发 {report['concurrency']}，用时 {report['seconds']}s")
+    header = f"{'操作':<10}{'请求数':>8}{'失败':>6}{'RPS':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}  状态码"
+    print(header)
+    rows = [*report["operations"].items(), ("total", report["total"])]
+    for name, stats in rows:
+        print(
+            f"{name:<10}{stats['requests']:>8}{stats['errors']:>6}{stats['rps'] or 0:>10}"
+            f"{stats['p50_ms'] or 0:>10}{stats['p95_ms'] or 0:>10}{stats['p99_ms'] or 0:>10}  {stats['statuses']}"
+        )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP 层压测（上传、路由、下载）")
+    parser.add_argument("--url", default=None, help="被测实例地址（默认在本机启动 Mock 模式的实例）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"请求比例，可选操作: {', '.join(OPERATIONS)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发请求数")
+    parser.add_argument("--requests", type=int, default=1000, help="请求总数（指定 --duration 时忽略）")
+    parser.add_argument("--duration", type=float, default=None, help="持续时间（秒）")
+    parser.add_argument("--input-features", type=int, default=1000, help="上传数据集的要素数")
+    parser.add_argument("--input-fields", type=int, default=5, help="上传数据集的属性字段数")
+    parser.add_argument("--mock-features", type=int, default=1000, help="Mock 转换输出的合成要素数")
+    parser.add_argument("--mock-feature-bytes", type=int, default=256, help="每个合成要素的大致字节数")
+    parser.add_argument("--server-workers", type=int, default=1, help="本机启动的实例的 worker 进程数")
+    parser.add_argument("--cache", action="store_true", help="本机启动的实例开启结果缓存")
+    parser.add_argument("--workdir", default=None, help="工作目录（默认使用临时目录）")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="gistools_load_")
+    process = None
+    try:
+        inputs = prepare_inputs(os.path.join(workdir, "inputs"), args.input_features, args.input_fields)
+        url = args.url
+        if url is None:
+            process, url = start_server(
+                os.path.join(workdir, "server"), args.server_workers, args.mock_features,
+                args.mock_feature_bytes, args.cache
+            )
+        report = asyncio.run(run_load(
+            url, mix, inputs, args.concurrency, None if args.duration else args.requests, args.duration
+        ))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report["mix"] = mix
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report["total"]["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+生产环境多 worker 部署配置
+
+用法（在 GisTools 目录下运行，仅支持 Linux / macOS）:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+主进程预先导入应用代码后 fork 出 WORKERS 个 worker（默认CPU核数），各 worker 通过
+SQLite（任务表、结果缓存）和 LOCK_DIR 下的文件锁共享状态；文件清理和中断任务恢复只在选举出的主 worker 中运行。
+"""
+import os
+
+from app.core.config import settings
+
+# 生产环境默认值（开发用的 python main.py 默认单进程热重载）：不热重载；
+# 环境变量和 .env 中都没有配置 WORKERS 时使用CPU核数。preload 后 worker 继承修改后的配置
+settings.RELOAD = False
+if "WORKERS" not in settings.model_fields_set:
+    settings.WORKERS = 0
+os.environ["RELOAD"] = "false"
+os.environ["WORKERS"] = str(settings.WORKERS)
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.workers
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# 主进程导入一次应用代码，worker fork 后共享内存页，启动更快
+preload_app = True
+
+# 大文件转换可能耗时较长；worker 超时后由主进程重启，中断的任务由主 worker 放回队列
+timeout = 600
+graceful_timeout = 60
+keepalive = 5
+
+loglevel = settings.LOG_LEVEL.lower()
+accesslog = "-"
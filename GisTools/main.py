@@ -11,6 +11,7 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.RELOAD,
+        workers=settings.workers,
         log_level="info"
     )
 
@@ -0,0 +1,16 @@
+"""
+测试配置：上传 / 临时目录、任务表和结果缓存使用临时目录，避免读写开发环境的目录；关闭后台文件清理
+"""
+import os
+import tempfile
+
+_DATA_DIR = tempfile.mkdtemp(prefix="gistools_test_")
+os.environ.setdefault("JOB_DB_PATH", os.path.join(_DATA_DIR, "jobs.db"))
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(_DATA_DIR, "cache.db"))
+os.environ.setdefault("LOCK_DIR", os.path.join(_DATA_DIR, "locks"))
+os.environ.setdefault("JANITOR_ENABLED", "false")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_DATA_DIR, "uploads"))
+os.environ.setdefault("TEMP_DIR", os.path.join(_DATA_DIR, "temp"))
+# TestClient 不使用 with 时不执行 lifespan，在这里创建目录
+os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+os.makedirs(os.environ["TEMP_DIR"], exist_ok=True)
@@ -0,0 +1,61 @@
+"""
+准入控制测试
+"""
+import asyncio
+
+import pytest
+
+from app.core.admission import DEFAULT_RETRY_AFTER, EndpointLimiter, Rejected
+
+
+def test_limiter_queue_and_retry_after():
+    async def scenario():
+        limiter = EndpointLimiter(
+            concurrency=1, max_inflight_bytes=100, queue_size=1, max_queue_bytes=100, queue_timeout=5
+        )
+        await limiter.acquire(10)
+        waiting = asyncio.create_task(limiter.acquire(10))
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        # 队列已满：立即拒绝，尚无完成的请求时使用默认的 Retry-After
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire(10)
+        assert rejected.value.retry_after == DEFAULT_RETRY_AFTER
+
+        limiter.release(10, duration=2.0)
+        await waiting
+        assert limiter.active == 1 and limiter.queued == 0
+
+        # 排空速度 1 / 2s：排在一个等待请求之后约需 4s
+        blocked = asyncio.create_task(limiter.acquire(10))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire(10)
+        assert rejected.value.retry_after == 4
+        limiter.release(10, duration=2.0)
+        await blocked
+
+    asyncio.run(scenario())
+
+
+def test_limiter_weighted_by_upload_size():
+    async def scenario():
+        limiter = EndpointLimiter(
+            concurrency=4, max_inflight_bytes=100, queue_size=4, max_queue_bytes=100, queue_timeout=0.05
+        )
+        # 单个请求超过处理中上限时也会被接受
+        await limiter.acquire(150)
+        # 上传大小超过等待队列容量：立即拒绝
+        with pytest.raises(Rejected):
+            await limiter.acquire(120)
+        # 等待超时
+        with pytest.raises(Rejected):
+            await limiter.acquire(60)
+        assert limiter.queued == 0 and limiter.queued_bytes == 0
+        limiter.release(150, duration=0.1)
+        await limiter.acquire(60)
+        await limiter.acquire(40)
+        assert limiter.active == 2
+
+    asyncio.run(scenario())
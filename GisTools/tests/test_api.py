@@ -1,6 +1,8 @@
 """
 API 端点测试
 """
+import hashlib
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -39,3 +41,189 @@ def test_openapi_json():
     data = response.json()
     assert "openapi" in data
     assert "paths" in data
+
+
+def test_csv_inspect_detects_gbk_semicolon():
+    """测试CSV嗅探：GBK编码、分号分隔、中文坐标字段"""
+    content = "名称;经度;纬度\n" + "".join(f"点{i};{116 + i / 100};{39 + i / 100}\n" for i in range(20))
+    response = client.post(
+        "/api/csv/inspect",
+        files={"file": ("points.csv", content.encode("gbk"), "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] is True
+    assert data["encoding"] == "GBK"
+    assert data["delimiter"] == ";"
+    assert data["x_field"] == "经度"
+    assert data["y_field"] == "纬度"
+    assert data["coordinate_system"] == "geographic"
+
+
+def test_csv_inspect_detects_bom_and_range():
+    """测试CSV嗅探：UTF-8 BOM，字段名无法匹配时按数值范围识别坐标"""
+    content = "name,a,b\n" + "".join(f"p{i},{100 + i / 10},{30 + i / 10}\n" for i in range(20))
+    response = client.post(
+        "/api/csv/inspect",
+        files={"file": ("points.csv", b"\xef\xbb\xbf" + content.encode("utf-8"), "text/csv")}
+    )
+    data = response.json()
+    assert data["encoding"] == "UTF-8-SIG"
+    assert data["headers"][0] == "name"
+    assert (data["x_field"], data["y_field"]) == ("a", "b")
+
+
+def test_csv_to_geojson():
+    """测试CSV转GeoJSON（不依赖GDAL）"""
+    content = "lon,lat,name\n116.1,39.1,a\n116.2,39.2,b\nbad,39.3,c\n"
+    response = client.post(
+        "/api/csv/to-geojson",
+        files={"file": ("points.csv", content.encode("utf-8"), "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] is True
+    assert data["feature_count"] == 2
+    assert data["download_url"].endswith(".geojson")
+
+
+def test_csv_wkt_to_geojson():
+    """测试CSV几何字段（WKT/十六进制WKB）自动识别并转GeoJSON"""
+    content = (
+        'name,wkt\n'
+        'a,"LINESTRING (116 39, 117 40)"\n'
+        'b,"POLYGON ((116 39, 117 39, 117 40, 116 39))"\n'
+        'c,0101000000000000000000F03F0000000000000040\n'
+    )
+    response = client.post(
+        "/api/csv/to-geojson",
+        files={"file": ("shapes.csv", content.encode("utf-8"), "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["geometry_field"] == "wkt"
+    assert data["feature_count"] == 3
+
+
+def test_csv_conversion_cache_hit():
+    """测试相同内容、相同参数的转换命中结果缓存"""
+    content = "name,lon,lat\ncache,100.25,30.5\n".encode("utf-8")
+    before = client.get("/api/cache/stats").json()
+    first = client.post("/api/csv/to-geojson", files={"file": ("a.csv", content, "text/csv")}).json()
+    second = client.post("/api/csv/to-geojson", files={"file": ("b.csv", content, "text/csv")}).json()
+    assert not first["cached"]
+    assert second["cached"]
+    # 资源统计只属于实际执行的转换
+    assert first["stats"]["features"] == 1 and first["stats"]["input_bytes"] == len(content)
+    assert first["stats"]["cpu_seconds"] >= 0 and first["stats"]["output_bytes"] == first["file_size"]
+    assert second["stats"] is None
+    assert second["download_url"] == first["download_url"]
+    after = client.get("/api/cache/stats").json()
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_shp_to_geojson_mock():
+    """测试SHP转GeoJSON（未安装GDAL时为 Mock 服务的示例数据）"""
+    response = client.post("/api/shp/to-geojson", files={"file": ("a.shp", b"mock", "application/octet-stream")})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["feature_count"] == 3 and data["stats"]["features"] == 3 and data["profile_url"] is None
+    assert client.get(data["download_url"]).json()["type"] == "FeatureCollection"
+    # 相同内容再次转换命中缓存，没有资源统计
+    cached = client.post("/api/shp/to-geojson", files={"file": ("b.shp", b"mock", "application/octet-stream")})
+    assert cached.status_code == 200 and cached.json()["cached"] and cached.json()["stats"] is None
+
+
+@pytest.mark.parametrize("profiler, marker", [("cprofile", b"csv_to_geojson"), ("sampling", b"")])
+def test_csv_conversion_profile(monkeypatch, profiler, marker):
+    """测试 profile=true：需要管理员令牌，跳过缓存，分析结果同样需要令牌才能下载"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILER", profiler)
+    content = "name,lon,lat\nprofile,102.5,32.25\n".encode("utf-8")
+    files = {"file": ("p.csv", content, "text/csv")}
+    assert client.post("/api/csv/to-geojson?profile=true", files=files).status_code == 403
+    headers = {"X-Admin-Token": "secret"}
+    assert client.post("/api/csv/to-geojson?profile=true&inline=true", files=files, headers=headers).status_code == 400
+
+    for _ in range(2):
+        data = client.post("/api/csv/to-geojson?profile=true", files=files, headers=headers).json()
+        assert not data["cached"] and data["feature_count"] == 1
+    assert data["profile_url"].endswith(".geojson" + (".pstats" if profiler == "cprofile" else ".collapsed"))
+    assert client.get(data["profile_url"]).status_code == 403
+    response = client.get(data["profile_url"], headers=headers)
+    assert response.status_code == 200 and marker in response.content
+    # 不带 profile 时没有分析结果
+    assert client.post("/api/csv/to-geojson", files=files).json()["profile_url"] is None
+
+
+def test_download_range_and_etag():
+    """测试下载：媒体类型、Range 206、If-None-Match 304、416"""
+    content = "name,lon,lat\ndl,101.5,31.25\n".encode("utf-8")
+    url = client.post("/api/csv/to-geojson", files={"file": ("d.csv", content, "text/csv")}).json()["download_url"]
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.headers["content-type"] == "application/geo+json"
+    assert full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+    # 结果写入缓存时已记录内容哈希
+    assert etag == f'"{hashlib.sha256(full.content).hexdigest()}"'
+
+    part = client.get(url, headers={"Range": "bytes=0-9"})
+    assert part.status_code == 206
+    assert part.content == full.content[:10]
+    assert part.headers["content-range"] == f"bytes 0-9/{len(full.content)}"
+    tail = client.get(url, headers={"Range": "bytes=-5"})
+    assert tail.content == full.content[-5:]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"Range": f"bytes={len(full.content)}-"}).status_code == 416
+    assert client.get("/api/download/..%2Fconfig.py").status_code == 404
+
+
+def test_csv_to_geojson_inline_gzip():
+    """测试 inline 模式：直接流式返回 GeoJSON，按 Accept-Encoding 压缩"""
+    import json
+
+    content = "lon,lat,name\n" + "".join(f"{116 + i / 1000},{39 + i / 1000},p{i}\n" for i in range(500))
+    files = {"file": ("inline.csv", content.encode("utf-8"), "text/csv")}
+    response = client.post("/api/csv/to-geojson?inline=true", files=files, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/geo+json"
+    assert response.headers["content-encoding"] == "gzip"
+    # httpx 自动解压
+    assert len(json.loads(response.content)["features"]) == 500
+
+    plain = client.post(
+        "/api/csv/to-geojson?inline=true&seq=true", files=files, headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in plain.headers
+    assert len(plain.text.splitlines()) == 500
+    assert json.loads(plain.text.splitlines()[0])["id"] == 1
+
+
+def test_request_id_header():
+    """测试请求ID：合法的 X-Request-ID 原样返回，否则生成新的ID"""
+    assert client.get("/health", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"] == "abc-123"
+    generated = client.get("/health", headers={"X-Request-ID": "bad id\n"}).headers["x-request-id"]
+    assert generated and generated != "bad id\n"
+
+
+def test_metrics():
+    """测试 /metrics：按路由模板记录请求，按转换类型记录耗时和吞吐量"""
+    content = "lon,lat,name\n" + "".join(f"{116 + i / 1000},{39 + i / 1000},m{i}\n" for i in range(20))
+    files = {"file": ("metrics.csv", content.encode("utf-8"), "text/csv")}
+    assert client.post("/api/csv/to-geojson", files=files).status_code == 200
+    client.get("/api/jobs/does-not-exist")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'gistools_http_requests_total{method="GET",route="/api/jobs/{job_id}",status="404"}' in text
+    assert 'gistools_conversion_duration_seconds_bucket{converter="csv-to-geojson",le="+Inf"}' in text
+    assert "gistools_conversion_features_total" in text
+    assert 'gistools_conversion_cpu_seconds_total{converter="csv-to-geojson"}' in text
+    assert 'gistools_executor_queue_depth{pool="thread"} 0' in text
+    assert 'gistools_directory_bytes{directory="temp"}' in text
@@ -0,0 +1,97 @@
+"""
+批量转换测试
+"""
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import converters
+from app.services.batch_service import find_datasets
+
+client = TestClient(app)
+
+
+def _csv(i: int) -> bytes:
+    return f"name,lon,lat\nbatch{i},{110 + i},{30 + i / 10}\nb{i},{111 + i},{31 + i / 10}\n".encode("utf-8")
+
+
+def test_batch_files_manifest_and_zip():
+    """测试多文件批量转换：单个失败不影响其它文件，结果打包为一个zip"""
+    files = [("files", (f"p{i}.csv", _csv(i), "text/csv")) for i in range(3)]
+    files.append(("files", ("bad.csv", b"a,b\nx,y\n", "text/csv")))
+    response = client.post("/api/batch/convert?kind=csv-to-geojson", files=files)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total"], data["succeeded"], data["failed"]) == (4, 3, 1)
+    failed = [item for item in data["results"] if not item["success"]]
+    assert failed[0]["name"] == "bad.csv" and failed[0]["error"]
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get(data["download_url"]).content))
+    names = set(archive.namelist())
+    assert names == {"p0.geojson", "p1.geojson", "p2.geojson", "manifest.json"}
+    assert json.loads(archive.read("p1.geojson"))["features"][0]["properties"]["name"] == "batch1"
+    assert json.loads(archive.read("manifest.json"))["succeeded"] == 3
+
+
+def test_batch_zip_upload():
+    """测试上传一个包含多个数据集的zip，拒绝越界路径"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a/points.csv", _csv(5))
+        archive.writestr("b/points.csv", _csv(6))
+        archive.writestr("readme.txt", "ignored")
+    files = {"files": ("datasets.zip", buffer.getvalue(), "application/zip")}
+    data = client.post("/api/batch/convert?kind=csv-to-geojsonl", files=files).json()
+    assert data["succeeded"] == 2
+    archive = zipfile.ZipFile(io.BytesIO(client.get(data["download_url"]).content))
+    assert {"a/points.geojsonl", "b/points.geojsonl"} <= set(archive.namelist())
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("../evil.csv", _csv(7))
+    files = {"files": ("evil.zip", buffer.getvalue(), "application/zip")}
+    assert client.post("/api/batch/convert?kind=csv-to-geojson", files=files).status_code == 400
+
+
+@pytest.fixture
+def mock_converters(monkeypatch):
+    """使用 Mock 转换服务（不依赖是否安装GDAL，上传内容不必是真实的Shapefile）"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "MOCK_CONVERTERS", True)
+    converters.load_service.cache_clear()
+    yield
+    converters.load_service.cache_clear()
+
+
+def test_batch_shapefiles_with_sidecars(mock_converters, tmp_path):
+    """测试批量上传多个Shapefile及关联文件：按主文件分组，关联文件内容计入数据集哈希"""
+    def upload(dbf: bytes):
+        files = [
+            ("files", ("a.shp", b"shp-a", "application/octet-stream")),
+            ("files", ("a.dbf", dbf, "application/octet-stream")),
+            ("files", ("b.shp", b"shp-b", "application/octet-stream")),
+        ]
+        response = client.post("/api/batch/convert?kind=shp-to-geojson", files=files)
+        assert response.status_code == 200
+        return {item["name"]: item for item in response.json()["results"]}
+
+    first = upload(b"dbf-1")
+    assert sorted(first) == ["a.shp", "b.shp"]
+    assert all(item["success"] and not item["cached"] for item in first.values())
+    # 只修改 a.dbf：a 的缓存键变化需要重新转换，b 命中缓存
+    second = upload(b"dbf-2")
+    assert not second["a.shp"]["cached"] and second["b.shp"]["cached"]
+    assert upload(b"dbf-2")["a.shp"]["cached"]
+
+    for name, content in [("a.shp", b"shp-a"), ("a.dbf", b"dbf-1"), ("A.prj", b"prj"), ("b.shp", b"shp-b")]:
+        (tmp_path / name).write_bytes(content)
+    paths = [str(tmp_path / name) for name in ("a.shp", "a.dbf", "A.prj", "b.shp")]
+    a, b = find_datasets(paths, (".shp",))
+    assert sorted(a.sidecars) == [".dbf", ".prj"] and b.sidecars == {}
+    (tmp_path / "a.dbf").write_bytes(b"dbf-2")
+    assert find_datasets(paths, (".shp",))[0].sha256 != a.sha256
@@ -0,0 +1,80 @@
+"""
+基准测试工具测试：合成数据集格式正确，退化检查按容差判断，压测统计和 Mock 合成要素
+"""
+import asyncio
+import csv
+import json
+import struct
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from benchmarks.bench_converters import compare
+from benchmarks.datasets import WKT_FIELD, dataset_files, generate
+from benchmarks.loadtest import LoadTest, parse_mix, percentile, prepare_inputs
+
+
+@pytest.mark.parametrize("geometry", ["point", "line", "polygon"])
+def test_synthetic_datasets(tmp_path, geometry):
+    shp_path = generate(str(tmp_path), "shp", geometry, 50, 4)
+    shp, shx, dbf, *_ = [open(path, "rb").read() for path in dataset_files(shp_path)]
+    # 文件头中的长度（16位字）与实际大小一致，.shx 中的偏移指向对应的记录
+    assert struct.unpack(">i", shp[24:28])[0] * 2 == len(shp)
+    assert len(shx) == 100 + 8 * 50
+    offset, length = struct.unpack(">2i", shx[-8:])
+    assert struct.unpack(">2i", shp[offset * 2:offset * 2 + 8]) == (50, length)
+    count, header_length, record_length = struct.unpack("<IHH", dbf[4:12])
+    assert count == 50 and len(dbf) == header_length + count * record_length + 1
+
+    with open(generate(str(tmp_path), "geojson", geometry, 50, 4), encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    assert len(features) == 50 and list(features[0]["properties"]) == ["f0", "f1", "f2", "f3"]
+
+    with open(generate(str(tmp_path), "csv", geometry, 50, 4), encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 51
+    assert rows[0][:2] == ["lon", "lat"] if geometry == "point" else rows[0][0] == WKT_FIELD
+
+
+def test_compare_flags_regressions_past_tolerance():
+    case = {"benchmark": "csv_to_geojson", "via": "direct", "geometry": "point", "features": 1000,
+            "fields": 5, "gdal": False}
+    baseline = [{**case, "features_per_second": 1000.0, "peak_rss_bytes": 100}]
+    assert compare([{**case, "features_per_second": 850.0, "peak_rss_bytes": 115}], baseline, 0.2) == []
+    regressions = compare([{**case, "features_per_second": 700.0, "peak_rss_bytes": 130}], baseline, 0.2)
+    assert len(regressions) == 2
+    # 基准线中没有的用例不比较
+    assert compare([{**case, "fields": 10, "features_per_second": 1.0}], baseline, 0.2) == []
+
+
+def test_percentile_and_mix():
+    values = [float(i) for i in range(1, 101)]
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50.0, 95.0, 99.0)
+    assert percentile([3.0], 99) == 3.0 and percentile([], 50) is None
+    assert parse_mix("shp=3,download") == {"shp": 3.0, "download": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+
+def test_load_test_with_mock_features(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MOCK_FEATURE_COUNT", 40)
+    monkeypatch.setattr(settings, "MOCK_FEATURE_BYTES", 300)
+    inputs = prepare_inputs(str(tmp_path), 10, 2)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            load = LoadTest(client, parse_mix("shp=1,validate=1,download=2"), inputs)
+            report = await load.run(concurrency=4, requests=20)
+            download = await client.get(load.download_urls[0])
+        return report, download
+
+    report, download = asyncio.run(scenario())
+    assert report["total"]["requests"] == 20 and report["total"]["errors"] == 0
+    assert report["total"]["p50_ms"] <= report["total"]["p99_ms"]
+    features = download.json()["features"]
+    # 合成要素的数量和大小
+    assert len(features) == 40
+    assert abs(len(json.dumps(features[-1], ensure_ascii=False)) - 300) <= 10
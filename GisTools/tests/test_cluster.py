@@ -0,0 +1,68 @@
+"""
+多 worker 协作测试
+"""
+import asyncio
+import subprocess
+import sys
+
+from app.core import cluster
+from app.core.config import settings
+from app.services.job_service import JOB_QUEUED, JOB_RUNNING, JobStore
+
+
+def test_only_one_leader_and_takeover(tmp_path):
+    started = []
+
+    async def scenario():
+        first = cluster.LeaderElection(str(tmp_path), retry_interval=0.01)
+        second = cluster.LeaderElection(str(tmp_path), retry_interval=0.01)
+        for name, election in (("first", first), ("second", second)):
+            async def start(name=name):
+                started.append(name)
+
+            async def stop():
+                pass
+
+            election.add_service(start, stop)
+
+        await first.start()
+        await second.start()
+        await asyncio.sleep(0.05)
+        assert first.is_leader and first.elected_at_startup
+        assert not second.is_leader and started == ["first"]
+
+        # 主 worker 退出后由其它 worker 接替
+        await first.stop()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if second.is_leader:
+                break
+        assert second.is_leader and not second.elected_at_startup
+        assert started == ["first", "second"]
+        await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_jobs_of_exited_worker_are_requeued(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCK_DIR", str(tmp_path / "locks"))
+    store = JobStore(str(tmp_path / "jobs.db"))
+    orphan = store.create("demo", {}, "in1", "out1", 3)
+    running = store.create("demo", {}, "in2", "out2", 3)
+
+    # 另一个 worker 进程领取任务后退出
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys; from app.core.config import settings; settings.LOCK_DIR = sys.argv[1]; "
+         "from app.services.job_service import JobStore; JobStore(sys.argv[2]).claim_next(['demo'])",
+         settings.LOCK_DIR, store.db_path],
+        check=True,
+    )
+    assert store.claim_next(["demo"])["id"] == running["id"]
+    worker_id = store.get(orphan["id"])["worker_id"]
+    assert worker_id and not cluster.worker_alive(worker_id)
+    assert cluster.worker_alive(cluster.current_worker_id())
+
+    assert store.requeue_orphans() == 1
+    assert store.get(orphan["id"])["status"] == JOB_QUEUED
+    assert store.get(running["id"])["status"] == JOB_RUNNING
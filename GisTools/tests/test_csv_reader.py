@@ -0,0 +1,83 @@
+"""
+CSV分块读取测试（不依赖GDAL）
+"""
+import logging
+
+import pytest
+
+from app.services.csv_reader import (
+    infer_schema, iter_point_batches, iter_point_batches_parallel, split_byte_ranges,
+)
+
+
+def _flatten(batches):
+    rows = []
+    for batch in batches:
+        for i in range(len(batch)):
+            rows.append((batch.xs[i], batch.ys[i], tuple(col[i] for col in batch.columns)))
+    return rows
+
+
+@pytest.fixture
+def points_csv(tmp_path):
+    """包含引号内换行、无效坐标和空值的CSV"""
+    lines = ['lon,lat,name,value,level']
+    for i in range(500):
+        if i % 37 == 0:
+            lines.append(f'{i}.5,{i}.25,"多行\n名称 ""{i}""\n结束",{i * 1.5},{i}')
+        elif i % 41 == 0:
+            lines.append(f'bad,{i},n{i},,{i}')
+        else:
+            lines.append(f'{i}.5,{i}.25,n{i},{i * 1.5},')
+    path = tmp_path / "points.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_infer_schema(points_csv):
+    schema, sample_count = infer_schema(points_csv)
+    assert sample_count == 10
+    assert schema.fields == [("name", "String"), ("value", "Real"), ("level", "Integer")]
+
+
+def test_infer_schema_missing_field(points_csv):
+    with pytest.raises(KeyError):
+        infer_schema(points_csv, x_field="x")
+
+
+def test_split_byte_ranges_aligned_to_rows(points_csv):
+    ranges = split_byte_ranges(points_csv, 16)
+    assert len(ranges) > 1
+    with open(points_csv, 'rb') as f:
+        data = f.read()
+    # 分块首尾相接并覆盖整个数据区
+    assert ranges[0][0] == data.index(b'\n') + 1
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start - 1:start] == b'\n'
+        # 切分点不在引号字段内
+        assert data[:start].count(b'"') % 2 == 0
+
+
+def test_parallel_matches_serial(points_csv):
+    schema, _ = infer_schema(points_csv)
+    serial = _flatten(iter_point_batches(points_csv, schema, batch_size=64))
+    parallel = _flatten(iter_point_batches_parallel(points_csv, schema, workers=2, chunk_bytes=512))
+    # i 为 41 的倍数的 12 行坐标无效
+    assert len(serial) == 500 - 12
+    assert parallel == serial
+
+
+def test_row_warnings_limited_and_summarized(tmp_path, caplog):
+    lines = ["lon,lat,name"] + [f"bad,{i},n{i}" if i % 2 else f"{i},{i},n{i}" for i in range(100)]
+    path = tmp_path / "bad.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    schema, _ = infer_schema(str(path))
+
+    with caplog.at_level(logging.WARNING, logger="app.services.csv_reader"):
+        assert len(_flatten(iter_point_batches(str(path), schema))) == 50
+    messages = [record.getMessage() for record in caplog.records]
+    # 逐条记录前 ROW_WARNING_LIMIT 条，其余只计入汇总
+    assert sum("无效坐标值" in m and "共跳过" not in m for m in messages) == 10
+    assert "共跳过 50 行" in messages[-1] and "40 行未逐条记录" in messages[-1]
@@ -0,0 +1,58 @@
+"""
+转换执行池测试
+"""
+import asyncio
+import time
+import tracemalloc
+
+from app.core.config import settings
+from app.core.executor import ConversionExecutor, EXECUTOR_PROCESS
+from app.core.resource_usage import measure
+
+
+def test_blocking_call_does_not_block_event_loop():
+    """阻塞函数在线程池中执行时，事件循环仍能处理其它协程"""
+    pool = ConversionExecutor(thread_workers=2, process_workers=1)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await pool.run(time.sleep, 0.3, cpu_bound=True)
+        task.cancel()
+        return result, ticks
+
+    try:
+        result, ticks = asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert result is None
+    assert ticks >= 10
+
+
+def test_process_pool_runs_cpu_bound_calls():
+    pool = ConversionExecutor(thread_workers=1, process_workers=1, cpu_executor=EXECUTOR_PROCESS)
+    try:
+        assert asyncio.run(pool.run(divmod, 17, 5, cpu_bound=True)) == (3, 2)
+    finally:
+        pool.shutdown()
+
+
+def test_measure_cpu_and_tracemalloc_peak(monkeypatch):
+    monkeypatch.setattr(settings, "CONVERSION_TRACEMALLOC", True)
+
+    def allocate():
+        data = bytearray(8 * 1048576)
+        return sum(range(200000)) + len(data)
+
+    result, usage = measure(allocate)
+    assert result == sum(range(200000)) + 8 * 1048576
+    assert usage["cpu_seconds"] > 0 and usage["wall_seconds"] > 0
+    assert usage["tracemalloc_peak_bytes"] >= 8 * 1048576
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,64 @@
+"""
+文件清理任务测试
+"""
+import asyncio
+import os
+import time
+
+from app.services.janitor import Janitor
+
+
+def _file(path, size, age):
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_sweep_ttl_quota_and_temp_dirs(tmp_path):
+    uploads, temp = tmp_path / "uploads", tmp_path / "temp"
+    uploads.mkdir()
+    temp.mkdir()
+    expired = _file(uploads / "expired.geojson", 100, 8 * 86400)
+    oldest = _file(uploads / "old.shp", 300, 5000)
+    sidecar = _file(uploads / "old.dbf", 100, 5000)
+    downloaded = _file(uploads / "downloaded.geojson", 400, 6000)
+    fresh = _file(uploads / "fresh.geojson", 400, 10)
+    # 下载只更新访问时间
+    os.utime(downloaded, (time.time() - 60, time.time() - 6000))
+
+    orphan = temp / "orphan"
+    orphan.mkdir()
+    (orphan / "input.csv").write_text("x")
+
+    janitor = Janitor(str(uploads), str(temp), output_ttl=7 * 86400, output_max_bytes=900)
+    stats = asyncio.run(janitor.sweep(temp_older_than=time.time() + 1))
+
+    assert not expired.exists()
+    # 超出容量时先删除最久未下载的结果，Shapefile 与关联文件一起删除
+    assert not oldest.exists() and not sidecar.exists()
+    assert downloaded.exists() and fresh.exists()
+    assert not orphan.exists()
+    assert stats["outputs_removed"] == 2 and stats["bytes_freed"] == 500
+
+
+def test_sweep_removes_stale_unheld_locks(tmp_path):
+    from app.core.single_flight import FileLock
+
+    locks = tmp_path / "locks"
+    (locks / "workers").mkdir(parents=True)
+    stale = _file(locks / "stale.lock", 0, 86400)
+    recent = _file(locks / "recent.lock", 0, 10)
+    held = _file(locks / "held.lock", 0, 86400)
+    lock = FileLock(str(held))
+    assert lock.try_acquire()
+    os.utime(held, (time.time() - 86400, time.time() - 86400))
+
+    janitor = Janitor(str(tmp_path / "uploads"), str(tmp_path / "temp"), temp_ttl=3600, lock_dir=str(locks))
+    stats = asyncio.run(janitor.sweep())
+    lock.release()
+
+    assert stats["locks_removed"] == 1
+    assert not stale.exists() and recent.exists() and held.exists()
+    assert (locks / "workers").is_dir()
+
@@ -0,0 +1,128 @@
+"""
+异步任务测试
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.job_service import (
+    JOB_CANCELLED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JobManager, JobStore, job_manager,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def _input(tmp_path):
+    path = tmp_path / "in" / "input.txt"
+    path.parent.mkdir()
+    path.write_text("x")
+    return str(path)
+
+
+def test_claim_and_cancel(store, tmp_path):
+    first = store.create("demo", {}, _input(tmp_path), str(tmp_path / "out1"), 3)
+    second = store.create("demo", {"n": 2}, str(tmp_path / "b"), str(tmp_path / "out2"), 3)
+
+    claimed = store.claim_next(["demo"])
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == JOB_RUNNING
+    assert claimed["attempts"] == 1
+
+    # 排队中的任务立即取消，运行中的任务只记录取消请求
+    assert store.request_cancel(second["id"])["status"] == JOB_CANCELLED
+    running = store.request_cancel(first["id"])
+    assert running["status"] == JOB_RUNNING and running["cancel_requested"]
+    assert store.claim_next(["demo"]) is None
+
+
+def test_failing_handler_is_retried(store, tmp_path):
+    calls = []
+
+    def flaky(input_path, output_path, progress=None, **params):
+        calls.append(params)
+        if len(calls) < 2:
+            raise RuntimeError("boom")
+        return {"success": True, "message": "ok", "feature_count": 1, "file_size": 1}
+
+    manager = JobManager(store, workers=1, max_attempts=3, retry_delay=0.01, poll_interval=0.01)
+    manager.register("flaky", flaky)
+
+    async def main():
+        await manager.start()
+        job = await manager.submit("flaky", {"n": 1}, _input(tmp_path), str(tmp_path / "out"))
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            job = store.get(job["id"])
+            if job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+                break
+        await manager.stop()
+        return job
+
+    job = asyncio.run(main())
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["attempts"] == 2
+    assert calls == [{"n": 1}, {"n": 1}]
+
+
+def test_csv_job_api(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_manager, "_store", JobStore(str(tmp_path / "jobs.db")))
+    content = "name,lon,lat\na,116.4,39.9\nb,121.5,31.2\n"
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/jobs?kind=csv-to-geojson",
+            files={"file": ("points.csv", content.encode("utf-8"), "text/csv")}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        for _ in range(100):
+            job = client.get(f"/api/jobs/{job_id}").json()
+            if job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+                break
+            time.sleep(0.05)
+        assert job["status"] == JOB_SUCCEEDED
+        assert job["feature_count"] == 2
+
+        result = client.get(job["result_url"])
+        assert result.status_code == 200
+        assert result.json()["type"] == "FeatureCollection"
+
+        assert client.post(f"/api/jobs/{job_id}/cancel").status_code == 409
+        assert client.get("/api/jobs/missing").status_code == 404
+        assert client.post("/api/jobs?kind=unknown", files={"file": ("a.csv", b"x")}).status_code == 400
+
+
+def test_progress_reporter_every_n():
+    from app.core.progress import ProgressReporter
+
+    events = []
+    reporter = ProgressReporter(events.append, total=100, every=25)
+    for n in range(1, 101):
+        reporter.update(n)
+    reporter.finish(100)
+    assert [e["features"] for e in events] == [25, 50, 75, 100, 100]
+    assert events[1]["percent"] == 50.0
+    assert events[-1]["done"] and events[-1]["eta_seconds"] == 0.0
+
+
+def test_job_events_stream(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_manager, "_store", JobStore(str(tmp_path / "jobs.db")))
+    content = "name,lon,lat\n" + "".join(f"p{i},{i % 180},{i % 90}\n" for i in range(5000))
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/api/jobs?kind=csv-to-geojson",
+            files={"file": ("points.csv", content.encode("utf-8"), "text/csv")}
+        ).json()["job_id"]
+        with client.stream("GET", f"/api/jobs/{job_id}/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+
+    assert "event: progress" in body
+    assert "event: done" in body
+    assert '"status": "succeeded"' in body
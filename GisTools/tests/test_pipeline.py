@@ -0,0 +1,211 @@
+"""
+转换流水线测试（Shapefile 读写需要GDAL，未安装时跳过）
+"""
+import json
+
+import pytest
+
+from app.services import geojson_reader, pipeline
+
+
+@pytest.fixture
+def geojson_path(tmp_path):
+    """顶层 properties 中也有 features 键；包含空几何、混合几何和类型不一致的属性"""
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [116.5 + i, 39.25]},
+         "properties": {"name": f"点{i}", "level": i, "score": i + 0.5 if i % 2 else i, "tags": ["a", i]}}
+        for i in range(25)
+    ]
+    features[3]["geometry"] = None
+    features[4]["geometry"] = {"type": "LineString", "coordinates": [[116, 39], [117, 40]]}
+    features[5]["properties"]["level"] = "7"
+    document = {
+        "type": "FeatureCollection",
+        "properties": {"features": [{"type": "Feature"}]},
+        "features": features,
+        "bbox": [116, 39, 141, 40],
+    }
+    path = tmp_path / "input.geojson"
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=1), encoding="utf-8")
+    return str(path)
+
+
+def test_geojson_reader_streams_small_chunks(geojson_path, monkeypatch):
+    monkeypatch.setattr(geojson_reader, "_READ_CHUNK_CHARS", 7)
+    source = geojson_reader.read_geojson(geojson_path, batch_size=4)
+    assert source.schema.fields == [("name", "String"), ("level", "Integer"), ("score", "Real"), ("tags", "String")]
+    batches = list(source.batches)
+    assert sum(len(batch) for batch in batches) == 24
+    assert batches[-1].bytes_read == source.total_bytes
+    first, second = batches[0], batches[1]
+    assert first.columns[0] == ["点0", "点1", "点2"] and first.columns[3][1] == '["a", 1]'
+    # 字符串 "7" 按字段类型转换为整数
+    assert second.columns[1] == [4, 7, 6, 7]
+
+
+@pytest.mark.parametrize("content, error", [
+    ('{"type": "Point", "coordinates": [1, 2]}', "不支持的GeoJSON类型: Point"),
+    ('{"features": []}', "无效的GeoJSON格式"),
+    ('{"type": "FeatureCollection", "features": []}', "GeoJSON中没有要素"),
+    ('{"type": "FeatureCollection", "features": [{"type": "Feature"', "GeoJSON"),
+])
+def test_geojson_reader_errors(tmp_path, content, error):
+    path = tmp_path / "bad.geojson"
+    path.write_text(content, encoding="utf-8")
+    result = pipeline.convert(str(path), str(tmp_path / "out.csv"))
+    assert result["success"] is False and error in result["error"]
+
+
+def test_geojson_to_csv_parquet_and_geojsonl(geojson_path, tmp_path):
+    import pyarrow.parquet as pq
+
+    result = pipeline.convert(geojson_path, str(tmp_path / "out.csv"))
+    assert result["success"] and result["feature_count"] == 24
+    lines = (tmp_path / "out.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "wkt,name,level,score,tags"
+    assert lines[1] == "POINT (116.5 39.25),点0,0,0.0,\"[\"\"a\"\", 0]\""
+    assert lines[4].startswith('"LINESTRING (116 39, 117 40)",点4')
+
+    result = pipeline.convert(geojson_path, str(tmp_path / "out.parquet"))
+    table = pq.read_table(str(tmp_path / "out.parquet"))
+    assert table.num_rows == 24 and table.column_names == ["id", "name", "level", "score", "tags", "geometry"]
+    column = json.loads(table.schema.metadata[b"geo"])["columns"]["geometry"]
+    # WGS 84 经纬度按规范省略 crs（即 OGC:CRS84）
+    assert column["geometry_types"] == [] and "crs" not in column
+
+    result = pipeline.convert(geojson_path, str(tmp_path / "out.geojsonl"))
+    features = [json.loads(line) for line in (tmp_path / "out.geojsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(features) == 24 and features[3]["geometry"]["type"] == "LineString"
+    # GeoJSONSeq 可以再读回
+    result = pipeline.convert(str(tmp_path / "out.geojsonl"), str(tmp_path / "back.geojson"))
+    assert result["success"] and result["feature_count"] == 24
+
+
+def test_geoparquet_crs_is_projjson(tmp_path):
+    import pyarrow.parquet as pq
+    import shapely
+
+    from app.core.progress import ProgressReporter
+    from app.services.csv_reader import PointBatch
+    from app.services.feature_writers import write_geoparquet
+
+    projjson = {"type": "ProjectedCRS", "name": "WGS 84 / UTM zone 50N", "id": {"authority": "EPSG", "code": 32650}}
+    schema = pipeline.LayerSchema(
+        geometry_type="Point", crs="+proj=utm +zone=50 +datum=WGS84 +units=m +no_defs", crs_projjson=projjson
+    )
+    batch = PointBatch(geometries=shapely.points([[500000.0, 4400000.0]]))
+    assert write_geoparquet(str(tmp_path / "utm.parquet"), schema, [batch], ProgressReporter(None)) == 1
+    column = json.loads(pq.read_schema(str(tmp_path / "utm.parquet")).metadata[b"geo"])["columns"]["geometry"]
+    assert column["crs"] == projjson and column["geometry_types"] == ["Point"]
+
+
+def test_csv_geojson_roundtrip(tmp_path):
+    csv_path = tmp_path / "points.csv"
+    csv_path.write_text("name,lon,lat\na,116.125,39.5\nb,bad,39\nc,117.25,40.75\n", encoding="utf-8")
+    result = pipeline.convert(str(csv_path), str(tmp_path / "points.geojson"))
+    assert result["success"] and result["feature_count"] == 2 and result["geometry_type"] == "Point"
+    assert (result["x_field"], result["y_field"]) == ("lon", "lat")
+
+    result = pipeline.convert(str(tmp_path / "points.geojson"), str(tmp_path / "back.csv"))
+    assert result["success"]
+    assert (tmp_path / "back.csv").read_text(encoding="utf-8").splitlines() == [
+        "wkt,name", "POINT (116.125 39.5),a", "POINT (117.25 40.75),c",
+    ]
+
+
+@pytest.fixture
+def ogr():
+    return pytest.importorskip("osgeo.ogr")
+
+
+def test_shp_reader_writer_dispatch(ogr):
+    from app.services import converters, shp_io
+
+    assert pipeline.detect_format("roads.SHP") == "shp"
+    assert pipeline._resolve(pipeline.READERS, "shp", "读取") is shp_io.read_shp
+    assert pipeline._resolve(pipeline.WRITERS, "shp", "写出") is shp_io.write_shp
+    assert converters.supports("shp-to-csv")
+
+
+def test_geojson_to_shp_and_back(ogr, tmp_path):
+    """Polygon + MultiPolygon 提升为 MultiPolygon 图层；再转回 GeoJSON 保留几何、属性和坐标系"""
+    from app.services.geojson_service import GeoJsonConverter
+    from app.services.shp_service import ShpConverter
+
+    square = [[[116, 39], [117, 39], [117, 40], [116, 40], [116, 39]]]
+    shifted = [[[118, 39], [119, 39], [119, 40], [118, 40], [118, 39]]]
+    document = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": square},
+         "properties": {"name": "a", "value": 1.5}},
+        {"type": "Feature", "geometry": {"type": "MultiPolygon", "coordinates": [square, shifted]},
+         "properties": {"name": "b", "value": 2}},
+    ]}
+    geojson_path = tmp_path / "shapes.geojson"
+    geojson_path.write_text(json.dumps(document), encoding="utf-8")
+    shp_path = tmp_path / "out" / "shapes.shp"
+
+    result = GeoJsonConverter.geojson_to_shp(str(geojson_path), str(shp_path))
+    assert result["success"], result
+    assert result["feature_count"] == 2 and result["geometry_type"] == "MultiPolygon"
+    data_source = ogr.Open(str(shp_path))
+    layer = data_source.GetLayer()
+    assert layer.GetFeatureCount() == 2
+    assert [(f.GetField("id"), f.GetField("name"), f.GetField("value")) for f in layer] == [(1, "a", 1.5), (2, "b", 2.0)]
+    data_source = None
+
+    result = ShpConverter.shp_to_geojson(str(shp_path), str(tmp_path / "back.geojson"))
+    assert result["success"] and result["feature_count"] == 2
+    back = json.loads((tmp_path / "back.geojson").read_text(encoding="utf-8"))
+    assert "+datum=WGS84" in back["crs"]["properties"]["name"]
+    assert [f["properties"]["name"] for f in back["features"]] == ["a", "b"]
+    assert back["features"][1]["geometry"]["type"] == "MultiPolygon"
+    assert len(back["features"][1]["geometry"]["coordinates"]) == 2
+
+    # WGS 84 经纬度的 GeoParquet 元数据省略 crs
+    import pyarrow.parquet as pq
+
+    assert pipeline.convert(str(shp_path), str(tmp_path / "shapes.parquet"))["success"]
+    column = json.loads(pq.read_schema(str(tmp_path / "shapes.parquet")).metadata[b"geo"])["columns"]["geometry"]
+    assert "crs" not in column
+
+
+def test_projected_shp_to_geoparquet_crs(ogr, tmp_path):
+    import pyarrow.parquet as pq
+    from osgeo import osr
+
+    shp_path = str(tmp_path / "utm.shp")
+    spatial_ref = osr.SpatialReference()
+    spatial_ref.ImportFromEPSG(32650)
+    data_source = ogr.GetDriverByName("ESRI Shapefile").CreateDataSource(shp_path)
+    layer = data_source.CreateLayer("utm", spatial_ref, ogr.wkbPoint)
+    layer.CreateField(ogr.FieldDefn("name", ogr.OFTString))
+    feature = ogr.Feature(layer.GetLayerDefn())
+    feature.SetField("name", "p")
+    feature.SetGeometry(ogr.CreateGeometryFromWkt("POINT (500000 4400000)"))
+    layer.CreateFeature(feature)
+    feature = layer = data_source = None
+
+    result = pipeline.convert(shp_path, str(tmp_path / "utm.parquet"))
+    assert result["success"] and result["feature_count"] == 1
+    column = json.loads(pq.read_schema(str(tmp_path / "utm.parquet")).metadata[b"geo"])["columns"]["geometry"]
+    assert column["crs"]["type"] == "ProjectedCRS"
+
+
+def test_csv_points_to_shp(ogr, tmp_path):
+    from app.services.csv_service import CsvConverter
+
+    csv_path = tmp_path / "points.csv"
+    csv_path.write_text("name,lon,lat,level\na,116.5,39.25,3\nb,bad,0,4\nc,117,40,5\n", encoding="utf-8")
+    shp_path = tmp_path / "out" / "points.shp"
+
+    result = CsvConverter.csv_to_shp(str(csv_path), str(shp_path))
+    assert result["success"], result
+    assert result["feature_count"] == 2 and result["geometry_type"] == "Point"
+    assert (tmp_path / "out" / "points.shx").exists() and (tmp_path / "out" / "points.dbf").exists()
+    data_source = ogr.Open(str(shp_path))
+    rows = [
+        (f.GetField("id"), f.GetField("name"), f.GetField("level"),
+         f.GetGeometryRef().GetX(), f.GetGeometryRef().GetY())
+        for f in data_source.GetLayer()
+    ]
+    assert rows == [(1, "a", 3, 116.5, 39.25), (2, "c", 5, 117.0, 40.0)]
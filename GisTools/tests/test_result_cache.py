@@ -0,0 +1,85 @@
+"""
+结果缓存测试
+"""
+import asyncio
+import threading
+import time
+
+from app.core.single_flight import FileLock
+from app.services.result_cache import ResultCache, convert_cached
+
+
+def _output(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_key_ignores_workers():
+    a = ResultCache.make_key("csv-to-geojson", "abc", {"encoding": "UTF-8", "workers": 1})
+    b = ResultCache.make_key("csv-to-geojson", "abc", {"encoding": "UTF-8", "workers": 8})
+    c = ResultCache.make_key("csv-to-geojson", "abc", {"encoding": "GBK", "workers": 1})
+    assert a == b != c
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.db"), max_bytes=250)
+    paths = {}
+    for name in ("a", "b", "c"):
+        paths[name] = _output(tmp_path, name, 100)
+        cache.put(name, "demo", paths[name], {"output_path": paths[name]})
+        time.sleep(0.01)
+        if name == "b":
+            # 访问 a，使 b 成为最久未使用的条目
+            assert cache.get("a") is not None
+
+    assert cache.get("b") is None
+    assert not (tmp_path / "b").exists()
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["total_bytes"] == 200
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_concurrent_conversions_coalesced(tmp_path):
+    calls = []
+
+    def convert(input_path, output_path, **params):
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        with open(output_path, "w") as f:
+            f.write("{}")
+        return {"success": True, "output_path": output_path}
+
+    async def run_both():
+        return await asyncio.gather(*[
+            convert_cached("demo", convert, "in", str(tmp_path / f"out{i}.json"), "same-sha", encoding="UTF-8")
+            for i in range(2)
+        ])
+
+    results = asyncio.run(run_both())
+    assert len(calls) == 1
+    assert sorted(cached for _, cached in results) == [False, True]
+    assert results[0][0]["output_path"] == results[1][0]["output_path"]
+
+    # 文件锁在进程间（以及同一进程的不同描述符间）互斥
+    first, second = FileLock(str(tmp_path / "k.lock")), FileLock(str(tmp_path / "k.lock"))
+    assert first.try_acquire() and not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release(remove=True)
+    assert not (tmp_path / "k.lock").exists()
+
+
+def test_output_sha256_recorded_on_put(tmp_path):
+    import hashlib
+    import os
+
+    cache = ResultCache(str(tmp_path / "cache.db"), max_bytes=1000)
+    path = _output(tmp_path, "out.geojson", 100)
+    cache.put("k", "demo", path, {"output_path": path})
+    assert cache.output_sha256(path, os.stat(path)) == hashlib.sha256(b"x" * 100).hexdigest()
+    # 文件被修改后不再使用记录的哈希
+    with open(path, "ab") as f:
+        f.write(b"y")
+    assert cache.output_sha256(path, os.stat(path)) is None
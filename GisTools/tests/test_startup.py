@@ -0,0 +1,17 @@
+"""
+冷启动测试：导入 app.main 不加载GDAL、没有输出，耗时在预算内
+"""
+import os
+
+from benchmarks.bench_startup import DEFAULT_BUDGET, measure_import
+
+# CI 机器较慢时可以通过环境变量放宽
+STARTUP_BUDGET = float(os.environ.get("GISTOOLS_STARTUP_BUDGET", DEFAULT_BUDGET))
+
+
+def test_import_is_lean():
+    result = measure_import()
+    assert not result["osgeo_loaded"]
+    assert not result["uvicorn_loaded"]
+    assert result["stdout"] == ""
+    assert result["seconds"] < STARTUP_BUDGET, f"导入 app.main 耗时 {result['seconds']:.2f}s"
@@ -0,0 +1,43 @@
+"""
+上传保存与大小限制测试
+"""
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.upload import save_upload
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_save_upload_hashes_while_streaming(tmp_path):
+    data = b"0123456789" * 300000
+    path = tmp_path / "data.bin"
+    upload = asyncio.run(save_upload(UploadFile(io.BytesIO(data)), str(path)))
+    assert upload.size == len(data)
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    assert path.read_bytes() == data
+
+
+def test_save_upload_rejects_oversize(tmp_path):
+    path = tmp_path / "data.bin"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(save_upload(UploadFile(io.BytesIO(b"x" * 2048)), str(path), max_size=1024))
+    assert exc.value.status_code == 413
+    assert not path.exists()
+
+
+def test_oversize_request_rejected_before_body(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+    content = b"lon,lat\n" + b"1,2\n" * 100000
+    response = client.post(
+        "/api/csv/to-geojson",
+        files={"file": ("big.csv", content, "text/csv")}
+    )
+    assert response.status_code == 413